@@ -17,4 +17,4 @@ cd /app
 
 # Start the application
 echo "Starting application ..."
-exec uvicorn main:app --host 0.0.0.0 --port 8000
+exec uvicorn main:app --host 0.0.0.0 --port 8000 --workers "${UVICORN_WORKERS:-1}"
@@ -0,0 +1,115 @@
+"""
+Benchmark: loading a session's history, ORM entities vs column projection (MessageModel.list_by_session).
+
+    cd src
+    python -m benchmarks.bench_history_loading [--sizes 100 1000 5000] [--repeat 10]
+
+Runs against an in-memory SQLite database (aiosqlite), so it needs no server; absolute numbers are lower than on
+PostgreSQL but the ORM overhead (identity map, instance state, attribute instrumentation) is the same.
+"orm" is what the history paths did before: select(Message) entities, then build the model request / the
+response dicts from them. "rows" selects only the needed columns into Row tuples.
+For each path: best wall-clock ms per load and peak traced allocation (tracemalloc) in KiB.
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from sqlalchemy import select, insert
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from controllers.conversation import _build_openai_messages, _message_to_row_dict
+from models.MessageModel import MessageModel, HISTORY_COLUMNS
+from models.ai_agent_platform_DB.schemes import SQLAlchemyBase, Agent, Session, Message
+from stores.LLMEnums import MessageRoleEnums
+
+CONTENT = ("Some realistic chat message content, a sentence or two long. " * 4).strip()
+
+
+async def _setup(n: int):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLAlchemyBase.metadata.create_all)
+    db_client = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with db_client() as db_session:
+        agent = Agent(name="bench", prompt="You are a benchmark.")
+        db_session.add(agent)
+        await db_session.flush()
+        session = Session(agent_id=agent.agent_id)
+        db_session.add(session)
+        await db_session.flush()
+        await db_session.execute(
+            insert(Message),
+            [
+                {"session_id": session.session_id, "role": "user" if i % 2 == 0 else "assistant", "content": CONTENT}
+                for i in range(n)
+            ],
+        )
+        await db_session.commit()
+    return engine, db_client, session.session_id
+
+
+async def _orm_history(db_client, session_id: int):
+    async with db_client() as db_session:
+        result = await db_session.execute(
+            select(Message)
+            .where(Message.session_id == session_id, Message.role != MessageRoleEnums.ROLE_SUMMARY.value)
+            .order_by(Message.created_at.asc(), Message.message_id.asc())
+        )
+        return list(result.scalars().all())
+
+
+async def _orm_path(db_client, session_id: int):
+    history = await _orm_history(db_client, session_id)
+    _build_openai_messages("prompt", history)
+    return [_message_to_row_dict(m) for m in await _orm_history(db_client, session_id)]
+
+
+async def _rows_path(db_client, session_id: int):
+    model = MessageModel(db_client)
+    history = await model.list_by_session(session_id, columns=HISTORY_COLUMNS)
+    _build_openai_messages("prompt", history)
+    return [_message_to_row_dict(row) for row in await model.list_by_session(session_id)]
+
+
+async def _measure(path, db_client, session_id: int, repeat: int) -> tuple[float, float]:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        await path(db_client, session_id)
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    await path(db_client, session_id)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best * 1000, peak / 1024
+
+
+async def _run(sizes: list[int], repeat: int) -> None:
+    print(f"best of {repeat}; history for the model + history response per iteration")
+    print(f"{'messages':>9} {'orm ms':>9} {'rows ms':>9} {'speedup':>8} {'orm KiB':>10} {'rows KiB':>10} {'saved':>7}")
+    for n in sizes:
+        engine, db_client, session_id = await _setup(n)
+        try:
+            assert await _orm_path(db_client, session_id) == await _rows_path(db_client, session_id)
+            orm_ms, orm_kib = await _measure(_orm_path, db_client, session_id, repeat)
+            rows_ms, rows_kib = await _measure(_rows_path, db_client, session_id, repeat)
+        finally:
+            await engine.dispose()
+        print(
+            f"{n:>9} {orm_ms:>9.2f} {rows_ms:>9.2f} {orm_ms / rows_ms if rows_ms else float('inf'):>7.1f}x"
+            f" {orm_kib:>10.0f} {rows_kib:>10.0f} {1 - rows_kib / orm_kib if orm_kib else 0:>6.0%}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(_run(args.sizes, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
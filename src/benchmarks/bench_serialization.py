@@ -0,0 +1,75 @@
+"""
+Benchmark: per-request CPU for serializing a message history, Pydantic response_model path vs FastJSONResponse.
+
+    cd src
+    python -m benchmarks.bench_serialization [--sizes 100 1000 5000] [--repeat 20]
+
+"pydantic" reproduces what the routes did before: build MessageResponse models by hand, then FastAPI validates
+them again against response_model=list[MessageResponse], dumps to JSON-able python and encodes with json.dumps.
+"fast" builds dicts from the row objects and renders them with helpers.serialization.FastJSONResponse.
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from pydantic import TypeAdapter
+
+from helpers.serialization import FastJSONResponse, orjson
+from routes.schemes import MessageResponse
+from controllers.conversation import _message_to_dict, _message_to_row_dict
+
+
+def _rows(n: int) -> list:
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return [
+        SimpleNamespace(
+            message_id=i,
+            session_id=1,
+            role="user" if i % 2 == 0 else "assistant",
+            content=("Some realistic chat message content, a sentence or two long. " * 4).strip(),
+            created_at=start + timedelta(seconds=i, microseconds=i),
+        )
+        for i in range(n)
+    ]
+
+
+def _pydantic_path(rows, adapter) -> bytes:
+    models = [MessageResponse(**_message_to_dict(m)) for m in rows]
+    validated = adapter.validate_python(models)
+    return json.dumps(adapter.dump_python(validated, mode="json")).encode("utf-8")
+
+
+def _fast_path(rows) -> bytes:
+    return FastJSONResponse([_message_to_row_dict(m) for m in rows]).body
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.process_time()
+        fn()
+        best = min(best, time.process_time() - t0)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    adapter = TypeAdapter(list[MessageResponse])
+    print(f"encoder: {'orjson' if orjson is not None else 'json (stdlib)'}; best of {args.repeat}, CPU ms per request")
+    print(f"{'messages':>9} {'pydantic':>10} {'fast':>10} {'saved':>10} {'speedup':>8}")
+    for n in args.sizes:
+        rows = _rows(n)
+        assert json.loads(_pydantic_path(rows, adapter)) == json.loads(_fast_path(rows))
+        slow = _time(lambda: _pydantic_path(rows, adapter), args.repeat)
+        fast = _time(lambda: _fast_path(rows), args.repeat)
+        print(f"{n:>9} {slow:>10.2f} {fast:>10.2f} {slow - fast:>10.2f} {slow / fast if fast else float('inf'):>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
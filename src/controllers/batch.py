@@ -0,0 +1,95 @@
+"""
+Batch chat: run many (session_id, content) turns with bounded parallelism and stream per-item results.
+
+Turns of the same session run one after another in request order (each sees the previous reply in its history);
+different sessions run concurrently, at most `max_parallel` turns at a time. Sessions and agents for the whole
+batch are loaded up front in two queries; each turn then goes through conversation.reply_to_message.
+Each turn takes its own admission ticket (text budget, session's agent) when it starts; a refused turn becomes an
+error result and the rest of the batch goes on.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+
+from controllers import conversation
+from helpers.admission import AdmissionController, AdmissionRejected, TEXT
+from models.AgentModel import AgentModel
+from models.SessionModel import SessionModel
+
+logger = logging.getLogger(__name__)
+
+_BATCH_END = object()
+
+
+def _result(index: int, session_id: int, message: dict | None = None, error: str | None = None) -> dict:
+    return {"index": index, "session_id": session_id, "ok": error is None, "message": message, "error": error}
+
+
+async def run_batch(
+    db_client,
+    openai_provider,
+    items: list[tuple[int, str]],
+    max_parallel: int,
+    embedding_provider=None,
+    admission: AdmissionController | None = None,
+):
+    """
+    Yield one result dict per item ({"index", "session_id", "ok", "message", "error"}), in completion order.
+    Closing the generator early (client went away) cancels the turns still running.
+    Without `admission` the turns are not admission-controlled.
+    """
+    sessions = await SessionModel(db_client).get_many(session_id for session_id, _ in items)
+    agents = await AgentModel(db_client).get_many(s.agent_id for s in sessions.values())
+
+    results: asyncio.Queue = asyncio.Queue()
+    turns_by_session: dict[int, list[tuple[int, str]]] = defaultdict(list)
+    for index, (session_id, content) in enumerate(items):
+        session = sessions.get(session_id)
+        if session is None:
+            results.put_nowait(_result(index, session_id, error="Session not found"))
+        elif session.agent_id not in agents:
+            results.put_nowait(_result(index, session_id, error="Agent not found"))
+        else:
+            turns_by_session[session_id].append((index, content))
+
+    semaphore = asyncio.Semaphore(max_parallel)
+
+    async def run_session(session_id: int, turns: list[tuple[int, str]]) -> None:
+        session = sessions[session_id]
+        agent = agents[session.agent_id]
+        for index, content in turns:
+            async with semaphore:
+                try:
+                    ticket = admission.admit(TEXT, session.agent_id) if admission is not None else None
+                except AdmissionRejected as e:
+                    results.put_nowait(_result(index, session_id, error=e.detail))
+                    continue
+                try:
+                    message = await conversation.reply_to_message(
+                        db_client, openai_provider, session, agent, content, embedding_provider=embedding_provider
+                    )
+                except Exception:
+                    logger.exception("Batch item %s (session %s) failed", index, session_id)
+                    message = None
+                finally:
+                    if ticket is not None:
+                        ticket.release()
+            if message is None:
+                results.put_nowait(_result(index, session_id, error="LLM error"))
+            else:
+                results.put_nowait(_result(index, session_id, message=message))
+
+    tasks = [asyncio.create_task(run_session(sid, turns)) for sid, turns in turns_by_session.items()]
+    done = asyncio.gather(*tasks)
+    done.add_done_callback(lambda _: results.put_nowait(_BATCH_END))
+    try:
+        while True:
+            result = await results.get()
+            if result is _BATCH_END:
+                break
+            yield result
+        await done  # re-raise anything unexpected from the session tasks
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,211 @@
+"""
+Asynchronous chat jobs: a client submits a message and gets a job id back at once, then polls or subscribes
+for the reply, so no HTTP connection is held for the length of a generation.
+
+Jobs are driven by a bounded pool of asyncio workers (CHAT_JOB_WORKERS concurrent LLM calls, at most
+CHAT_JOB_QUEUE_SIZE waiting). Job state lives in the chat_jobs table: after a restart, queued jobs and jobs whose
+worker died are re-enqueued, and claiming a job is conditional, so a job enqueued twice still runs once. A job is
+run at most CHAT_JOB_MAX_ATTEMPTS times; after that recovery marks it failed instead of requeueing it.
+
+A timed-out run cannot be stopped (its LLM call keeps going in a worker thread), and a requeued job may be claimed
+again meanwhile. So finishing is conditional too: the reply is stored in the same transaction that marks the job
+succeeded, only while the run's attempt still owns the job; a run that lost it stores nothing.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from controllers import conversation
+from helpers import metrics
+from helpers.config import get_settings
+from models.ChatJobModel import ChatJobModel, complete_job
+from models.MessageModel import MessageModel
+from models.SessionModel import SessionModel
+from stores.LLMEnums import ChatJobStatusEnums
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = (ChatJobStatusEnums.SUCCEEDED.value, ChatJobStatusEnums.FAILED.value)
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+async def get_job(db_client, job_id: int) -> dict | None:
+    """Job state with the assistant reply (when finished successfully), or None if the job does not exist."""
+    job = await ChatJobModel(db_client).get_by_id(job_id)
+    if job is None:
+        return None
+    assistant_message = None
+    if job.assistant_message_id is not None:
+        message = await MessageModel(db_client).get_by_id(job.assistant_message_id)
+        if message is not None:
+            assistant_message = conversation._message_to_dict(message)
+    return {
+        "job_id": job.job_id,
+        "session_id": job.session_id,
+        "status": job.status,
+        "user_message_id": job.user_message_id,
+        "assistant_message": assistant_message,
+        "error": job.error,
+        "created_at": _iso(job.created_at),
+        "started_at": _iso(job.started_at),
+        "finished_at": _iso(job.finished_at),
+    }
+
+
+class ChatJobPool:
+    def __init__(self, db_client, openai_provider, embedding_provider=None, settings=None):
+        self.db_client = db_client
+        self.openai_provider = openai_provider
+        self.embedding_provider = embedding_provider
+        self.settings = settings or get_settings()
+        self._queue: asyncio.Queue[int] = asyncio.Queue(maxsize=self.settings.CHAT_JOB_QUEUE_SIZE)
+        self._pending: set[int] = set()  # job ids in the local queue, so recovery does not enqueue them twice
+        self._tasks: list[asyncio.Task] = []
+        self._job_finished = asyncio.Event()  # replaced after each finished job
+
+    async def start(self) -> None:
+        """Re-enqueue jobs left over by a previous run, then start the workers and the periodic recovery pass."""
+        if self._tasks:
+            return
+        await self._recover_once()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"chat-job-worker-{i}")
+            for i in range(self.settings.CHAT_JOB_WORKERS)
+        ]
+        self._tasks.append(asyncio.create_task(self._recover(), name="chat-job-recovery"))
+        logger.info("Chat job pool started (%s workers).", self.settings.CHAT_JOB_WORKERS)
+
+    async def drain(self) -> None:
+        """Wait until every job in the local queue has been processed."""
+        await self._queue.join()
+
+    async def stop(self) -> None:
+        """Stop the workers. Jobs still running stay `running` in the DB and are recovered after the timeout."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Chat job pool stopped.")
+
+    async def submit(self, session_id: int, content: str) -> dict | None:
+        """
+        Store the user message and a queued job, and enqueue it. Returns the job dict, or None if the session
+        does not exist. Raises asyncio.QueueFull when the pool is saturated (nothing is stored then).
+        """
+        if self._queue.full():
+            raise asyncio.QueueFull()
+        if await SessionModel(self.db_client).get_by_id(session_id) is None:
+            return None
+        job = await ChatJobModel(self.db_client).create_job(session_id, content)
+        self._enqueue(job.job_id)
+        return await get_job(self.db_client, job.job_id)
+
+    def _enqueue(self, job_id: int) -> bool:
+        if job_id in self._pending:
+            return True
+        try:
+            self._queue.put_nowait(job_id)
+        except asyncio.QueueFull:
+            # Stays queued in the DB; the next recovery pass picks it up
+            logger.warning("Chat job queue full; job %s deferred to recovery.", job_id)
+            return False
+        self._pending.add(job_id)
+        metrics.set_gauge("chat_jobs_queue_depth", self._queue.qsize())
+        return True
+
+    async def wait_for_any(self, timeout: float) -> None:
+        """Wait until this process finishes some job, or `timeout` seconds (the job may run in another worker)."""
+        try:
+            await asyncio.wait_for(self._job_finished.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            self._pending.discard(job_id)
+            metrics.set_gauge("chat_jobs_queue_depth", self._queue.qsize())
+            try:
+                await self.run_job(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Chat job %s crashed", job_id)
+            finally:
+                self._queue.task_done()
+
+    async def run_job(self, job_id: int) -> None:
+        job_model = ChatJobModel(self.db_client)
+        job = await job_model.claim(job_id, self.settings.CHAT_JOB_MAX_ATTEMPTS)
+        if job is None:
+            return  # already claimed (enqueued twice), finished or out of attempts
+        error = None
+        owned = None  # whether this run still owned the job when finishing it (None: not finished yet)
+
+        async def complete_if_owned(db_session, message) -> bool:
+            nonlocal owned
+            owned = await complete_job(db_session, job_id, job.attempts, message.message_id)
+            return owned
+
+        try:
+            user_message = await MessageModel(self.db_client).get_by_id(job.user_message_id)
+            if user_message is None:
+                error = "User message not found"
+            else:
+                reply = await asyncio.wait_for(
+                    conversation.send_text_message(
+                        self.db_client,
+                        self.openai_provider,
+                        job.session_id,
+                        user_message.content,
+                        embedding_provider=self.embedding_provider,
+                        user_message_id=user_message.message_id,
+                        store_guard=complete_if_owned,
+                    ),
+                    self.settings.CHAT_JOB_TIMEOUT_SECONDS,
+                )
+                if reply is None:
+                    error = "Session not found or LLM error"
+        except asyncio.TimeoutError:
+            error = "Timed out waiting for the LLM"
+        except Exception:
+            logger.exception("Chat job %s failed", job_id)
+            error = "Internal error"
+        if owned is None:
+            owned = await job_model.fail(job_id, job.attempts, error)
+        elif owned:
+            error = None  # the (shielded) store completed even though the wait timed out
+        if not owned:
+            logger.warning("Chat job %s attempt %s no longer owns the job; result dropped", job_id, job.attempts)
+            metrics.increment("chat_jobs_total", status="superseded")
+            return
+        metrics.increment("chat_jobs_total", status=ChatJobStatusEnums.FAILED.value if error else ChatJobStatusEnums.SUCCEEDED.value)
+        self._job_finished.set()
+        self._job_finished = asyncio.Event()
+
+    async def _recover_once(self) -> None:
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=self.settings.CHAT_JOB_TIMEOUT_SECONDS)
+        max_attempts = self.settings.CHAT_JOB_MAX_ATTEMPTS
+        job_model = ChatJobModel(self.db_client)
+        exhausted = await job_model.fail_exhausted(stale_before, max_attempts)
+        if exhausted:
+            logger.warning("Gave up on %s chat job(s) after %s attempts", exhausted, max_attempts)
+            metrics.increment("chat_jobs_total", exhausted, status=ChatJobStatusEnums.FAILED.value)
+            self._job_finished.set()
+            self._job_finished = asyncio.Event()
+        for job_id in await job_model.requeue_stale(stale_before, max_attempts):
+            if not self._enqueue(job_id):
+                break
+
+    async def _recover(self) -> None:
+        while True:
+            await asyncio.sleep(self.settings.CHAT_JOB_RECOVERY_INTERVAL_SECONDS)
+            try:
+                await self._recover_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Chat job recovery pass failed")
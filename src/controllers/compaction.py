@@ -0,0 +1,131 @@
+"""
+Background conversation compaction: summarize the older turns of long or idle sessions into a stored
+summary message, so resuming a session sends summary + recent raw turns instead of the whole history.
+
+All progress lives in the sessions table (summary_message_id / compacted_through_message_id), so the worker
+is resumable: after a restart it simply picks up whatever still matches the candidate query.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from helpers.config import get_settings
+from helpers.rate_limiter import AsyncRateLimiter
+from helpers.text_chunker import estimate_tokens
+from models.MessageModel import MessageModel
+from models.SessionModel import SessionModel
+from stores.LLMEnums import OpenAIEnums
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_INSTRUCTIONS = (
+    "You compress chat transcripts. Write a concise summary of the conversation below that keeps every fact, "
+    "decision, name, number and open question the assistant needs to continue the conversation. "
+    "Write in the conversation's language. Output only the summary."
+)
+
+
+def _summary_request(previous_summary: str | None, messages: list) -> list[dict]:
+    transcript = "\n".join(f"{m.role}: {m.content}" for m in messages)
+    if previous_summary:
+        transcript = f"Earlier summary:\n{previous_summary}\n\nLater messages:\n{transcript}"
+    return [
+        {"role": OpenAIEnums.ROLE_SYSTEM.value, "content": SUMMARY_INSTRUCTIONS},
+        {"role": OpenAIEnums.ROLE_USER.value, "content": transcript},
+    ]
+
+
+class CompactionWorker:
+    def __init__(self, db_client, openai_provider, settings=None):
+        self.db_client = db_client
+        self.openai_provider = openai_provider
+        self.settings = settings or get_settings()
+        self.rate_limiter = AsyncRateLimiter(self.settings.COMPACTION_REQUESTS_PER_MINUTE)
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="compaction-worker")
+            logger.info("Compaction worker started.")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            logger.info("Compaction worker stopped.")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Compaction pass failed")
+            await asyncio.sleep(self.settings.COMPACTION_INTERVAL_SECONDS)
+
+    async def run_once(self) -> list[dict]:
+        """One pass over the current candidates. Returns one result dict per compacted session."""
+        idle_before = datetime.now(timezone.utc) - timedelta(minutes=self.settings.COMPACTION_IDLE_MINUTES)
+        candidates = await SessionModel(self.db_client).list_compaction_candidates(
+            max_messages=self.settings.COMPACTION_MAX_MESSAGES,
+            idle_before=idle_before,
+            keep_recent=self.settings.COMPACTION_KEEP_RECENT_MESSAGES,
+            limit=self.settings.COMPACTION_BATCH_SIZE,
+        )
+        results = []
+        for session in candidates:
+            result = await self.compact_session(session)
+            if result:
+                results.append(result)
+        return results
+
+    async def compact_session(self, session) -> dict | None:
+        """
+        Summarize everything but the last COMPACTION_KEEP_RECENT_MESSAGES raw messages of a session
+        (folding in any previous summary). Returns {"session_id", "compacted_messages", "tokens_saved"} or None.
+        """
+        message_model = MessageModel(self.db_client)
+        context = await message_model.list_context(
+            session.session_id,
+            session.summary_message_id,
+            session.compacted_through_message_id,
+            forked=session.parent_session_id is not None,
+        )
+        previous_summary = None
+        if context and context[0].message_id == session.summary_message_id:
+            previous_summary = context.pop(0).content
+        keep = self.settings.COMPACTION_KEEP_RECENT_MESSAGES
+        to_summarize = context[:-keep] if keep > 0 else context
+        if not to_summarize:
+            return None
+
+        await self.rate_limiter.acquire()
+        summary = await asyncio.to_thread(
+            self.openai_provider.generate_chat,
+            _summary_request(previous_summary, to_summarize),
+            max_output_tokens=self.settings.COMPACTION_SUMMARY_MAX_TOKENS,
+        )
+        if not summary:
+            logger.warning("Compaction of session %s produced no summary; will retry later.", session.session_id)
+            return None
+
+        tokens_before = sum(estimate_tokens(m.content) for m in to_summarize) + estimate_tokens(previous_summary or "")
+        tokens_saved = max(0, tokens_before - estimate_tokens(summary))
+        stored = await message_model.store_summary(
+            session.session_id,
+            summary,
+            previous_through_message_id=session.compacted_through_message_id,
+            through_message_id=to_summarize[-1].message_id,
+            covered_count=len(to_summarize),
+            tokens_saved=tokens_saved,
+        )
+        if stored is None:
+            logger.info("Session %s was compacted concurrently; skipped.", session.session_id)
+            return None
+        logger.info(
+            "Compacted session %s: %s messages summarized, ~%s tokens saved per request",
+            session.session_id, len(to_summarize), tokens_saved,
+        )
+        return {"session_id": session.session_id, "compacted_messages": len(to_summarize), "tokens_saved": tokens_saved}
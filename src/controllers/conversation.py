@@ -2,18 +2,35 @@
 Conversation: message history and sending messages (text + voice).
 Single goal — support UI: type/send message, record audio and send, show user message and AI response.
 """
+import asyncio
 import json
-import re
-from datetime import datetime, timezone
+import time
+from contextlib import aclosing
+from functools import partial
 
-from openai import APIConnectionError
-import httpx
+import anyio
 
 from models.AgentModel import AgentModel
 from models.SessionModel import SessionModel
-from models.MessageModel import MessageModel
-from models.ai_agent_platform_DB.schemes import Message
-from stores.LLMEnums import OpenAIEnums
+from models.MessageModel import MessageModel, HISTORY_COLUMNS
+from models.ai_agent_platform_DB.schemes import Message, MessageUsage
+from stores.LLMEnums import OpenAIEnums, MessageRoleEnums
+from stores.LLM import ToolCallRequest, connection_errors
+from controllers.knowledge import retrieve_context
+from controllers.tools import ToolContext, get_tool_registry, run_tool_calls
+from controllers.transcription import transcribe
+from helpers.config import get_settings
+from helpers.text_chunker import estimate_tokens
+from helpers import metrics
+from helpers.sse import coalesce_text
+from helpers.sentence_segmenter import SentenceSegmenter
+
+KNOWLEDGE_HEADER = "Use the following knowledge base excerpts when they are relevant to the user's question:"
+SUMMARY_HEADER = "Summary of the earlier conversation:"
+# Appended to assistant replies cut short because the stream was cancelled mid-generation (no client came back)
+TRUNCATED_MARKER = " [truncated]"
+
+_STREAM_END = object()
 
 
 def _message_to_dict(m):
@@ -26,119 +43,370 @@ def _message_to_dict(m):
     }
 
 
+def _message_to_row_dict(m):
+    """Like _message_to_dict but keeps created_at as datetime, for FastJSONResponse to encode natively."""
+    return {
+        "message_id": m.message_id,
+        "session_id": m.session_id,
+        "role": m.role,
+        "content": m.content,
+        "created_at": m.created_at,
+    }
+
+
 async def get_messages(db_client, session_id: int) -> list:
-    """Get chronological message history for a session (chat history in UI)."""
+    """Get chronological message history for a session (chat history in UI), as JSON-ready dicts for FastJSONResponse."""
+    session = await SessionModel(db_client).get_by_id(session_id)
+    if session is None:
+        return []  # unknown, or deleted and not purged yet
     model = MessageModel(db_client)
-    messages = await model.list_by_session(session_id)
-    return [_message_to_dict(m) for m in messages]
+    rows = await model.list_by_session(session_id, forked=session.parent_session_id is not None)
+    return [_message_to_row_dict(row) for row in rows]
 
 
-def _build_openai_messages(agent_prompt: str, history: list) -> list[dict]:
-    out = [{"role": OpenAIEnums.ROLE_SYSTEM.value, "content": agent_prompt}]
+def _build_openai_messages(
+    agent_prompt: str,
+    history: list,
+    knowledge: list[str] | None = None,
+    knowledge_token_budget: int | None = None,
+) -> list[dict]:
+    """
+    Build the OpenAI message list: system prompt (plus retrieved knowledge chunks, nearest first,
+    as many as fit in knowledge_token_budget) followed by the chat history.
+    """
+    system_content = agent_prompt
+    if knowledge:
+        budget = knowledge_token_budget if knowledge_token_budget is not None else get_settings().KNOWLEDGE_CONTEXT_TOKEN_BUDGET
+        excerpts = []
+        for chunk in knowledge:
+            cost = estimate_tokens(chunk)
+            if cost > budget:
+                break
+            budget -= cost
+            excerpts.append(f"[{len(excerpts) + 1}] {chunk}")
+        if excerpts:
+            system_content = f"{agent_prompt}\n\n{KNOWLEDGE_HEADER}\n" + "\n".join(excerpts)
+    out = [{"role": OpenAIEnums.ROLE_SYSTEM.value, "content": system_content}]
     for m in history:
-        out.append({"role": m.role, "content": m.content})
+        if m.role == MessageRoleEnums.ROLE_SUMMARY.value:
+            out.append({"role": OpenAIEnums.ROLE_SYSTEM.value, "content": f"{SUMMARY_HEADER}\n{m.content}"})
+        else:
+            out.append({"role": m.role, "content": m.content})
     return out
 
 
-async def send_text_message(db_client, openai_provider, session_id: int, content: str) -> dict | None:
+async def _iterate_in_thread(iterator):
     """
-    Send a text message: store user message, generate assistant reply (non-streaming), store it, return.
-    Use for non-streaming clients.
+    Iterate a blocking provider iterator (LLM or TTS stream) one item at a time in a worker thread, so the event
+    loop stays free (and the generation can be cancelled) while waiting for the next chunk.
+    The thread call is not abandoned on cancellation: cancellation takes effect once the in-flight `next()`
+    returns, and the iterator is then closed, which closes the upstream HTTP stream.
     """
-    session_model = SessionModel(db_client)
-    message_model = MessageModel(db_client)
-    agent_model = AgentModel(db_client)
+    iterator = iter(iterator)
+    try:
+        while True:
+            pending = asyncio.ensure_future(anyio.to_thread.run_sync(next, iterator, _STREAM_END))
+            try:
+                item = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # Let the in-flight next() finish: a running generator cannot be closed
+                await pending
+                raise
+            if item is _STREAM_END:
+                return
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
 
-    session = await session_model.get_by_id(session_id)
+
+class _TurnUsage:
+    """
+    Collects the cost and latency of one assistant reply while it is generated: the provider fills `provider_usage`
+    (token counts, model), the caller marks the first token and adds TTS bytes. Stored as the reply's MessageUsage.
+    """
+
+    def __init__(self, openai_provider, session):
+        self.session_id = session.session_id
+        self.agent_id = session.agent_id
+        self.model_id = openai_provider.generation_model_id
+        self.provider_usage: dict = {}
+        self.tts_audio_bytes = 0
+        self.started = time.perf_counter()
+        self.first_token_at: float | None = None
+
+    def first_token(self) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+
+    def to_row(self) -> MessageUsage:
+        finished = time.perf_counter()
+        first_token_at = self.first_token_at if self.first_token_at is not None else finished
+        return MessageUsage(
+            session_id=self.session_id,
+            agent_id=self.agent_id,
+            model_id=self.provider_usage.get("model") or self.model_id,
+            prompt_tokens=self.provider_usage.get("prompt_tokens"),
+            completion_tokens=self.provider_usage.get("completion_tokens"),
+            ttft_ms=round((first_token_at - self.started) * 1000),
+            latency_ms=round((finished - self.started) * 1000),
+            tts_audio_bytes=self.tts_audio_bytes or None,
+        )
+
+
+class _Tools:
+    """The agent's tools for one reply: the specs offered to the model and the context their handlers run in."""
+
+    def __init__(self, agent, db_client, embedding_provider):
+        self.allowed = list(getattr(agent, "tools", None) or [])
+        self.registry = get_tool_registry()
+        self.specs = self.registry.specs(self.allowed)
+        self.context = ToolContext(agent.agent_id, db_client, embedding_provider)
+
+    def offer(self, round_index: int) -> dict:
+        """Provider kwargs for a round: the tools, unless there are none or this is the last round (answer now)."""
+        if not self.specs or round_index >= get_settings().TOOL_MAX_ROUNDS:
+            return {}
+        return {"tools": self.specs}
+
+    async def results(self, request: ToolCallRequest, messages: list[dict]) -> list[dict]:
+        """The next round's messages: the model's tool calls and their results (all calls run concurrently)."""
+        results = await run_tool_calls(self.registry, request.calls, self.allowed, self.context)
+        # A new list each round: the messages sent in earlier rounds stay as they were sent
+        return [*messages, request.assistant_message(), *results]
+
+
+async def _generate(openai_provider, openai_messages: list[dict], usage: _TurnUsage, tools: _Tools) -> str | None:
+    """Non-streaming reply, running the tools the model calls between rounds (at most TOOL_MAX_ROUNDS of them)."""
+    messages = openai_messages
+    round_index = 0
+    while True:
+        reply = await anyio.to_thread.run_sync(
+            partial(openai_provider.generate_chat, messages, usage=usage.provider_usage, **tools.offer(round_index))
+        )
+        if not isinstance(reply, ToolCallRequest):
+            return reply
+        if not tools.offer(round_index):  # tool calls although none were offered
+            return reply.content
+        messages = await tools.results(reply, messages)
+        round_index += 1
+
+
+async def _stream_reply(openai_provider, openai_messages: list[dict], usage: _TurnUsage, tools: _Tools):
+    """
+    Streaming reply: yields the model's text deltas. When a round ends in tool calls, the tools run and the next
+    round is streamed; the text of all rounds is yielded (and stored) as one reply.
+    """
+    messages = openai_messages
+    round_index = 0
+    while True:
+        request = None
+        text = []
+        llm_chunks = openai_provider.generate_chat_stream(messages, usage=usage.provider_usage, **tools.offer(round_index))
+        async with aclosing(_iterate_in_thread(llm_chunks)) as llm_stream:
+            async for chunk in llm_stream:
+                if isinstance(chunk, ToolCallRequest):
+                    request = chunk
+                    continue
+                text.append(chunk)
+                yield chunk
+        if request is None or not tools.offer(round_index):
+            return
+        request.content = "".join(text) or None
+        messages = await tools.results(request, messages)
+        round_index += 1
+
+
+async def _store_assistant_message(
+    message_model: MessageModel,
+    session_id: int,
+    content: str,
+    truncated: bool = False,
+    usage: _TurnUsage | None = None,
+    guard=None,
+) -> Message | None:
+    """
+    Persist an assistant reply (and its usage); shielded so a cancelled (abandoned) stream still saves what it produced.
+    None when `guard` (see MessageModel.create_message) refused the write.
+    """
+    if truncated:
+        content += TRUNCATED_MARKER
+    assistant_message = Message(session_id=session_id, role=OpenAIEnums.ROLE_ASSISTANT.value, content=content)
+    with anyio.CancelScope(shield=True):
+        return await message_model.create_message(
+            assistant_message, usage=usage.to_row() if usage is not None else None, guard=guard
+        )
+
+
+async def _load_history(message_model: MessageModel, session) -> list:
+    """
+    History sent to the model: the compaction summary (if the session was compacted) plus the raw turns after it.
+    Column projections (id, role, content), not ORM entities: _build_openai_messages reads nothing else.
+    Forks also get the parent history up to the fork point.
+    """
+    forked = session.parent_session_id is not None
+    if session.compacted_through_message_id is None:
+        return await message_model.list_by_session(session.session_id, columns=HISTORY_COLUMNS, forked=forked)
+    return await message_model.list_context(
+        session.session_id, session.summary_message_id, session.compacted_through_message_id, forked=forked
+    )
+
+
+async def send_text_message(
+    db_client,
+    openai_provider,
+    session_id: int,
+    content: str,
+    embedding_provider=None,
+    user_message_id: int | None = None,
+    store_guard=None,
+) -> dict | None:
+    """
+    Send a text message: store user message, generate assistant reply (non-streaming), store it, return.
+    Use for non-streaming clients. Pass `user_message_id` when the user message is already stored (chat jobs), and
+    `store_guard` to make storing the reply conditional (see MessageModel.create_message; None when refused).
+    """
+    session = await SessionModel(db_client).get_by_id(session_id)
     if not session:
         return None
-    agent = await agent_model.get_by_id(session.agent_id)
+    agent = await AgentModel(db_client).get_by_id(session.agent_id)
     if not agent:
         return None
-
-    user_message = Message(session_id=session_id, role=OpenAIEnums.ROLE_USER.value, content=content)
-    await message_model.create_message(user_message)
-
-    history = await message_model.list_by_session(session_id)
-    openai_messages = _build_openai_messages(agent.prompt, history)
+    return await reply_to_message(
+        db_client,
+        openai_provider,
+        session,
+        agent,
+        content,
+        embedding_provider=embedding_provider,
+        user_message_id=user_message_id,
+        store_guard=store_guard,
+    )
+
+
+async def reply_to_message(
+    db_client,
+    openai_provider,
+    session,
+    agent,
+    content: str,
+    embedding_provider=None,
+    user_message_id: int | None = None,
+    store_guard=None,
+) -> dict | None:
+    """
+    The body of send_text_message for an already loaded session and agent (batch callers load them in bulk).
+    Returns the stored assistant message dict, or None on LLM error.
+    """
+    message_model = MessageModel(db_client)
+    session_id = session.session_id
+    if user_message_id is None:
+        user_message = Message(session_id=session_id, role=OpenAIEnums.ROLE_USER.value, content=content)
+        await message_model.create_message(user_message)
+
+    history = await _load_history(message_model, session)
+    knowledge = await retrieve_context(db_client, embedding_provider, agent.agent_id, content)
+    openai_messages = _build_openai_messages(agent.prompt, history, knowledge)
+    usage = _TurnUsage(openai_provider, session)
+    tools = _Tools(agent, db_client, embedding_provider)
     try:
-        assistant_content = openai_provider.generate_chat(openai_messages)
-    except (APIConnectionError, httpx.ConnectError):
+        assistant_content = await _generate(openai_provider, openai_messages, usage, tools)
+    except connection_errors():
         return None
     if assistant_content is None:
         return None
 
-    assistant_message = Message(session_id=session_id, role=OpenAIEnums.ROLE_ASSISTANT.value, content=assistant_content)
-    await message_model.create_message(assistant_message)
-    session.updated_at = datetime.now(timezone.utc)
-    await session_model.update_session(session)
-
-    return _message_to_dict(assistant_message)
+    assistant_message = await _store_assistant_message(
+        message_model, session_id, assistant_content, usage=usage, guard=store_guard
+    )
+    return _message_to_dict(assistant_message) if assistant_message is not None else None
 
 
-async def stream_text_message(db_client, openai_provider, session_id: int, content: str):
+async def stream_text_message(
+    db_client, openai_provider, session_id: int, content: str, embedding_provider=None
+):
     """
     Send a text message with streaming: store user message, stream LLM response, persist assistant message when done.
     Yields SSE-style text chunks (data: {"content": chunk}); after stream, saves assistant message to DB.
+    Model deltas are coalesced per SSE_COALESCE_WINDOW_MS / SSE_COALESCE_MAX_BYTES (first delta is sent at once).
+    Routes run it in the replay buffer's background task (helpers/stream_replay.py), so a client disconnect alone does
+    not stop it: the generation is cancelled once no client has been attached for STREAM_RESUME_GRACE_SECONDS. Then
+    the upstream LLM stream is closed and the partial answer is stored with TRUNCATED_MARKER.
     """
-    session_model = SessionModel(db_client)
-    message_model = MessageModel(db_client)
-    agent_model = AgentModel(db_client)
-
-    session = await session_model.get_by_id(session_id)
+    session = await SessionModel(db_client).get_by_id(session_id)
     if not session:
         yield 'data: {"error": "Session not found"}\n\n'
         return
-    agent = await agent_model.get_by_id(session.agent_id)
+    agent = await AgentModel(db_client).get_by_id(session.agent_id)
     if not agent:
         yield 'data: {"error": "Agent not found"}\n\n'
         return
+    events = stream_reply_events(
+        db_client, openai_provider, session, agent, content, embedding_provider=embedding_provider
+    )
+    async with aclosing(events):
+        async for event in events:
+            yield f"data: {json.dumps(event)}\n\n"
+
+
+async def stream_reply_events(
+    db_client, openai_provider, session, agent, content: str, embedding_provider=None
+):
+    """
+    The body of stream_text_message for an already loaded session and agent (fan-out streams several at once).
+    Yields event dicts: {"content": chunk} per coalesced delta, then {"done": True}, or {"error": ...}.
+    """
+    message_model = MessageModel(db_client)
+    session_id = session.session_id
 
     user_message = Message(session_id=session_id, role=OpenAIEnums.ROLE_USER.value, content=content)
     await message_model.create_message(user_message)
 
-    history = await message_model.list_by_session(session_id)
-    openai_messages = _build_openai_messages(agent.prompt, history)
+    history = await _load_history(message_model, session)
+    knowledge = await retrieve_context(db_client, embedding_provider, agent.agent_id, content)
+    openai_messages = _build_openai_messages(agent.prompt, history, knowledge)
     accumulated = []
+    truncated = False
+    usage = _TurnUsage(openai_provider, session)
     try:
-        for chunk in openai_provider.generate_chat_stream(openai_messages):
-            accumulated.append(chunk)
-            yield f"data: {json.dumps({'content': chunk})}\n\n"
-    except (APIConnectionError, httpx.ConnectError):
-        yield f'data: {json.dumps({"error": "Connection to LLM failed. Check OPENAI_API_KEY and network."})}\n\n'
+        settings = get_settings()
+        deltas = coalesce_text(
+            _stream_reply(openai_provider, openai_messages, usage, _Tools(agent, db_client, embedding_provider)),
+            settings.SSE_COALESCE_WINDOW_MS,
+            settings.SSE_COALESCE_MAX_BYTES,
+        )
+        async with aclosing(deltas):
+            async for chunk in deltas:
+                usage.first_token()
+                accumulated.append(chunk)
+                yield {"content": chunk}
+    except (asyncio.CancelledError, GeneratorExit):
+        truncated = True
+        raise
+    except connection_errors():
+        yield {"error": "Connection to LLM failed. Check OPENAI_API_KEY and network."}
         return
     finally:
+        if truncated:
+            metrics.increment("stream_cancellations_total", route="text")
         full_content = "".join(accumulated)
         if full_content:
-            assistant_message = Message(
-                session_id=session_id,
-                role=OpenAIEnums.ROLE_ASSISTANT.value,
-                content=full_content,
-            )
-            await message_model.create_message(assistant_message)
-            session.updated_at = datetime.now(timezone.utc)
-            await session_model.update_session(session)
-    yield 'data: {"done": true}\n\n'
-
-
-_SENTENCE_END = re.compile(r'(?<=[.!?。？！])\s+')
-
-
-def _split_sentences(text: str) -> list[str]:
-    """Split text on sentence-ending punctuation followed by whitespace."""
-    parts = _SENTENCE_END.split(text)
-    return [p for p in parts if p.strip()]
+            await _store_assistant_message(message_model, session_id, full_content, truncated=truncated, usage=usage)
+    if truncated:
+        return
+    yield {"done": True}
 
 
-def run_voice_stt(openai_provider, audio_bytes: bytes, audio_filename: str = "audio.webm") -> tuple[str | None, str | None]:
+async def run_voice_stt(openai_provider, audio_bytes: bytes, audio_filename: str = "audio.webm") -> tuple[str | None, str | None]:
     """
     Run STT separately so the router can return a proper error HTTP response
-    before committing to a streaming response.
+    before committing to a streaming response. Long clips are transcribed in parallel segments (controllers/transcription.py).
     Returns (transcribed_text, error_message).
     """
     try:
-        text = openai_provider.speech_to_text(audio_bytes, filename=audio_filename)
-    except (APIConnectionError, httpx.ConnectError):
+        text = await transcribe(openai_provider, audio_bytes, filename=audio_filename)
+    except connection_errors():
         return None, "Connection to LLM failed. Check OPENAI_API_KEY and network."
     except Exception as e:
         return None, f"Speech-to-text error: {str(e)}"
@@ -147,16 +415,22 @@ def run_voice_stt(openai_provider, audio_bytes: bytes, audio_filename: str = "au
     return text.strip(), None
 
 
-async def stream_voice_after_stt(db_client, openai_provider, session_id: int, user_text: str):
+async def stream_voice_after_stt(
+    db_client, openai_provider, session_id: int, user_text: str, embedding_provider=None
+):
     """
     Streaming voice flow (called after STT succeeds):
-    Store user message -> stream LLM by sentences -> TTS each sentence -> yield events.
+    Store user message -> stream LLM -> segment incrementally (SentenceSegmenter: an early first clause, then
+    sentences) -> TTS each segment -> yield events.
     Yields (event_type, data) tuples:
       ("user_text", str)       — the transcribed user message (show in UI immediately)
       ("assistant_text", str)  — LLM text chunk (show in UI as it streams)
       ("audio", bytes)         — raw mp3 bytes for playback
       ("error", str)           — error (stream will end)
       ("done", "")             — signals end of stream
+    When the generation is cancelled (the replay buffer gives up STREAM_RESUME_GRACE_SECONDS after the last client
+    detached), the LLM stream and any in-flight TTS synthesis are closed, no further sentences are synthesized, and
+    the partial answer is stored with TRUNCATED_MARKER.
     """
     session_model = SessionModel(db_client)
     message_model = MessageModel(db_client)
@@ -176,46 +450,60 @@ async def stream_voice_after_stt(db_client, openai_provider, session_id: int, us
 
     yield ("user_text", user_text)
 
-    history = await message_model.list_by_session(session_id)
-    openai_messages = _build_openai_messages(agent.prompt, history)
+    history = await _load_history(message_model, session)
+    knowledge = await retrieve_context(db_client, embedding_provider, agent.agent_id, user_text)
+    openai_messages = _build_openai_messages(agent.prompt, history, knowledge)
 
     voice = getattr(openai_provider, "tts_voice", "alloy") or "alloy"
+    settings = get_settings()
+    segmenter = SentenceSegmenter(
+        first_clause_max_words=settings.VOICE_FIRST_SEGMENT_MAX_WORDS,
+        min_chars=settings.VOICE_SEGMENT_MIN_CHARS,
+        max_chars=settings.VOICE_SEGMENT_MAX_CHARS,
+    )
     accumulated_llm = []
-    sentence_buffer = ""
+    truncated = False
+    completed = False
+    usage = _TurnUsage(openai_provider, session)
+    llm_chunks = _stream_reply(openai_provider, openai_messages, usage, _Tools(agent, db_client, embedding_provider))
 
     try:
-        for chunk in openai_provider.generate_chat_stream(openai_messages):
-            accumulated_llm.append(chunk)
-            sentence_buffer += chunk
-            yield ("assistant_text", chunk)
-
-            sentences = _split_sentences(sentence_buffer)
-            if len(sentences) > 1:
-                for sentence in sentences[:-1]:
-                    for audio_chunk in openai_provider.text_to_speech_stream(sentence, voice=voice):
+        async with aclosing(llm_chunks) as llm_stream:
+            async for chunk in llm_stream:
+                usage.first_token()
+                accumulated_llm.append(chunk)
+                yield ("assistant_text", chunk)
+
+                for sentence in segmenter.feed(chunk):
+                    async with aclosing(_iterate_in_thread(openai_provider.text_to_speech_stream(sentence, voice=voice))) as audio:
+                        async for audio_chunk in audio:
+                            usage.tts_audio_bytes += len(audio_chunk)
+                            yield ("audio", audio_chunk)
+
+        tail = segmenter.flush()
+        if tail:
+            try:
+                async with aclosing(_iterate_in_thread(openai_provider.text_to_speech_stream(tail, voice=voice))) as audio:
+                    async for audio_chunk in audio:
+                        usage.tts_audio_bytes += len(audio_chunk)
                         yield ("audio", audio_chunk)
-                sentence_buffer = sentences[-1]
-    except (APIConnectionError, httpx.ConnectError):
+            except connection_errors():
+                yield ("error", "Connection to LLM failed during final TTS.")
+                return
+        completed = True
+    except (asyncio.CancelledError, GeneratorExit):
+        truncated = True
+        raise
+    except connection_errors():
         yield ("error", "Connection to LLM failed. Check OPENAI_API_KEY and network.")
         return
+    finally:
+        if truncated:
+            metrics.increment("stream_cancellations_total", route="voice")
+        full_content = "".join(accumulated_llm)
+        if full_content and (completed or truncated):
+            await _store_assistant_message(message_model, session_id, full_content, truncated=truncated, usage=usage)
 
-    if sentence_buffer.strip():
-        try:
-            for audio_chunk in openai_provider.text_to_speech_stream(sentence_buffer, voice=voice):
-                yield ("audio", audio_chunk)
-        except (APIConnectionError, httpx.ConnectError):
-            yield ("error", "Connection to LLM failed during final TTS.")
-            return
-
-    full_content = "".join(accumulated_llm)
-    if full_content:
-        assistant_message = Message(
-            session_id=session_id,
-            role=OpenAIEnums.ROLE_ASSISTANT.value,
-            content=full_content,
-        )
-        await message_model.create_message(assistant_message)
-        session.updated_at = datetime.now(timezone.utc)
-        await session_model.update_session(session)
-
+    if truncated:
+        return
     yield ("done", "")
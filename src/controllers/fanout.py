@@ -0,0 +1,57 @@
+"""
+Fan-out chat: one user message sent to several agents at once (A/B comparisons, ensembles).
+
+Every target is a (session, agent) pair; each runs conversation.stream_reply_events concurrently, so the turn
+stores its user message and reply in its own session exactly like a single streamed message. Their events are
+merged into one stream in arrival order, each tagged with the target's agent_id and session_id. The whole
+fan-out takes as long as the slowest agent.
+"""
+import asyncio
+import logging
+from contextlib import aclosing
+
+from controllers import conversation
+
+logger = logging.getLogger(__name__)
+
+_FAN_OUT_END = object()
+
+
+def _tagged(session, event: dict) -> dict:
+    return {"agent_id": session.agent_id, "session_id": session.session_id, **event}
+
+
+async def fan_out(db_client, openai_provider, targets: list[tuple], content: str, embedding_provider=None):
+    """
+    Yield the tagged events of all targets ({"agent_id", "session_id", "content" | "done" | "error"}) as they
+    arrive; one target failing ends only its own events (with an error). Closing the generator early cancels
+    the generations still running; each stores its partial reply as truncated.
+    """
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def run_target(session, agent) -> None:
+        stream = conversation.stream_reply_events(
+            db_client, openai_provider, session, agent, content, embedding_provider=embedding_provider
+        )
+        try:
+            async with aclosing(stream):
+                async for event in stream:
+                    events.put_nowait(_tagged(session, event))
+        except Exception:
+            logger.exception("Fan-out generation for session %s failed", session.session_id)
+            events.put_nowait(_tagged(session, {"error": "Generation failed"}))
+
+    tasks = [asyncio.create_task(run_target(session, agent)) for session, agent in targets]
+    done = asyncio.gather(*tasks)
+    done.add_done_callback(lambda _: events.put_nowait(_FAN_OUT_END))
+    try:
+        while True:
+            event = await events.get()
+            if event is _FAN_OUT_END:
+                break
+            yield event
+        await done
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
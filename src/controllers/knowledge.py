@@ -0,0 +1,103 @@
+"""
+Knowledge base: ingest agent documents (chunk -> embed in batches -> store in pgvector)
+and retrieve the top-k chunks for a user message.
+"""
+import asyncio
+import logging
+from typing import AsyncIterable
+
+from helpers.config import get_settings
+from helpers.text_chunker import estimate_tokens, iter_chunks
+from models.KnowledgeModel import KnowledgeModel
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+async def ingest_document(
+    db_client,
+    embedding_provider,
+    agent_id: int,
+    document_name: str,
+    pieces: AsyncIterable[str],
+) -> dict:
+    """
+    Ingest one document for an agent, replacing any previous version with the same name. The previous version is
+    deleted only once every new chunk is stored; if ingestion fails, the new chunks are deleted and it stays as is.
+
+    Pipeline: streaming chunker -> batches of EMBEDDING_BATCH_SIZE -> bounded queue -> EMBEDDING_MAX_CONCURRENCY
+    workers (embed in a thread, bulk insert). The queue holds at most one batch per worker, so when embedding
+    is slower than reading, the producer (and therefore the upload read) waits: backpressure.
+    Returns {"document_name", "chunks", "tokens"}.
+    """
+    settings = get_settings()
+    batch_size = max(1, settings.EMBEDDING_BATCH_SIZE)
+    concurrency = max(1, settings.EMBEDDING_MAX_CONCURRENCY)
+    model = KnowledgeModel(db_client)
+    previous_version = await model.last_chunk_id(agent_id, document_name)
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+    totals = {"chunks": 0, "tokens": 0}
+
+    async def worker():
+        while True:
+            batch = await queue.get()
+            if batch is _DONE:
+                return
+            vectors = await asyncio.to_thread(embedding_provider.embed_texts, [c["content"] for c in batch])
+            for chunk, vector in zip(batch, vectors):
+                chunk["embedding"] = vector
+            await model.create_chunks(batch)
+            totals["chunks"] += len(batch)
+            totals["tokens"] += sum(c["token_count"] for c in batch)
+
+    async def produce():
+        batch = []
+        index = 0
+        async for content in iter_chunks(pieces, settings.KNOWLEDGE_CHUNK_WORDS, settings.KNOWLEDGE_CHUNK_OVERLAP_WORDS):
+            batch.append({
+                "agent_id": agent_id,
+                "document_name": document_name,
+                "chunk_index": index,
+                "content": content,
+                "token_count": estimate_tokens(content),
+            })
+            index += 1
+            if len(batch) >= batch_size:
+                await queue.put(batch)
+                batch = []
+        if batch:
+            await queue.put(batch)
+        for _ in range(concurrency):
+            await queue.put(_DONE)
+
+    tasks = [asyncio.create_task(produce())] + [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await model.delete_document(agent_id, document_name, after_chunk_id=previous_version)
+        raise
+    if previous_version is not None:
+        await model.delete_document(agent_id, document_name, through_chunk_id=previous_version)
+    logger.info(
+        "Ingested document %r for agent %s: %s chunks, ~%s tokens",
+        document_name, agent_id, totals["chunks"], totals["tokens"],
+    )
+    return {"document_name": document_name, **totals}
+
+
+async def retrieve_context(db_client, embedding_provider, agent_id: int, query: str, top_k: int | None = None) -> list[str]:
+    """Top-k knowledge chunk contents for `query`, nearest first. Empty when the agent has no knowledge base."""
+    if embedding_provider is None or not query:
+        return []
+    model = KnowledgeModel(db_client)
+    if not await model.has_chunks(agent_id):
+        return []
+    top_k = top_k or get_settings().KNOWLEDGE_TOP_K
+    vector = await asyncio.to_thread(embedding_provider.embed_text, query)
+    chunks = await model.search_similar(agent_id, vector, top_k)
+    return [c.content for c in chunks]
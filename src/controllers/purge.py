@@ -0,0 +1,74 @@
+"""
+Background purge of soft-deleted agents and sessions.
+
+DELETE endpoints only set deleted_at (every query filters those rows out), so they return at once however much
+data hangs off the row. This worker then removes the rows in bounded batches, each its own short transaction:
+messages of deleted sessions and knowledge chunks of deleted agents first, then the session rows, then the agent
+rows; anything still attached to a parent (chat jobs, rows written meanwhile) goes with the database's
+ON DELETE CASCADE. A session with forks is kept until its forks are gone (their history reads its messages), so
+a chain of deleted forks is purged leaf first, one level per pass. Nothing is loaded into the ORM session.
+Progress is the data itself, so a pass interrupted by a restart simply continues on the next one.
+"""
+import asyncio
+import logging
+
+from helpers import metrics
+from helpers.config import get_settings
+from models.PurgeModel import PurgeModel
+
+logger = logging.getLogger(__name__)
+
+
+class PurgeWorker:
+    def __init__(self, db_client, settings=None):
+        self.db_client = db_client
+        self.settings = settings or get_settings()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="purge-worker")
+            logger.info("Purge worker started.")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            logger.info("Purge worker stopped.")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Purge pass failed")
+            await asyncio.sleep(self.settings.PURGE_INTERVAL_SECONDS)
+
+    async def run_once(self) -> dict[str, int]:
+        """Purge everything currently soft-deleted. Returns the number of rows deleted per table."""
+        model = PurgeModel(self.db_client)
+        batch_size = self.settings.PURGE_BATCH_SIZE
+        steps = (
+            ("messages", model.purge_messages),
+            ("knowledge_chunks", model.purge_knowledge_chunks),
+            ("sessions", model.purge_sessions),
+            ("agents", model.purge_agents),
+        )
+        deleted = {}
+        for table, purge_batch in steps:
+            total = 0
+            while True:
+                count = await purge_batch(batch_size)
+                total += count
+                if count < batch_size:
+                    break
+                await asyncio.sleep(0)  # let requests in between batches
+            deleted[table] = total
+            if total:
+                metrics.increment("purged_rows_total", total, table=table)
+        if any(deleted.values()):
+            logger.info("Purged soft-deleted rows: %s", deleted)
+        return deleted
@@ -0,0 +1,264 @@
+"""
+Agent tools: local Python callables the model may call during a reply (OpenAI function calling).
+
+Tools are registered by name in a ToolRegistry; each agent lists the names it may use (agents.tools). When the model
+answers with tool calls (a ToolCallRequest from stores/LLM), run_tool_calls runs all calls of that turn concurrently,
+each under its own timeout, so a turn calling three tools takes as long as the slowest one, not the sum. Tools marked
+with cache_ttl_seconds (deterministic ones) reuse results for identical arguments. Failures (unknown tool, bad
+arguments, timeout, exception) become the call's result, so the model can recover instead of the turn failing.
+"""
+import ast
+import asyncio
+import inspect
+import json
+import logging
+import operator
+from datetime import datetime, timezone
+from functools import partial
+
+import anyio
+
+from controllers.knowledge import retrieve_context
+from helpers import metrics
+from helpers.config import get_settings
+from helpers.local_cache import get_cache
+
+logger = logging.getLogger(__name__)
+
+_NO_PARAMETERS = {"type": "object", "properties": {}}
+
+
+class ToolContext:
+    """The turn a tool runs in; handlers receive it by declaring a `context` parameter."""
+
+    def __init__(self, agent_id: int, db_client=None, embedding_provider=None):
+        self.agent_id = agent_id
+        self.db_client = db_client
+        self.embedding_provider = embedding_provider
+
+
+class Tool:
+    """
+    A named handler: async functions run on the event loop, plain functions in a worker thread (abandoned, not
+    waited for, when they time out). `parameters` is the JSON schema of the keyword arguments.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler,
+        description: str,
+        parameters: dict | None = None,
+        timeout_seconds: float | None = None,
+        cache_ttl_seconds: float = 0,
+    ):
+        self.name = name
+        self.handler = handler
+        self.description = description
+        self.parameters = parameters or _NO_PARAMETERS
+        self.timeout_seconds = timeout_seconds
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.takes_context = "context" in inspect.signature(handler).parameters
+        self.is_async = inspect.iscoroutinefunction(handler)
+
+    def spec(self) -> dict:
+        """The function definition sent to the model."""
+        return {
+            "type": "function",
+            "function": {"name": self.name, "description": self.description, "parameters": self.parameters},
+        }
+
+
+class ToolRegistry:
+    def __init__(self):
+        self._tools: dict[str, Tool] = {}
+
+    def register(self, tool: Tool) -> Tool:
+        self._tools[tool.name] = tool
+        return tool
+
+    def unregister(self, name: str) -> None:
+        self._tools.pop(name, None)
+
+    def tool(self, name: str | None = None, description: str = "", parameters: dict | None = None, **options):
+        """Decorator form of register: @registry.tool(description=..., parameters=...)."""
+        def decorator(handler):
+            self.register(Tool(name or handler.__name__, handler, description or (handler.__doc__ or "").strip(), parameters, **options))
+            return handler
+        return decorator
+
+    def get(self, name: str) -> Tool | None:
+        return self._tools.get(name)
+
+    def all(self) -> list[Tool]:
+        return [self._tools[name] for name in sorted(self._tools)]
+
+    def unknown(self, names) -> list[str]:
+        return [name for name in names if name not in self._tools]
+
+    def specs(self, names) -> list[dict]:
+        """Function definitions for the given tool names (unregistered names are skipped)."""
+        return [self._tools[name].spec() for name in names if name in self._tools]
+
+
+def _error(message: str) -> str:
+    return json.dumps({"error": message})
+
+
+def _cache_key(tool: Tool, arguments: dict, context: ToolContext) -> str:
+    key = json.dumps(arguments, sort_keys=True, default=str)
+    return f"{context.agent_id}:{key}" if tool.takes_context else key
+
+
+async def _call(tool: Tool, arguments: dict, context: ToolContext):
+    kwargs = {**arguments, "context": context} if tool.takes_context else arguments
+    if tool.is_async:
+        return await tool.handler(**kwargs)
+    return await anyio.to_thread.run_sync(partial(tool.handler, **kwargs), abandon_on_cancel=True)
+
+
+async def _run_one(registry: ToolRegistry, call: dict, allowed: set[str], context: ToolContext) -> str:
+    name = call["name"]
+    tool = registry.get(name) if name in allowed else None
+    if tool is None:
+        metrics.increment("tool_calls_total", tool=name, outcome="unknown")
+        return _error(f"Unknown tool: {name}")
+    try:
+        arguments = json.loads(call["arguments"] or "{}")
+    except ValueError:
+        arguments = None
+    if not isinstance(arguments, dict):
+        metrics.increment("tool_calls_total", tool=name, outcome="bad_arguments")
+        return _error("Arguments must be a JSON object")
+
+    settings = get_settings()
+    cache = None
+    if tool.cache_ttl_seconds > 0:
+        cache = get_cache(f"tool:{name}", tool.cache_ttl_seconds, settings.TOOL_CACHE_MAX_ENTRIES)
+        cached = cache.get(_cache_key(tool, arguments, context))
+        if cached is not None:
+            metrics.increment("tool_calls_total", tool=name, outcome="cached")
+            return cached
+
+    timeout = tool.timeout_seconds or settings.TOOL_TIMEOUT_SECONDS
+    try:
+        with anyio.fail_after(timeout):
+            result = await _call(tool, arguments, context)
+        content = result if isinstance(result, str) else json.dumps(result, default=str)
+    except TimeoutError:
+        metrics.increment("tool_calls_total", tool=name, outcome="timeout")
+        return _error(f"Tool {name} timed out after {timeout:g} s")
+    except TypeError as e:  # arguments not matching the handler's signature
+        metrics.increment("tool_calls_total", tool=name, outcome="bad_arguments")
+        return _error(str(e))
+    except Exception as e:
+        logger.warning("Tool %s failed", name, exc_info=True)
+        metrics.increment("tool_calls_total", tool=name, outcome="error")
+        return _error(f"Tool {name} failed: {e}")
+
+    if cache is not None:
+        cache.set(_cache_key(tool, arguments, context), content)
+    metrics.increment("tool_calls_total", tool=name, outcome="ok")
+    return content
+
+
+async def run_tool_calls(registry: ToolRegistry, calls: list[dict], allowed, context: ToolContext) -> list[dict]:
+    """
+    Run one model turn's tool calls concurrently; returns the "tool" messages to send back, in call order.
+    Only tools in `allowed` (the agent's tools) may run.
+    """
+    allowed = set(allowed)
+    contents = await asyncio.gather(*(_run_one(registry, call, allowed, context) for call in calls))
+    return [
+        {"role": "tool", "tool_call_id": call["id"], "content": content}
+        for call, content in zip(calls, contents)
+    ]
+
+
+# ----- Built-in tools -----
+
+_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+}
+_MAX_EXPRESSION_CHARS = 200
+_MAX_EXPONENT = 100
+_MAX_MAGNITUDE = 1e100
+
+
+def _bounded(value):
+    # Every operand and intermediate result stays within ±1e100, so one operation is at most a 1e10000 power
+    if abs(value) > _MAX_MAGNITUDE:
+        raise ValueError(f"Numbers are limited to ±{_MAX_MAGNITUDE:g}")
+    return value
+
+
+def _evaluate(node):
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body)
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return _bounded(node.value)
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _OPERATORS:
+        return _OPERATORS[type(node.op)](_evaluate(node.operand))
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+        left, right = _evaluate(node.left), _evaluate(node.right)
+        if isinstance(node.op, ast.Pow) and abs(right) > _MAX_EXPONENT:
+            raise ValueError(f"Exponents are limited to {_MAX_EXPONENT}")
+        return _bounded(_OPERATORS[type(node.op)](left, right))
+    raise ValueError("Only numbers and + - * / // % ** are allowed")
+
+
+def calculator(expression: str):
+    """Evaluate an arithmetic expression (numbers, + - * / // % ** and parentheses)."""
+    if len(expression) > _MAX_EXPRESSION_CHARS:
+        raise ValueError(f"Expressions are limited to {_MAX_EXPRESSION_CHARS} characters")
+    return {"expression": expression, "result": _evaluate(ast.parse(expression, mode="eval"))}
+
+
+def current_time():
+    """Current date and time (UTC)."""
+    return {"utc": datetime.now(timezone.utc).isoformat()}
+
+
+async def search_knowledge(query: str, context: ToolContext):
+    """Search the agent's knowledge base documents."""
+    excerpts = await retrieve_context(context.db_client, context.embedding_provider, context.agent_id, query)
+    return {"excerpts": excerpts}
+
+
+def _default_registry() -> ToolRegistry:
+    registry = ToolRegistry()
+    registry.register(Tool("current_time", current_time, current_time.__doc__))
+    registry.register(Tool(
+        "calculator",
+        calculator,
+        calculator.__doc__,
+        {"type": "object", "properties": {"expression": {"type": "string"}}, "required": ["expression"]},
+        cache_ttl_seconds=3600,
+    ))
+    registry.register(Tool(
+        "search_knowledge",
+        search_knowledge,
+        search_knowledge.__doc__,
+        {"type": "object", "properties": {"query": {"type": "string"}}, "required": ["query"]},
+        cache_ttl_seconds=60,
+    ))
+    return registry
+
+
+_registry: ToolRegistry | None = None
+
+
+def get_tool_registry() -> ToolRegistry:
+    """The process-wide registry with the built-in tools; register application tools on it at startup."""
+    global _registry
+    if _registry is None:
+        _registry = _default_registry()
+    return _registry
@@ -0,0 +1,119 @@
+"""
+Speech-to-text for voice uploads. Long clips (decodable to PCM, see helpers/audio.py) are split at silence and
+the segments transcribed concurrently (at most STT_MAX_PARALLEL at once), then stitched back together in order,
+so latency tracks the longest segment instead of the whole clip. Anything else is sent as a single request. Decoding,
+normalizing and splitting are CPU-bound and run in a worker thread, off the event loop.
+
+Decodable uploads are normalized first (STT_NORMALIZE_ENABLED): leading/trailing silence trimmed, downmixed to
+mono, downsampled to STT_SAMPLE_RATE, re-encoded as 16-bit WAV. That is all speech models use anyway, so the
+upload shrinks without changing the transcript; a clip that is silent throughout skips STT altogether.
+"""
+import asyncio
+import logging
+from functools import partial
+
+import anyio
+
+from helpers import metrics
+from helpers.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+async def _speech_to_text(openai_provider, audio_bytes: bytes, filename: str) -> str | None:
+    return await anyio.to_thread.run_sync(partial(openai_provider.speech_to_text, audio_bytes, filename=filename))
+
+
+def _transcribe_segment(openai_provider, pcm, start: int, end: int, filename: str) -> str | None:
+    """Encode one segment and send it (blocking; runs in a worker thread)."""
+    from helpers.audio import encode_wav
+
+    return openai_provider.speech_to_text(encode_wav(pcm.slice(start, end)), filename=filename)
+
+
+def _wav_size(pcm) -> int:
+    return 44 + pcm.samples.shape[0] * pcm.channels * 2  # 16-bit PCM plus the RIFF header
+
+
+def _record_bytes_saved(original: int, normalized: int) -> None:
+    saved = max(0, original - normalized)
+    metrics.increment("stt_bytes_saved_total", saved)
+    logger.debug("Normalized voice upload: %s -> %s bytes (%s saved)", original, normalized, saved)
+
+
+class _PreparedUpload:
+    """What to send for speech-to-text: one request (`audio`), silence-split `ranges` of `pcm`, or nothing (silent)."""
+
+    def __init__(self, audio: bytes | None = None, filename: str | None = None, pcm=None, ranges=None, normalized_size=None):
+        self.audio = audio
+        self.filename = filename
+        self.pcm = pcm
+        self.ranges = ranges
+        self.normalized_size = normalized_size  # bytes sent after normalization, None when not normalized
+
+    @property
+    def silent(self) -> bool:
+        return self.audio is None and self.ranges is None
+
+
+def _prepare(audio_bytes: bytes, filename: str, settings) -> _PreparedUpload:
+    """Decode, normalize and split the upload; CPU-bound, so transcribe runs it in a worker thread."""
+    # Imported here: NumPy is only needed once a voice message arrives, not at application startup
+    from helpers import audio as audio_helpers
+
+    pcm = audio_helpers.decode_audio(audio_bytes, filename)
+    normalized_size = None
+    if pcm is not None and settings.STT_NORMALIZE_ENABLED:
+        pcm = audio_helpers.normalize_for_stt(
+            pcm,
+            target_rate=settings.STT_SAMPLE_RATE,
+            silence_db=settings.STT_SILENCE_THRESHOLD_DB,
+            padding_ms=settings.STT_TRIM_PADDING_MS,
+        )
+        if pcm is None:
+            return _PreparedUpload()
+        if pcm.duration <= settings.STT_CHUNK_MAX_SECONDS:
+            normalized = audio_helpers.encode_wav(pcm)
+            return _PreparedUpload(normalized, "audio.wav", normalized_size=len(normalized))
+        # Segments are encoded from the normalized PCM later; 16-bit mono at STT_SAMPLE_RATE
+        normalized_size = _wav_size(pcm)
+    if pcm is None or pcm.duration <= settings.STT_CHUNK_MAX_SECONDS:
+        return _PreparedUpload(audio_bytes, filename)
+
+    ranges = audio_helpers.split_at_silence(
+        pcm,
+        target_seconds=settings.STT_CHUNK_SECONDS,
+        max_seconds=settings.STT_CHUNK_MAX_SECONDS,
+        silence_db=settings.STT_SILENCE_THRESHOLD_DB,
+    )
+    return _PreparedUpload(pcm=pcm, ranges=ranges, normalized_size=normalized_size)
+
+
+async def transcribe(openai_provider, audio_bytes: bytes, filename: str = "audio.webm", settings=None) -> str | None:
+    """Transcript of the upload ("" for a silent clip), or None when any transcription request failed."""
+    settings = settings or get_settings()
+    upload = await anyio.to_thread.run_sync(_prepare, audio_bytes, filename, settings)
+    if upload.silent:
+        metrics.increment("stt_silent_clips_total")
+        logger.info("Voice upload (%s bytes) is silent; skipping speech-to-text", len(audio_bytes))
+        return ""
+    if upload.normalized_size is not None:
+        _record_bytes_saved(len(audio_bytes), upload.normalized_size)
+    if upload.audio is not None:
+        return await _speech_to_text(openai_provider, upload.audio, upload.filename)
+
+    ranges = upload.ranges
+    metrics.increment("stt_chunks_total", len(ranges))
+    semaphore = asyncio.Semaphore(settings.STT_MAX_PARALLEL)
+
+    async def transcribe_segment(index: int, start: int, end: int) -> str | None:
+        async with semaphore:
+            return await anyio.to_thread.run_sync(
+                _transcribe_segment, openai_provider, upload.pcm, start, end, f"segment-{index}.wav"
+            )
+
+    texts = await asyncio.gather(*(transcribe_segment(i, start, end) for i, (start, end) in enumerate(ranges)))
+    if any(text is None for text in texts):
+        logger.warning("Transcription of %s of %s segments failed", sum(t is None for t in texts), len(texts))
+        return None
+    return " ".join(text.strip() for text in texts if text and text.strip())
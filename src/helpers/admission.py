@@ -0,0 +1,121 @@
+"""
+Admission control for chat turns: reject new work early instead of queueing it behind an overloaded provider.
+
+Every text or voice turn asks for a ticket before any work starts and holds it until the reply is complete
+(for streams: until the generation task ends). A ticket is refused when
+  - the event loop is lagging (the loop monitor's sampler: how late a periodic wake-up fires) -> 503
+  - too many provider calls are waiting for a worker thread (anyio's default limiter)        -> 503
+  - the endpoint type ("text", "voice") is at its in-flight budget                           -> 503
+  - the session's agent is at its in-flight budget (one busy agent cannot starve the others) -> 429
+Rejections carry Retry-After. Counters are per worker process.
+"""
+import logging
+from collections import defaultdict
+
+import anyio
+
+from helpers import metrics
+from helpers.config import get_settings
+from helpers.loop_monitor import LoopLagSampler
+
+logger = logging.getLogger(__name__)
+
+TEXT = "text"
+VOICE = "voice"
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+def provider_queue_depth() -> int:
+    """Blocking provider calls (LLM, TTS streams) waiting for a free anyio worker thread."""
+    return anyio.to_thread.current_default_thread_limiter().statistics().tasks_waiting
+
+
+class AdmissionTicket:
+    def __init__(self, controller: "AdmissionController | None", kind: str, agent_id: int | None):
+        self._controller = controller
+        self.kind = kind
+        self.agent_id = agent_id
+        self._released = False
+
+    def release(self) -> None:
+        """Idempotent: safe to call from both a finally block and a task done-callback."""
+        if not self._released:
+            self._released = True
+            if self._controller is not None:
+                self._controller._release(self)
+
+    def __enter__(self) -> "AdmissionTicket":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+class AdmissionController:
+    def __init__(self, settings=None, queue_depth=provider_queue_depth, sampler: LoopLagSampler | None = None):
+        """Pass the worker's shared loop lag `sampler` (started by its owner); without one the controller runs its own."""
+        self.settings = settings or get_settings()
+        self.queue_depth = queue_depth
+        self.kind_limits = {TEXT: self.settings.ADMISSION_MAX_TEXT_IN_FLIGHT, VOICE: self.settings.ADMISSION_MAX_VOICE_IN_FLIGHT}
+        self.in_flight: dict[str, int] = defaultdict(int)
+        self.agent_in_flight: dict[int, int] = defaultdict(int)
+        self._owns_sampler = sampler is None
+        self.sampler = sampler or LoopLagSampler(self.settings.ADMISSION_LAG_SAMPLE_MS / 1000)
+
+    @property
+    def loop_lag_seconds(self) -> float:
+        return self.sampler.lag_seconds
+
+    @loop_lag_seconds.setter
+    def loop_lag_seconds(self, value: float) -> None:
+        self.sampler.lag_seconds = value
+
+    def start(self) -> None:
+        if self._owns_sampler:
+            self.sampler.start()
+
+    async def stop(self) -> None:
+        if self._owns_sampler:
+            await self.sampler.stop()
+
+    def admit(self, kind: str, agent_id: int | None = None) -> AdmissionTicket:
+        """A ticket for one turn; raises AdmissionRejected when the turn should not start."""
+        if not self.settings.ADMISSION_ENABLED:
+            return AdmissionTicket(None, kind, None)
+        retry_after = self.settings.ADMISSION_RETRY_AFTER_SECONDS
+        if self.loop_lag_seconds * 1000 > self.settings.ADMISSION_MAX_LOOP_LAG_MS:
+            self._reject("loop_lag", kind)
+            raise AdmissionRejected(503, "Server overloaded; retry later", retry_after)
+        if self.queue_depth() > self.settings.ADMISSION_MAX_PROVIDER_QUEUE:
+            self._reject("provider_queue", kind)
+            raise AdmissionRejected(503, "LLM provider busy; retry later", retry_after)
+        if self.in_flight[kind] >= self.kind_limits[kind]:
+            self._reject("endpoint_budget", kind)
+            raise AdmissionRejected(503, f"Too many {kind} messages in progress; retry later", retry_after)
+        if agent_id is not None and self.agent_in_flight[agent_id] >= self.settings.ADMISSION_MAX_AGENT_IN_FLIGHT:
+            self._reject("agent_budget", kind)
+            raise AdmissionRejected(429, "Too many messages in progress for this agent; retry later", retry_after)
+        self.in_flight[kind] += 1
+        if agent_id is not None:
+            self.agent_in_flight[agent_id] += 1
+        metrics.set_gauge("admission_in_flight", self.in_flight[kind], kind=kind)
+        return AdmissionTicket(self, kind, agent_id)
+
+    def _reject(self, reason: str, kind: str) -> None:
+        metrics.increment("admission_rejections_total", reason=reason, kind=kind)
+        logger.debug("Rejected %s turn: %s", kind, reason)
+
+    def _release(self, ticket: AdmissionTicket) -> None:
+        self.in_flight[ticket.kind] -= 1
+        metrics.set_gauge("admission_in_flight", self.in_flight[ticket.kind], kind=ticket.kind)
+        if ticket.agent_id is not None:
+            self.agent_in_flight[ticket.agent_id] -= 1
+            if self.agent_in_flight[ticket.agent_id] <= 0:
+                del self.agent_in_flight[ticket.agent_id]
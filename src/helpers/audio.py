@@ -0,0 +1,208 @@
+"""
+Audio helpers for speech-to-text: decode uploads to PCM, detect silence, split long clips, re-encode as WAV.
+
+WAV (PCM) is decoded natively with the stdlib `wave` module and NumPy. Other formats (webm, mp3, ...) need a
+decoder registered with register_decoder(); without one, decode_audio() returns None and callers fall back to
+uploading the original bytes unchanged.
+"""
+import io
+import wave
+from typing import Callable
+
+import numpy as np
+
+FRAME_MS = 30  # energy analysis window
+
+
+class PcmAudio:
+    """Float32 samples in [-1, 1], shape (frames, channels)."""
+
+    def __init__(self, samples: np.ndarray, sample_rate: int):
+        self.samples = samples
+        self.sample_rate = sample_rate
+
+    @property
+    def channels(self) -> int:
+        return self.samples.shape[1]
+
+    @property
+    def duration(self) -> float:
+        return self.samples.shape[0] / self.sample_rate
+
+    def slice(self, start_frame: int, end_frame: int) -> "PcmAudio":
+        return PcmAudio(self.samples[start_frame:end_frame], self.sample_rate)
+
+
+# ----- Decoding -----
+
+_decoders: list[tuple[Callable[[bytes, str], bool], Callable[[bytes], PcmAudio]]] = []
+
+
+def register_decoder(matches: Callable[[bytes, str], bool], decode: Callable[[bytes], PcmAudio]) -> None:
+    """
+    Add a decoder for another format. `matches(data, filename)` says whether it applies; `decode(data)` returns
+    PcmAudio. Registered decoders are tried in order, after the built-in WAV decoder.
+    """
+    _decoders.append((matches, decode))
+
+
+def is_wav(data: bytes, filename: str = "") -> bool:
+    return data[:4] == b"RIFF" and data[8:12] == b"WAVE"
+
+
+def decode_wav(data: bytes) -> PcmAudio:
+    """Decode 8/16/24/32-bit integer PCM WAV."""
+    with wave.open(io.BytesIO(data), "rb") as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        sample_rate = wav.getframerate()
+        raw = wav.readframes(wav.getnframes())
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        packed = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        values = packed[:, 0] | (packed[:, 1] << 8) | (packed[:, 2] << 16)
+        values = np.where(values & 0x800000, values - (1 << 24), values)
+        samples = values.astype(np.float32) / float(1 << 23)
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / float(1 << 31)
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {width}")
+    return PcmAudio(samples.reshape(-1, channels), sample_rate)
+
+
+def decode_audio(data: bytes, filename: str = "") -> PcmAudio | None:
+    """PCM for the upload, or None when no decoder handles its format (or it cannot be decoded)."""
+    candidates = [(is_wav, decode_wav)] + _decoders
+    for matches, decode in candidates:
+        if matches(data, filename):
+            try:
+                return decode(data)
+            except (ValueError, EOFError, wave.Error):
+                return None
+    return None
+
+
+def encode_wav(audio: PcmAudio) -> bytes:
+    """16-bit PCM WAV (the compact format transcription APIs accept)."""
+    pcm = (np.clip(audio.samples, -1.0, 1.0) * 32767.0).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(audio.channels)
+        wav.setsampwidth(2)
+        wav.setframerate(audio.sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+# ----- Silence detection -----
+
+
+def frame_levels_db(audio: PcmAudio, frame_ms: int = FRAME_MS) -> np.ndarray:
+    """RMS level (dBFS) of each `frame_ms` window, loudest channel; a trailing partial window is ignored."""
+    frame_len = max(1, audio.sample_rate * frame_ms // 1000)
+    count = audio.samples.shape[0] // frame_len
+    if count == 0:
+        return np.empty(0, dtype=np.float32)
+    frames = audio.samples[: count * frame_len].reshape(count, frame_len, audio.channels)
+    rms = np.sqrt(np.mean(np.square(frames), axis=1)).max(axis=1)
+    return 20.0 * np.log10(np.maximum(rms, 1e-10))
+
+
+def split_at_silence(
+    audio: PcmAudio,
+    target_seconds: float,
+    max_seconds: float,
+    silence_db: float,
+    frame_ms: int = FRAME_MS,
+) -> list[tuple[int, int]]:
+    """
+    (start_frame, end_frame) sample ranges of roughly `target_seconds`, never longer than `max_seconds`.
+    Each cut is placed in the middle of the first pause (windows below `silence_db`) between target and max, so
+    words are not cut in half; without any pause the cut falls at the quietest window available.
+    """
+    levels = frame_levels_db(audio, frame_ms)
+    frame_len = max(1, audio.sample_rate * frame_ms // 1000)
+    total = audio.samples.shape[0]
+    target = max(1, int(target_seconds * 1000 / frame_ms))
+    maximum = max(target + 1, int(max_seconds * 1000 / frame_ms))
+
+    ranges = []
+    start_window = 0
+    while (total - start_window * frame_len) > maximum * frame_len:
+        window = levels[start_window + target : start_window + maximum]
+        quiet = np.flatnonzero(window < silence_db)
+        if quiet.size:
+            # First pause after the target keeps segments close to the target length; cut in its middle
+            first = int(quiet[0])
+            loud_after = np.flatnonzero(window[first:] >= silence_db)
+            pause = int(loud_after[0]) if loud_after.size else window.size - first
+            offset = first + pause // 2
+        else:
+            offset = int(np.argmin(window))
+        cut_window = start_window + target + offset
+        ranges.append((start_window * frame_len, cut_window * frame_len))
+        start_window = cut_window
+    ranges.append((start_window * frame_len, total))
+    return ranges
+
+
+# ----- Normalization before speech-to-text -----
+
+
+def trim_silence(audio: PcmAudio, silence_db: float, padding_ms: int = 200, frame_ms: int = FRAME_MS) -> PcmAudio | None:
+    """Drop leading/trailing windows below `silence_db` (keeping `padding_ms` around speech); None if all silent."""
+    frame_len = max(1, audio.sample_rate * frame_ms // 1000)
+    if audio.samples.shape[0] < frame_len:
+        # Shorter than one window: judge the clip as a whole
+        rms = float(np.sqrt(np.mean(np.square(audio.samples)))) if audio.samples.size else 0.0
+        return audio if 20.0 * np.log10(max(rms, 1e-10)) >= silence_db else None
+    levels = frame_levels_db(audio, frame_ms)
+    loud = np.flatnonzero(levels >= silence_db)
+    if loud.size == 0:
+        return None
+    padding = audio.sample_rate * padding_ms // 1000
+    start = max(0, int(loud[0]) * frame_len - padding)
+    end = min(audio.samples.shape[0], (int(loud[-1]) + 1) * frame_len + padding)
+    return audio.slice(start, end)
+
+
+def downmix(audio: PcmAudio) -> PcmAudio:
+    if audio.channels == 1:
+        return audio
+    return PcmAudio(audio.samples.mean(axis=1, keepdims=True, dtype=np.float32), audio.sample_rate)
+
+
+def resample(audio: PcmAudio, target_rate: int) -> PcmAudio:
+    """
+    Downsample to `target_rate` (lower rates are left alone: upsampling only adds bytes).
+    Integer ratios average each group of samples; other ratios low-pass with a moving average, then interpolate.
+    """
+    rate = audio.sample_rate
+    if rate <= target_rate:
+        return audio
+    samples = audio.samples
+    if rate % target_rate == 0:
+        factor = rate // target_rate
+        count = samples.shape[0] // factor
+        grouped = samples[: count * factor].reshape(count, factor, audio.channels)
+        return PcmAudio(grouped.mean(axis=1, dtype=np.float32), target_rate)
+    width = int(np.ceil(rate / target_rate))
+    kernel = np.ones(width, dtype=np.float32) / width
+    filtered = np.stack([np.convolve(samples[:, c], kernel, mode="same") for c in range(audio.channels)], axis=1)
+    count = int(samples.shape[0] * target_rate / rate)
+    positions = np.arange(count) * (rate / target_rate)
+    source = np.arange(samples.shape[0])
+    resampled = np.stack([np.interp(positions, source, filtered[:, c]) for c in range(audio.channels)], axis=1)
+    return PcmAudio(resampled.astype(np.float32), target_rate)
+
+
+def normalize_for_stt(audio: PcmAudio, target_rate: int, silence_db: float, padding_ms: int = 200) -> PcmAudio | None:
+    """Mono, at most `target_rate`, without leading/trailing silence; None if the clip is silent throughout."""
+    mono = downmix(audio)
+    trimmed = trim_silence(mono, silence_db, padding_ms)
+    if trimmed is None:
+        return None
+    return resample(trimmed, target_rate)
@@ -1,19 +1,27 @@
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class settings(BaseSettings):
-    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+    # frozen: one instance is shared process-wide (see get_settings), so nobody may mutate it
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore", frozen=True)
 
     APP_NAME: str
     APP_VERSION: str
 
     OPENAI_API_KEY: str | None = None
+    # Per HTTP request (the SDK retries twice): keep 3x this below CHAT_JOB_TIMEOUT_SECONDS
+    OPENAI_REQUEST_TIMEOUT_SECONDS: float = 60
 
     POSTGRES_PASSWORD: str
     POSTGRES_USERNAME: str
     POSTGRES_MAIN_DATABASE: str
     POSTGRES_PORT: int
     POSTGRES_HOST: str
+    # Read replicas (same credentials and database) for history/listing queries; empty = primary only
+    DB_REPLICA_HOSTS: str = ""  # comma-separated host or host:port
+    DB_REPLICA_STICKY_SECONDS: float = 5  # reads of just-written sessions/agents stay on the primary this long
 
     GENERATION_MODEL_ID: str | None = None
     GENERATION_DAFAULT_MAX_TOKENS: int | None = None
@@ -22,10 +30,102 @@ class settings(BaseSettings):
     STT_LANGUAGE: str | None = None
     TTS_MODEL_ID: str = None
     TTS_VOICE: str = None
+    # Long voice uploads (PCM/WAV) are split at silence and transcribed in parallel segments
+    STT_CHUNK_SECONDS: float = 30  # target segment length
+    STT_CHUNK_MAX_SECONDS: float = 45  # hard segment limit; clips up to this length are sent whole
+    STT_MAX_PARALLEL: int = 4
+    STT_SILENCE_THRESHOLD_DB: float = -40  # frames quieter than this (dBFS) count as silence
+    STT_NORMALIZE_ENABLED: bool = True  # trim silence, downmix and downsample decodable uploads before STT
+    STT_SAMPLE_RATE: int = 16000  # uploads above this rate are downsampled to it
+    STT_TRIM_PADDING_MS: int = 200  # audio kept either side of speech when trimming silence
     LOG_LEVEL: str = "INFO"  # DEBUG, INFO, WARNING, ERROR
 
+    # Knowledge base (agent documents -> pgvector retrieval)
+    EMBEDDING_BACKEND: str = "local"  # local (deterministic, offline) | openai
+    EMBEDDING_MODEL_ID: str = "text-embedding-3-small"
+    EMBEDDING_DIMENSIONS: int = 256  # must match the knowledge_chunks.embedding vector column
+    EMBEDDING_BATCH_SIZE: int = 64
+    EMBEDDING_MAX_CONCURRENCY: int = 4
+    KNOWLEDGE_CHUNK_WORDS: int = 200
+    KNOWLEDGE_CHUNK_OVERLAP_WORDS: int = 30
+    KNOWLEDGE_TOP_K: int = 4
+    KNOWLEDGE_CONTEXT_TOKEN_BUDGET: int = 800
+
+    # Background conversation compaction (summarize older turns of long or idle sessions)
+    COMPACTION_ENABLED: bool = False
+    COMPACTION_MAX_MESSAGES: int = 40  # compact when more raw messages than this are outside the summary
+    COMPACTION_IDLE_MINUTES: int = 60  # ... or when the session has been idle this long
+    COMPACTION_KEEP_RECENT_MESSAGES: int = 10  # raw turns always kept verbatim
+    COMPACTION_INTERVAL_SECONDS: int = 60
+    COMPACTION_BATCH_SIZE: int = 20
+    COMPACTION_REQUESTS_PER_MINUTE: int = 30  # provider rate limit for summary calls
+    COMPACTION_SUMMARY_MAX_TOKENS: int = 400
+
+    # Deleting an agent/session only marks it (deleted_at); a background worker purges the rows in batches
+    PURGE_ENABLED: bool = True
+    PURGE_INTERVAL_SECONDS: int = 60
+    PURGE_BATCH_SIZE: int = 1000  # rows per DELETE (one short transaction each)
+
+    # In-process caches (agents, sessions), invalidated across workers via LISTEN/NOTIFY
+    CACHE_TTL_SECONDS: float = 300  # 0 disables caching
+    CACHE_MAX_ENTRIES: int = 10000
+    CACHE_INVALIDATION_CHANNEL: str = "cache_invalidation"
+
+    # SSE token streams: merge model deltas into one frame per window or byte threshold (first token is never delayed)
+    SSE_COALESCE_WINDOW_MS: float = 30  # 0 disables coalescing
+    SSE_COALESCE_MAX_BYTES: int = 1024
+
+    # Voice replies are synthesized per segment: a short first clause for fast first audio, then whole sentences
+    VOICE_FIRST_SEGMENT_MAX_WORDS: int = 8  # first segment ends at a clause break, or after this many words
+    VOICE_SEGMENT_MIN_CHARS: int = 20  # shorter sentences are merged into the next one (less choppy speech)
+    VOICE_SEGMENT_MAX_CHARS: int = 250  # longer ones are cut at a clause break or word
+
+    # Resumable streams: numbered SSE events buffered in memory so a reconnect with Last-Event-ID can resume
+    STREAM_REPLAY_TTL_SECONDS: float = 300  # how long a finished stream stays replayable
+    STREAM_REPLAY_MAX_STREAMS: int = 1000
+    STREAM_REPLAY_MAX_EVENTS: int = 5000  # per stream; older events are dropped (resume from them gets 410)
+    STREAM_RESUME_GRACE_SECONDS: float = 60  # keep generating this long after the last client left
+
+    # Asynchronous chat jobs (POST /sessions/jobs): a bounded worker pool decoupled from HTTP connections
+    CHAT_JOB_WORKERS: int = 4  # concurrent LLM calls for jobs
+    CHAT_JOB_QUEUE_SIZE: int = 1000  # submissions beyond this get 503
+    CHAT_JOB_TIMEOUT_SECONDS: float = 300
+    CHAT_JOB_POLL_SECONDS: float = 2  # job event streams re-check the DB this often (jobs run by other workers)
+    CHAT_JOB_RECOVERY_INTERVAL_SECONDS: float = 60  # re-enqueue queued jobs and jobs whose worker died
+    CHAT_JOB_MAX_ATTEMPTS: int = 3  # runs per job (first run + requeues after a dead worker); then it is failed
+
+    # Admission control for send/stream/voice messages: shed load early with 429/503 + Retry-After
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_MAX_TEXT_IN_FLIGHT: int = 200  # text turns (send + stream) in progress per worker
+    ADMISSION_MAX_VOICE_IN_FLIGHT: int = 50  # voice turns (STT + LLM + TTS) in progress per worker
+    ADMISSION_MAX_AGENT_IN_FLIGHT: int = 50  # turns of any one agent in progress per worker (429 beyond)
+    ADMISSION_MAX_PROVIDER_QUEUE: int = 20  # provider calls waiting for a worker thread
+    ADMISSION_MAX_LOOP_LAG_MS: float = 250  # event loop lag above which new turns are refused
+    ADMISSION_LAG_SAMPLE_MS: float = 100
+    ADMISSION_RETRY_AFTER_SECONDS: int = 2
+
+    # Diagnostics: event loop stall monitor, on-demand request profiler (X-Profile: <token> header)
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_THRESHOLD_MS: float = 200  # log the loop thread's stack when the loop is blocked longer than this
+    PROFILER_ADMIN_TOKEN: str = ""  # empty disables request profiling
+    PROFILER_SAMPLE_MS: float = 5
+    PROFILER_MAX_SECONDS: float = 120  # sampling stops after this, even if the request (e.g. a stream) goes on
+    PROFILER_MAX_PROFILES: int = 20  # profiles kept in memory for GET /debug/profiles/{id}
+
+    # Agent tools (function calling): independent calls of one model turn run concurrently
+    TOOL_TIMEOUT_SECONDS: float = 10  # per call, unless the tool sets its own
+    TOOL_MAX_ROUNDS: int = 4  # model turns that may call tools before it must answer
+    TOOL_CACHE_MAX_ENTRIES: int = 1000  # per cached tool
+
+    # Batch chat (POST /sessions/batch-messages)
+    BATCH_MAX_ITEMS: int = 1000
+    BATCH_MAX_PARALLEL: int = 8  # default and upper bound for a request's max_parallel
+
+    # Fan-out chat (POST /sessions/fan-out-message): one message to several agents, streamed concurrently
+    FANOUT_MAX_TARGETS: int = 10
+
 
+@lru_cache(maxsize=1)
 def get_settings():
-    # settings_instance = settings()
-    # return settings_instance.
-    return settings()
\ No newline at end of file
+    """Read the environment / .env once per process; later calls return the same frozen instance."""
+    return settings()
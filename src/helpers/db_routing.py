@@ -0,0 +1,103 @@
+"""
+Read-replica routing for database sessions.
+
+`RoutingSessionFactory` stands in for the plain `sessionmaker` as `app.db_client`: calling it still opens a session
+on the primary (all writes, and every read that is not explicitly routed), while `reader(key)` opens one on a
+replica, round-robin. Models use reader() for their heavy listing/history queries (see BaseDatamodel.read_session).
+
+Read-your-writes: every commit on the primary records what it touched as sticky keys, e.g. ("session_id", 5) for a
+message or session row, ("agent_id", 2) for an agent or one of its sessions, ("agents",) for any agent row. For
+DB_REPLICA_STICKY_SECONDS afterwards (set it above the replication lag) reads under that key go to the primary, so
+a chat history requested right after a message was stored includes it. Stickiness is per worker process.
+Without replicas configured, reader() is the primary too.
+"""
+import itertools
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+
+_ROUTER_KEY = "routing_session_factory"
+_WRITTEN_KEY = "sticky_written_keys"
+STICKY_ATTRIBUTES = ("session_id", "agent_id")
+MAX_STICKY_KEYS = 10_000
+
+
+def written_keys(instance) -> list[tuple]:
+    """Sticky keys for a row written in a flush: its table, plus the chat session / agent it belongs to."""
+    keys = [(instance.__tablename__,)]
+    for attribute in STICKY_ATTRIBUTES:
+        value = getattr(instance, attribute, None)
+        if value is not None:
+            keys.append((attribute, value))
+    return keys
+
+
+class RoutingSessionFactory:
+    def __init__(self, primary, replicas=(), sticky_seconds: float = 5.0):
+        """`primary` and each of `replicas` are sessionmakers (AsyncSession)."""
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.sticky_seconds = sticky_seconds
+        self._next_replica = itertools.cycle(self.replicas) if self.replicas else None
+        self._sticky_until: dict[tuple, float] = {}
+
+    def __call__(self):
+        session = self.primary()
+        session.sync_session.info[_ROUTER_KEY] = self
+        return session
+
+    def reader(self, key: tuple | None = None):
+        """A session for a read-only query: a replica, unless there is none or `key` was written recently."""
+        if self._next_replica is None or (key is not None and self.is_sticky(key)):
+            return self()
+        return next(self._next_replica)()
+
+    def is_sticky(self, key: tuple) -> bool:
+        until = self._sticky_until.get(key)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            del self._sticky_until[key]
+            return False
+        return True
+
+    def mark_written(self, keys) -> None:
+        if self.sticky_seconds <= 0:
+            return
+        now = time.monotonic()
+        if len(self._sticky_until) > MAX_STICKY_KEYS:
+            self._sticky_until = {k: until for k, until in self._sticky_until.items() if until > now}
+        until = now + self.sticky_seconds
+        for key in keys:
+            self._sticky_until[key] = until
+
+
+def mark_written_on_commit(db_session, *keys: tuple) -> None:
+    """Sticky keys for a Core UPDATE/DELETE in the open transaction (flushes do not see those): marked on commit."""
+    info = db_session.sync_session.info
+    if _ROUTER_KEY in info:
+        info.setdefault(_WRITTEN_KEY, set()).update(keys)
+
+
+@event.listens_for(OrmSession, "after_flush")
+def _collect_written_keys(session, flush_context):
+    if _ROUTER_KEY not in session.info:
+        return
+    keys = session.info.setdefault(_WRITTEN_KEY, set())
+    for instance in itertools.chain(session.new, session.dirty, session.deleted):
+        if hasattr(instance, "__tablename__"):
+            keys.update(written_keys(instance))
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _mark_written_keys(session):
+    keys = session.info.pop(_WRITTEN_KEY, None)
+    router = session.info.get(_ROUTER_KEY)
+    if keys and router is not None:
+        router.mark_written(keys)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _drop_written_keys(session):
+    session.info.pop(_WRITTEN_KEY, None)
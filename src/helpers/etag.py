@@ -0,0 +1,43 @@
+"""
+Conditional GETs for polled read routes (agents, session listings, message history).
+
+ETags are strong validators derived from the version counters on agents and sessions (bumped by every write),
+so a route can answer `If-None-Match` with 304 Not Modified after one small version query, before any rows are
+loaded or serialized. The version is read before the rows: if a write lands in between, the response carries
+the older tag and the next poll simply gets a 200 again, never a stale 304.
+Responses are sent with `Cache-Control: no-cache`, so browsers keep them and revalidate on every fetch.
+"""
+import hashlib
+
+from fastapi import Request
+from fastapi.responses import Response
+
+CACHE_CONTROL = "no-cache"
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag (quoted) for a representation identified by `parts` (route name, ids, versions, variant)."""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match uses the weak comparison: W/ prefixes are ignored, "*" matches any current representation."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def with_etag(response: Response, etag: str) -> Response:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
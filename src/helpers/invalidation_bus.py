@@ -0,0 +1,107 @@
+"""
+Cross-worker cache invalidation over PostgreSQL LISTEN/NOTIFY.
+
+Writers call `publish_invalidation(db_session, cache_name, key)` inside their transaction: on PostgreSQL this
+queues a NOTIFY that the server delivers to every listening worker only if the transaction commits; locally the
+entry is dropped right after commit (SQLAlchemy after_commit hook). A reader that started before the invalidation
+may still hold the pre-commit row; LocalCache.set refuses to cache it (see helpers/local_cache.py).
+
+Each worker runs one `InvalidationBus` that LISTENs on a dedicated pooled asyncpg connection. If that connection
+is lost, all local caches are cleared (notifications may have been missed) and it reconnects.
+"""
+import asyncio
+import logging
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session as OrmSession
+
+from helpers import local_cache
+from helpers.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "pending_invalidations"
+
+
+async def publish_invalidation(db_session, cache_name: str, key) -> None:
+    """Invalidate `cache_name[key]` in every worker once the current transaction commits."""
+    db_session.sync_session.info.setdefault(_PENDING_KEY, []).append((cache_name, key))
+    if db_session.bind.dialect.name == "postgresql":
+        await db_session.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": get_settings().CACHE_INVALIDATION_CHANNEL, "payload": f"{cache_name}:{key}"},
+        )
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _apply_pending_invalidations(session):
+    for cache_name, key in session.info.pop(_PENDING_KEY, []):
+        local_cache.invalidate(cache_name, key)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _drop_pending_invalidations(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def _parse_key(raw: str):
+    return int(raw) if raw.lstrip("-").isdigit() else raw
+
+
+class InvalidationBus:
+    def __init__(self, db_engine, channel: str | None = None, reconnect_delay: float = 2.0):
+        self.db_engine = db_engine
+        self.channel = channel or get_settings().CACHE_INVALIDATION_CHANNEL
+        self.reconnect_delay = reconnect_delay
+        self._task: asyncio.Task | None = None
+        self._lost = asyncio.Event()
+        self._connection = None
+
+    def _on_notify(self, connection, pid, channel, payload):
+        cache_name, _, raw_key = payload.partition(":")
+        local_cache.invalidate(cache_name, _parse_key(raw_key))
+
+    def _on_terminate(self, connection):
+        self._lost.set()
+
+    async def _listen(self):
+        self._connection = await self.db_engine.connect()
+        raw = await self._connection.get_raw_connection()
+        driver_connection = raw.driver_connection
+        driver_connection.add_termination_listener(self._on_terminate)
+        await driver_connection.add_listener(self.channel, self._on_notify)
+        logger.info("Listening for cache invalidations on channel %r.", self.channel)
+
+    async def _close_connection(self):
+        if self._connection is not None:
+            try:
+                await self._connection.invalidate()
+            except Exception:
+                pass
+            self._connection = None
+
+    async def _run(self):
+        while True:
+            try:
+                self._lost.clear()
+                await self._listen()
+                await self._lost.wait()
+                logger.warning("Cache invalidation listener lost its connection; clearing local caches.")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Cache invalidation listener failed; clearing local caches.")
+            local_cache.clear_all_caches()
+            await self._close_connection()
+            await asyncio.sleep(self.reconnect_delay)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="cache-invalidation-bus")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self._close_connection()
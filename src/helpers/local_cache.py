@@ -0,0 +1,93 @@
+"""
+In-process TTL + LRU caches for hot, rarely-changing rows (agents, sessions).
+Entries are invalidated on writes through helpers/invalidation_bus.py, across all workers.
+
+A read that started before an invalidation may return the pre-write row; `set(..., read_started=...)` drops such
+values instead of caching them. Invalidation times are remembered per key (bounded like the entries; once a record
+is evicted, every read older than it is treated as stale).
+"""
+import time
+from collections import OrderedDict
+
+from helpers.config import get_settings
+
+AGENTS_CACHE = "agents"
+SESSIONS_CACHE = "sessions"
+
+
+class LocalCache:
+    def __init__(self, name: str, ttl_seconds: float, max_entries: int):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._invalidated_at: OrderedDict = OrderedDict()
+        self._stale_before = float("-inf")  # reads started before this may have missed an evicted invalidation
+
+    @staticmethod
+    def read_started() -> float:
+        """Take before reading a row from the database; pass to set()."""
+        return time.monotonic()
+
+    def get(self, key):
+        """Cached value or None (None is never cached)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, read_started: float | None = None) -> None:
+        """Cache `value`, unless it was read (from `read_started`) before the key's latest invalidation."""
+        if self.ttl_seconds <= 0 or value is None:
+            return
+        if read_started is not None and (
+            read_started <= self._stale_before or read_started <= self._invalidated_at.get(key, float("-inf"))
+        ):
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key) -> None:
+        self._entries.pop(key, None)
+        self._invalidated_at[key] = time.monotonic()
+        self._invalidated_at.move_to_end(key)
+        while len(self._invalidated_at) > self.max_entries:
+            _, evicted_at = self._invalidated_at.popitem(last=False)
+            self._stale_before = max(self._stale_before, evicted_at)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._invalidated_at.clear()
+        self._stale_before = time.monotonic()
+
+
+_caches: dict[str, LocalCache] = {}
+
+
+def get_cache(name: str, ttl_seconds: float | None = None, max_entries: int | None = None) -> LocalCache:
+    """The named cache, created on first use (CACHE_TTL_SECONDS / CACHE_MAX_ENTRIES unless given)."""
+    cache = _caches.get(name)
+    if cache is None:
+        settings = get_settings()
+        cache = _caches[name] = LocalCache(
+            name,
+            settings.CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds,
+            settings.CACHE_MAX_ENTRIES if max_entries is None else max_entries,
+        )
+    return cache
+
+
+def invalidate(name: str, key) -> None:
+    get_cache(name).invalidate(key)
+
+
+def clear_all_caches() -> None:
+    for cache in _caches.values():
+        cache.clear()
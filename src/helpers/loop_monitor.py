@@ -0,0 +1,126 @@
+"""
+Event loop stall monitor: finds the code that blocks the event loop (e.g. a synchronous provider call made
+directly in an async handler).
+
+A heartbeat coroutine (LoopLagSampler, shared with admission control) stamps the time every interval; a watchdog
+thread checks the stamp. When the loop has not come back for LOOP_MONITOR_THRESHOLD_MS, the watchdog logs the loop
+thread's current stack (the blocking call and the coroutines above it) once per stall. When the loop resumes, the
+stall's length is logged and counted (`event_loop_stalls_total`, `event_loop_stall_seconds_total`). Overhead: one
+wake-up per interval plus a sleeping thread, so it is on by default.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from helpers import metrics
+from helpers.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLagSampler:
+    """
+    The worker's one event loop heartbeat: a coroutine that wakes every `interval` and measures how late it fired.
+    Admission control sheds load on `lag_seconds` (a spike counts at once and decays over a few samples, so shedding
+    does not flap); LoopStallMonitor's watchdog thread reads `last_beat`, and its listener gets each sample's lag.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.last_beat = time.monotonic()
+        self.lag_seconds = 0.0
+        self._listeners = []
+        self._task: asyncio.Task | None = None
+
+    def add_listener(self, listener) -> None:
+        self._listeners.append(listener)
+
+    def start(self) -> None:
+        if self._task is None:
+            self.last_beat = time.monotonic()
+            self._task = asyncio.create_task(self._beat(), name="loop-lag-heartbeat")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _beat(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - self.last_beat - self.interval)
+            self.last_beat = now
+            self.lag_seconds = max(lag, self.lag_seconds * 0.8)
+            metrics.set_gauge("event_loop_lag_seconds", self.lag_seconds)
+            for listener in self._listeners:
+                listener(lag)
+
+
+def shared_sampler_interval(settings) -> float:
+    """Fast enough for both users of the shared sampler: admission control and (when enabled) the stall monitor."""
+    interval = settings.ADMISSION_LAG_SAMPLE_MS / 1000
+    if settings.LOOP_MONITOR_ENABLED:
+        interval = min(interval, settings.LOOP_MONITOR_THRESHOLD_MS / 4000)
+    return interval
+
+
+class LoopStallMonitor:
+    def __init__(self, settings=None, sampler: LoopLagSampler | None = None):
+        """Pass the worker's shared `sampler` (started by its owner); without one the monitor runs its own."""
+        self.settings = settings or get_settings()
+        self.threshold = self.settings.LOOP_MONITOR_THRESHOLD_MS / 1000
+        self._owns_sampler = sampler is None
+        self.sampler = sampler or LoopLagSampler(self.threshold / 4)
+        self.sampler.add_listener(self._on_sample)
+        self._reported_beat: float | None = None
+        self._loop_thread_id: int | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopping = threading.Event()
+
+    def start(self) -> None:
+        if self._watchdog is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._stopping = threading.Event()  # per watchdog: a stopped one may still be finishing its last wait
+        if self._owns_sampler:
+            self.sampler.start()
+        self._watchdog = threading.Thread(target=self._watch, name="loop-stall-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        if self._watchdog is None:
+            return
+        self._stopping.set()
+        if self._owns_sampler:
+            await self.sampler.stop()
+        # Not joined: it wakes within one interval, sees _stopping and exits (a join would block the loop)
+        self._watchdog = None
+
+    def _on_sample(self, lag: float) -> None:
+        if lag > self.threshold:
+            metrics.increment("event_loop_stalls_total")
+            metrics.increment("event_loop_stall_seconds_total", lag)
+            logger.warning("Event loop was blocked for %.0f ms", lag * 1000)
+
+    def _watch(self) -> None:
+        interval = self.sampler.interval
+        stopping = self._stopping
+        while not stopping.wait(interval):
+            beat = self.sampler.last_beat
+            if time.monotonic() - beat - interval > self.threshold and self._reported_beat != beat:
+                self._reported_beat = beat
+                self._report()
+
+    def _report(self) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        stack = "".join(traceback.format_stack(frame))
+        logger.warning(
+            "Event loop blocked for more than %.0f ms; loop thread stack:\n%s", self.threshold * 1000, stack
+        )
@@ -0,0 +1,52 @@
+"""
+Minimal in-process metrics (counters and gauges), exposed in Prometheus text format at GET /metrics.
+Per worker process; scrape every worker (or sum in the dashboard) when running several.
+"""
+from collections import defaultdict
+
+_counters: dict[tuple, float] = defaultdict(float)
+_gauges: dict[tuple, float] = {}
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return (name, tuple(sorted(labels.items())))
+
+
+def increment(name: str, value: float = 1, **labels) -> None:
+    _counters[_key(name, labels)] += value
+
+
+def set_gauge(name: str, value: float, **labels) -> None:
+    _gauges[_key(name, labels)] = value
+
+
+def get_value(name: str, **labels) -> float:
+    key = _key(name, labels)
+    if key in _gauges:
+        return _gauges[key]
+    return _counters.get(key, 0)
+
+
+def _format(key: tuple) -> str:
+    name, labels = key
+    if not labels:
+        return name
+    rendered = ",".join(f'{k}="{v}"' for k, v in labels)
+    return f"{name}{{{rendered}}}"
+
+
+def render_prometheus() -> str:
+    lines = []
+    for kind, values in (("counter", _counters), ("gauge", _gauges)):
+        seen = set()
+        for key in sorted(values):
+            if key[0] not in seen:
+                seen.add(key[0])
+                lines.append(f"# TYPE {key[0]} {kind}")
+            lines.append(f"{_format(key)} {values[key]:g}")
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    _counters.clear()
+    _gauges.clear()
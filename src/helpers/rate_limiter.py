@@ -0,0 +1,26 @@
+"""
+Async token-bucket rate limiter (e.g. to keep background work under a provider requests-per-minute budget).
+"""
+import asyncio
+import time
+
+
+class AsyncRateLimiter:
+    def __init__(self, rate_per_minute: float, burst: int = 1):
+        self.rate_per_second = max(rate_per_minute, 0.001) / 60.0
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until one request may be made."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_second)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate_per_second)
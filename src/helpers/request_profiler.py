@@ -0,0 +1,249 @@
+"""
+On-demand sampling profiler for single requests, for finding where a slow request spends its time.
+
+An admin sends `X-Profile: <PROFILER_ADMIN_TOKEN>` with any request. While that request runs, a sampler thread
+looks at the request's asyncio tasks (the one serving it and every task created inside it, e.g. stream
+producers) every PROFILER_SAMPLE_MS:
+  - a task running on the event loop is sampled from the loop thread's real stack, down to plain functions
+    blocking the loop;
+  - a waiting task is sampled along its await chain (routes -> controllers/conversation.py -> models -> the
+    awaited DB call or worker-thread provider call), ending in a `[waiting]` frame.
+The response carries `X-Profile-Id`; the profile is kept in memory (last PROFILER_MAX_PROFILES) and served as
+folded stacks ("frame;frame;frame count" lines, the input of flamegraph.pl, speedscope and similar) by
+GET /api/v1/debug/profiles/{profile_id}, which needs the same token (as `X-Admin-Token`).
+Requests without the header pay one header lookup; with no token configured the header is ignored.
+"""
+import asyncio
+import contextvars
+import gc
+import hmac
+import inspect
+import itertools
+import logging
+import sys
+import threading
+import time
+import uuid
+import weakref
+from collections import Counter, OrderedDict
+from pathlib import Path
+
+from helpers import metrics
+from helpers.config import get_settings
+from helpers.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+WAITING_FRAME = "[waiting]"
+
+_SRC_DIR = str(Path(__file__).resolve().parent.parent) + "/"
+_MAX_DEPTH = 200
+
+_active_profile: contextvars.ContextVar["RequestProfile | None"] = contextvars.ContextVar(
+    "active_profile", default=None
+)
+
+
+def _frame_label(frame) -> str:
+    filename = frame.f_code.co_filename
+    if filename.startswith(_SRC_DIR):
+        filename = filename[len(_SRC_DIR):]
+    elif "site-packages/" in filename:
+        filename = filename.rsplit("site-packages/", 1)[1]
+    else:
+        filename = "/".join(Path(filename).parts[-2:])  # standard library: asyncio/locks.py
+    return f"{filename}:{frame.f_code.co_name}"
+
+
+def _await_chain(awaitable) -> list:
+    """Frames of a suspended coroutine and of everything it awaits (coroutines, generators, async generators)."""
+    frames = []
+    while awaitable is not None and len(frames) < _MAX_DEPTH:
+        frame = (
+            getattr(awaitable, "cr_frame", None)
+            or getattr(awaitable, "ag_frame", None)
+            or getattr(awaitable, "gi_frame", None)
+        )
+        if frame is not None:
+            frames.append(frame)
+            awaitable = (
+                getattr(awaitable, "cr_await", None)
+                or getattr(awaitable, "ag_await", None)
+                or getattr(awaitable, "gi_yieldfrom", None)
+            )
+        elif type(awaitable).__name__ in ("async_generator_asend", "async_generator_athrow"):
+            # `async for` awaits an opaque asend object; the generator it advances is reachable through the GC
+            awaitable = next((r for r in gc.get_referents(awaitable) if inspect.isasyncgen(r)), None)
+        else:
+            break
+    return frames
+
+
+def _thread_stack(thread_id: int, start_frame) -> list:
+    """The thread's current stack, outermost first, from `start_frame` down (the task's own coroutine)."""
+    frame = sys._current_frames().get(thread_id)
+    stack = []
+    while frame is not None and len(stack) < _MAX_DEPTH:
+        stack.append(frame)
+        if frame is start_frame:
+            break
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+class RequestProfile:
+    """Samples collected for one request; `folded()` renders them for flame graph tools."""
+
+    def __init__(self, profile_id: str, label: str, loop_thread_id: int):
+        self.profile_id = profile_id
+        self.label = label
+        self.loop_thread_id = loop_thread_id
+        self.tasks: weakref.WeakSet = weakref.WeakSet()
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.started = time.monotonic()
+        self.duration = 0.0
+
+    def sample(self) -> None:
+        for task in list(self.tasks):
+            if task.done():
+                continue
+            coro = task.get_coro()
+            if getattr(coro, "cr_running", False):
+                frames = _thread_stack(self.loop_thread_id, getattr(coro, "cr_frame", None))
+                stack = [_frame_label(f) for f in frames]
+            else:
+                stack = [_frame_label(f) for f in _await_chain(coro)] + [WAITING_FRAME]
+            self.samples[(self.label, *stack)] += 1
+        self.sample_count += 1
+
+    def folded(self) -> str:
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in sorted(self.samples.items()))
+
+
+def _task_factory(previous):
+    def factory(loop, coro, **kwargs):
+        task = previous(loop, coro, **kwargs) if previous is not None else asyncio.Task(coro, loop=loop, **kwargs)
+        context = kwargs.get("context")
+        profile = context.get(_active_profile) if context is not None else _active_profile.get()
+        if profile is not None:
+            profile.tasks.add(task)
+        return task
+
+    factory.request_profiler = True
+    return factory
+
+
+def _install_task_factory(loop) -> None:
+    """Tasks created while a profile is active (in its context) join it; costs one ContextVar lookup per task."""
+    current = loop.get_task_factory()
+    if not getattr(current, "request_profiler", False):
+        loop.set_task_factory(_task_factory(current))
+
+
+class RequestProfiler:
+    def __init__(self, settings=None):
+        self.settings = settings or get_settings()
+        self.profiles: OrderedDict[str, RequestProfile] = OrderedDict()
+        self._ids = itertools.count(1)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.settings.PROFILER_ADMIN_TOKEN)
+
+    def authorized(self, token: str | None) -> bool:
+        if not self.enabled or token is None:
+            return False
+        return hmac.compare_digest(token.encode(), self.settings.PROFILER_ADMIN_TOKEN.encode())
+
+    def get(self, profile_id: str) -> RequestProfile | None:
+        return self.profiles.get(profile_id)
+
+    def begin(self, label: str) -> RequestProfile:
+        loop = asyncio.get_running_loop()
+        _install_task_factory(loop)
+        profile = RequestProfile(f"{next(self._ids)}-{uuid.uuid4().hex[:8]}", label, threading.get_ident())
+        profile.tasks.add(asyncio.current_task())
+        self.profiles[profile.profile_id] = profile
+        while len(self.profiles) > self.settings.PROFILER_MAX_PROFILES:
+            self.profiles.popitem(last=False)
+        return profile
+
+    def run_sampler(self, profile: RequestProfile, stop: threading.Event) -> threading.Thread:
+        interval = self.settings.PROFILER_SAMPLE_MS / 1000
+        deadline = profile.started + self.settings.PROFILER_MAX_SECONDS
+
+        def sample_until_stopped():
+            while not stop.wait(interval) and time.monotonic() < deadline:
+                try:
+                    profile.sample()
+                except Exception:  # a task finishing mid-walk must not kill the sampler
+                    logger.debug("Profile sample failed", exc_info=True)
+
+        thread = threading.Thread(
+            target=sample_until_stopped, name=f"request-profiler-{profile.profile_id}", daemon=True
+        )
+        thread.start()
+        return thread
+
+
+def get_request_profiler(app) -> RequestProfiler:
+    profiler = getattr(app, "request_profiler", None)
+    if profiler is None:
+        profiler = app.request_profiler = RequestProfiler()
+    return profiler
+
+
+class RequestProfilerMiddleware:
+    """ASGI middleware: profiles requests carrying a valid X-Profile token, answers 403 for an invalid one."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = next((v.decode("latin-1") for k, v in scope["headers"] if k == PROFILE_HEADER.encode()), None)
+        if token is None:
+            return await self.app(scope, receive, send)
+        profiler = get_request_profiler(scope["app"])
+        if not profiler.enabled:
+            return await self.app(scope, receive, send)
+        if not profiler.authorized(token):
+            return await _forbidden(send)
+
+        profile = profiler.begin(f"{scope['method']} {scope['path']}")
+        profile_id = profile.profile_id.encode()
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (PROFILE_ID_HEADER, profile_id)]}
+            await send(message)
+
+        stop = threading.Event()
+        profiler.run_sampler(profile, stop)
+        reset = _active_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            _active_profile.reset(reset)
+            stop.set()  # the sampler exits at its next wake-up; joining it here would block the event loop
+            profile.duration = time.monotonic() - profile.started
+            metrics.increment("profiled_requests_total")
+            logger.info(
+                "Profiled %s: %.0f ms, %d samples (profile %s)",
+                profile.label, profile.duration * 1000, profile.sample_count, profile.profile_id,
+            )
+
+
+async def _forbidden(send) -> None:
+    body = dumps({"detail": "Invalid profiling token"})
+    await send({
+        "type": "http.response.start",
+        "status": 403,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
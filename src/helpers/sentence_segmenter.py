@@ -0,0 +1,130 @@
+"""
+Incremental sentence segmentation for streamed LLM text (voice replies are synthesized segment by segment).
+
+Every character is looked at once, as it arrives: feed() returns the segments completed by the new text.
+The first segment is emitted early, at a clause break (comma, semicolon, colon, dash) or after a few words, so
+the first audio starts sooner; after that segments are whole sentences, with very short ones merged into the next
+and long ones cut at the last clause break (or word) before the length cap. Abbreviations ("Dr.", "e.g."),
+initials ("J.") and list numbers ("1.") do not end a sentence; decimals ("3.5") never do since no space follows.
+"""
+
+TERMINAL = ".!?…"
+CJK_TERMINAL = "。！？"  # end a sentence without a following space
+CLAUSE = ",;:，；："
+DASHES = ("—", "–", "-")
+CLOSERS = "\"')]}»”’"
+
+DEFAULT_ABBREVIATIONS = frozenset({
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "mt", "vs", "no", "fig", "approx", "dept", "est",
+    "inc", "ltd", "co", "corp", "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec",
+    "e.g", "i.e", "cf", "al", "u.s", "a.m", "p.m",
+})
+
+
+class SentenceSegmenter:
+    def __init__(
+        self,
+        first_clause_min_words: int = 3,
+        first_clause_max_words: int = 8,
+        min_chars: int = 20,
+        max_chars: int = 250,
+        abbreviations: frozenset[str] = DEFAULT_ABBREVIATIONS,
+    ):
+        self.first_clause_min_words = first_clause_min_words
+        self.first_clause_max_words = first_clause_max_words
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.abbreviations = abbreviations
+        self._segment: list[str] = []
+        self._token: list[str] = []  # current word, for abbreviation / punctuation checks at its end
+        self._words = 0
+        self._emitted_first = False
+        # Fallback cut points inside the current segment for the length cap: (chars, words) at that point
+        self._clause_cut: tuple[int, int] | None = None
+        self._space_cut: tuple[int, int] | None = None
+
+    def feed(self, text: str) -> list[str]:
+        segments = []
+        for char in text:
+            if char.isspace():
+                if self._token:
+                    segment = self._end_token()
+                    if segment:
+                        segments.append(segment)
+                continue
+            if self._segment and not self._token:
+                self._segment.append(" ")  # collapse the whitespace between words
+            self._segment.append(char)
+            self._token.append(char)
+            if char in CJK_TERMINAL:
+                self._token = []
+                segments.append(self._cut(len(self._segment), self._words + 1))
+            elif len(self._segment) > self.max_chars:
+                segments.append(self._cut_for_length())
+        return [s for s in segments if s]
+
+    def flush(self) -> str | None:
+        """The unfinished tail (call when the stream ends)."""
+        if self._token:
+            self._token = []
+            self._words += 1
+        text = "".join(self._segment).strip()
+        self._reset_segment()
+        return text or None
+
+    def _end_token(self) -> str | None:
+        token = "".join(self._token)
+        self._token = []
+        self._words += 1
+        position = (len(self._segment), self._words)
+
+        core = token.rstrip(CLOSERS)
+        if core and core[-1] in TERMINAL and self._ends_sentence(core):
+            if not self._emitted_first or len(self._segment) >= self.min_chars:
+                return self._cut(*position)
+        is_clause_break = (core and core[-1] in CLAUSE) or token in DASHES
+        if is_clause_break:
+            self._clause_cut = position
+        self._space_cut = position
+        if not self._emitted_first:
+            if (is_clause_break and self._words >= self.first_clause_min_words) or self._words >= self.first_clause_max_words:
+                return self._cut(*position)
+        return None
+
+    def _ends_sentence(self, core: str) -> bool:
+        if core[-1] != ".":
+            return True  # ! ? …
+        word = core.rstrip(".").lstrip("\"'([{«“‘").lower()
+        if word in self.abbreviations:
+            return False
+        if len(word) == 1 and word.isalpha():
+            return False  # initial
+        if word.isdigit() and self._words == 1:
+            return False  # list number at the start of a segment
+        return True
+
+    def _cut_for_length(self) -> str:
+        cut = self._clause_cut or self._space_cut
+        if cut is None or cut[0] == 0:
+            # A single over-long word: hard cut
+            self._token = []
+            return self._cut(len(self._segment), self._words + 1)
+        return self._cut(*cut)
+
+    def _cut(self, chars: int, words: int) -> str:
+        text = "".join(self._segment[:chars]).strip()
+        rest = self._segment[chars:]
+        while rest and rest[0] == " ":
+            rest.pop(0)
+        self._segment = rest
+        self._words = max(0, self._words - words)
+        self._clause_cut = None
+        self._space_cut = None
+        self._emitted_first = True
+        return text
+
+    def _reset_segment(self) -> None:
+        self._segment = []
+        self._words = 0
+        self._clause_cut = None
+        self._space_cut = None
@@ -0,0 +1,36 @@
+"""
+Fast JSON responses for hot read routes.
+
+Routes build plain dicts straight from row data and return `FastJSONResponse`; because a Response object is
+returned, FastAPI skips re-validating and re-serializing it through `response_model` (which is still declared
+for the OpenAPI docs). orjson is used when installed (it also encodes datetimes natively, in the same ISO 8601
+form as `datetime.isoformat()`); otherwise the standard library encoder is used.
+"""
+import json
+from datetime import date, datetime
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,88 @@
+"""
+Server-Sent Events helpers: adaptive coalescing of small token deltas into fewer, larger frames.
+"""
+import asyncio
+from typing import AsyncIterator, Callable
+
+
+def _identity(item):
+    return item
+
+
+async def coalesce_text(
+    items: AsyncIterator,
+    window_ms: float,
+    max_bytes: int,
+    text_of: Callable = _identity,
+    make: Callable = _identity,
+):
+    """
+    Merge consecutive text items of an async stream into one item per time window or byte threshold,
+    whichever is hit first.
+
+    - The first text item is passed through immediately, so time-to-first-token is unchanged.
+    - After that, text is buffered and flushed when `window_ms` has passed since the first buffered delta
+      (even if the upstream is silent, via a timed wait on the next item) or when `max_bytes` are buffered.
+    - Items for which `text_of(item)` returns None (e.g. audio or error events) flush the buffer and pass through
+      in order. `make(text)` builds the merged item.
+    A window of 0 disables coalescing.
+    """
+    if window_ms <= 0:
+        async for item in items:
+            yield item
+        return
+
+    loop = asyncio.get_running_loop()
+    window = window_ms / 1000.0
+    iterator = items.__aiter__()
+    buffer: list[str] = []
+    buffered_bytes = 0
+    deadline = 0.0
+    first_sent = False
+    pending: asyncio.Future | None = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            if buffer:
+                done, _ = await asyncio.wait({pending}, timeout=max(0.0, deadline - loop.time()))
+                if not done:
+                    yield make("".join(buffer))
+                    buffer, buffered_bytes = [], 0
+                    continue
+            else:
+                await asyncio.wait({pending})
+            try:
+                item = pending.result()
+            except StopAsyncIteration:
+                break
+            finally:
+                pending = None
+
+            text = text_of(item)
+            if text is None:
+                if buffer:
+                    yield make("".join(buffer))
+                    buffer, buffered_bytes = [], 0
+                yield item
+                continue
+            if not first_sent:
+                first_sent = True
+                yield item
+                continue
+            if not buffer:
+                deadline = loop.time() + window
+            buffer.append(text)
+            buffered_bytes += len(text.encode("utf-8"))
+            if buffered_bytes >= max_bytes:
+                yield make("".join(buffer))
+                buffer, buffered_bytes = [], 0
+        if buffer:
+            yield make("".join(buffer))
+    finally:
+        if pending is not None:
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
@@ -0,0 +1,154 @@
+"""
+Startup profiling: how long a cold worker takes from process start to its first accepted request.
+
+Stages (seconds since the process started) are exposed as the `startup_seconds{stage=...}` gauge at GET /metrics
+and logged once, together with the slowest imports, when the first request arrives.
+Per-module import timing needs an import hook installed before the heavy imports; it is off by default and
+enabled with STARTUP_PROFILE_IMPORTS=1 in the process environment (not .env: it is read before settings are loaded).
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from helpers import metrics
+
+logger = logging.getLogger(__name__)
+
+_FALLBACK_START = time.monotonic()
+_stages: dict[str, float] = {}
+_module_seconds: dict[str, float] = {}
+_local = threading.local()
+
+
+def _process_start() -> float:
+    """Process start on the time.monotonic() clock (Linux: from /proc; elsewhere: when this module was imported)."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 (starttime, clock ticks since boot); the command name in field 2 may contain spaces
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        since_start = uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+        return time.monotonic() - max(0.0, since_start)
+    except (OSError, ValueError, IndexError):
+        return _FALLBACK_START
+
+
+_PROCESS_START = _process_start()
+
+
+def seconds_since_start() -> float:
+    return time.monotonic() - _PROCESS_START
+
+
+def mark(stage: str) -> float:
+    """Record that a startup stage was reached (first call per stage wins)."""
+    if stage not in _stages:
+        _stages[stage] = seconds_since_start()
+        metrics.set_gauge("startup_seconds", _stages[stage], stage=stage)
+    return _stages[stage]
+
+
+class _TimedLoader:
+    """Wraps a module loader to time exec_module; everything else is delegated to the real loader."""
+
+    def __init__(self, loader, name: str):
+        self._loader = loader
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+    def exec_module(self, module):
+        stack = _local.__dict__.setdefault("stack", [])
+        stack.append(0.0)  # time spent in nested imports, subtracted to get this module's own time
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            total = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += total
+            _module_seconds[self._name] = total - nested
+
+
+class _ImportTimer:
+    """sys.meta_path entry that asks the remaining finders for a spec and wraps its loader."""
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            find_spec = getattr(finder, "find_spec", None)
+            if finder is self or find_spec is None:
+                continue
+            spec = find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                spec.loader = _TimedLoader(spec.loader, fullname)
+            return spec
+        return None
+
+
+def install_import_timer() -> None:
+    if not any(isinstance(finder, _ImportTimer) for finder in sys.meta_path):
+        sys.meta_path.insert(0, _ImportTimer())
+
+
+def install_import_timer_from_env() -> None:
+    if os.environ.get("STARTUP_PROFILE_IMPORTS", "").lower() in ("1", "true", "yes"):
+        install_import_timer()
+
+
+def slowest_imports(top: int = 15) -> list[tuple[str, float]]:
+    """Modules with the largest own (exclusive) import time."""
+    return sorted(_module_seconds.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def imports_by_package(top: int = 10) -> list[tuple[str, float]]:
+    """Import time summed per top-level package (e.g. openai, sqlalchemy, fastapi)."""
+    totals: dict[str, float] = defaultdict(float)
+    for name, seconds in _module_seconds.items():
+        totals[name.split(".", 1)[0]] += seconds
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def report(top: int = 15) -> dict:
+    return {
+        "stages": dict(_stages),
+        "imports_by_package": imports_by_package(),
+        "slowest_imports": slowest_imports(top),
+    }
+
+
+def log_report() -> None:
+    lines = [f"  {stage}: {seconds:.3f}s" for stage, seconds in _stages.items()]
+    if _module_seconds:
+        lines.append("  imports by package:")
+        lines += [f"    {name}: {seconds * 1000:.1f}ms" for name, seconds in imports_by_package()]
+        lines.append("  slowest modules:")
+        lines += [f"    {name}: {seconds * 1000:.1f}ms" for name, seconds in slowest_imports()]
+    logger.info("Startup profile (seconds since process start):\n%s", "\n".join(lines))
+
+
+def reset() -> None:
+    _stages.clear()
+    _module_seconds.clear()
+
+
+class FirstRequestMiddleware:
+    """ASGI middleware marking the `first_request` stage and logging the startup report once."""
+
+    def __init__(self, app):
+        self.app = app
+        self._seen = False
+
+    async def __call__(self, scope, receive, send):
+        if not self._seen and scope["type"] in ("http", "websocket"):
+            self._seen = True
+            mark("first_request")
+            log_report()
+        await self.app(scope, receive, send)
@@ -0,0 +1,167 @@
+"""
+Resumable SSE streams: the generation runs in a background task and its frames are kept in a bounded
+in-memory buffer, so a client that lost its connection can reconnect with Last-Event-ID and continue
+from the next event instead of starting a new (paid) generation.
+
+Buffers are per worker process: with several workers, reconnects must reach the same worker (sticky sessions).
+"""
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import aclosing
+from typing import AsyncIterator
+
+from helpers.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayGap(Exception):
+    """The requested events were already dropped from the bounded buffer."""
+
+
+class ReplayStream:
+    """Numbered frames of one generation (ids start at 1), readable by any number of subscribers."""
+
+    def __init__(self, stream_id: str, max_events: int, resume_grace_seconds: float):
+        self.stream_id = stream_id
+        self.max_events = max_events
+        self.resume_grace_seconds = resume_grace_seconds
+        self.done = False
+        self.finished_at: float | None = None
+        self.task: asyncio.Task | None = None
+        self._frames: deque[str] = deque()
+        self._first_id = 1
+        self._next_id = 1
+        self._changed = asyncio.Event()
+        self._subscribers = 0
+        self._abandon_handle: asyncio.TimerHandle | None = None
+
+    @property
+    def last_event_id(self) -> int:
+        return self._next_id - 1
+
+    def can_resume_from(self, last_event_id: int) -> bool:
+        return self._first_id <= last_event_id + 1 <= self._next_id
+
+    def append(self, frame: str) -> None:
+        self._frames.append(frame)
+        self._next_id += 1
+        if len(self._frames) > self.max_events:
+            self._frames.popleft()
+            self._first_id += 1
+        self._notify()
+
+    def finish(self) -> None:
+        self.done = True
+        self.finished_at = time.monotonic()
+        if self._abandon_handle is not None:
+            self._abandon_handle.cancel()
+        self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def events(self, last_event_id: int = 0) -> AsyncIterator[tuple[int, str]]:
+        """Yield (event_id, frame) after `last_event_id`, waiting for new frames until the generation is done."""
+        self._attach()
+        try:
+            next_id = last_event_id + 1
+            while True:
+                while next_id < self._next_id:
+                    # Re-checked per frame: a slow reader can fall behind the bounded buffer while suspended
+                    if next_id < self._first_id:
+                        raise ReplayGap(f"events before {self._first_id} are no longer buffered")
+                    yield next_id, self._frames[next_id - self._first_id]
+                    next_id += 1
+                if self.done:
+                    return
+                await self._changed.wait()
+        finally:
+            self._detach()
+
+    def _attach(self) -> None:
+        self._subscribers += 1
+        if self._abandon_handle is not None:
+            self._abandon_handle.cancel()
+            self._abandon_handle = None
+
+    def _detach(self) -> None:
+        self._subscribers -= 1
+        if self._subscribers == 0 and not self.done and self.task is not None:
+            # Keep generating for a while so the client can resume; give up if nobody comes back
+            loop = asyncio.get_running_loop()
+            self._abandon_handle = loop.call_later(self.resume_grace_seconds, self._abandon)
+
+    def _abandon(self) -> None:
+        self._abandon_handle = None
+        if self._subscribers == 0 and not self.done and self.task is not None:
+            logger.info("Stream %s abandoned (no client within %ss); cancelling generation", self.stream_id, self.resume_grace_seconds)
+            self.task.cancel()
+
+
+class StreamReplayBuffer:
+    """Bounded set of ReplayStreams (by count, events per stream and TTL after completion)."""
+
+    def __init__(
+        self,
+        ttl_seconds: float | None = None,
+        max_streams: int | None = None,
+        max_events: int | None = None,
+        resume_grace_seconds: float | None = None,
+    ):
+        settings = get_settings()
+        self.ttl_seconds = settings.STREAM_REPLAY_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_streams = settings.STREAM_REPLAY_MAX_STREAMS if max_streams is None else max_streams
+        self.max_events = settings.STREAM_REPLAY_MAX_EVENTS if max_events is None else max_events
+        self.resume_grace_seconds = (
+            settings.STREAM_RESUME_GRACE_SECONDS if resume_grace_seconds is None else resume_grace_seconds
+        )
+        self._streams: OrderedDict[str, ReplayStream] = OrderedDict()
+
+    def start(self, frames: AsyncIterator[str]) -> ReplayStream:
+        """Run `frames` to completion in a background task, buffering every frame."""
+        self._evict_expired()
+        while len(self._streams) >= self.max_streams:
+            # Prefer dropping the oldest finished stream; only cut a running generation when all are running
+            victim = next((s for s in self._streams.values() if s.done), None)
+            if victim is None:
+                victim = next(iter(self._streams.values()))
+                victim.task.cancel()
+            del self._streams[victim.stream_id]
+        stream = ReplayStream(uuid.uuid4().hex, self.max_events, self.resume_grace_seconds)
+        stream.task = asyncio.create_task(self._pump(stream, frames))
+        self._streams[stream.stream_id] = stream
+        return stream
+
+    def get(self, stream_id: str) -> ReplayStream | None:
+        self._evict_expired()
+        return self._streams.get(stream_id)
+
+    async def _pump(self, stream: ReplayStream, frames: AsyncIterator[str]) -> None:
+        try:
+            async with aclosing(frames):
+                async for frame in frames:
+                    stream.append(frame)
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            logger.exception("Stream %s failed", stream.stream_id)
+        finally:
+            stream.finish()
+
+    def _evict_expired(self) -> None:
+        now = time.monotonic()
+        for stream_id, stream in list(self._streams.items()):
+            if stream.done and now - stream.finished_at >= self.ttl_seconds:
+                del self._streams[stream_id]
+
+    async def close(self) -> None:
+        tasks = [s.task for s in self._streams.values() if s.task is not None and not s.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._streams.clear()
@@ -0,0 +1,53 @@
+"""
+Streaming text chunking for knowledge-base ingest: documents are read, decoded and chunked piece by piece,
+so a large upload never has to be held in memory as one string.
+"""
+import codecs
+from typing import AsyncIterable, Awaitable, Callable
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English); cheap enough for budgeting on every request."""
+    if not text:
+        return 0
+    return max(1, (len(text) + 3) // 4)
+
+
+async def iter_decoded(read: Callable[[int], Awaitable[bytes]], read_size: int = 64 * 1024, encoding: str = "utf-8"):
+    """Yield decoded text pieces from an async `read(n)` (e.g. UploadFile.read), handling split multi-byte characters."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    while True:
+        data = await read(read_size)
+        if not data:
+            break
+        text = decoder.decode(data)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+async def iter_chunks(pieces: AsyncIterable[str], chunk_words: int = 200, overlap_words: int = 30):
+    """
+    Turn a stream of text pieces into word-window chunks of `chunk_words` words, consecutive chunks sharing
+    `overlap_words` words. Only the current window is buffered.
+    """
+    overlap_words = max(0, min(overlap_words, chunk_words - 1))
+    words: list[str] = []
+    carry = ""
+    emitted = False
+    async for piece in pieces:
+        text = carry + piece
+        parts = text.split()
+        # A word may continue in the next piece
+        carry = parts.pop() if parts and not text[-1].isspace() else ""
+        words.extend(parts)
+        while len(words) >= chunk_words:
+            yield " ".join(words[:chunk_words])
+            emitted = True
+            words = words[chunk_words - overlap_words:]
+    if carry:
+        words.append(carry)
+    if words and (not emitted or len(words) > overlap_words):
+        yield " ".join(words)
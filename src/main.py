@@ -3,19 +3,36 @@ import sys
 from contextlib import asynccontextmanager
 from pathlib import Path
 
+from helpers import startup_profiler
+
+startup_profiler.install_import_timer_from_env()  # must run before the heavy imports below
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, Response
+from fastapi.responses import FileResponse, Response, PlainTextResponse
 
 from routes import api
 
 from helpers.config import get_settings
+from helpers import metrics
 from stores.LLM import OpenAIProvider
+from stores.Embeddings import EmbeddingProviderFactory
+from controllers.compaction import CompactionWorker
+from controllers.purge import PurgeWorker
+from controllers.chat_jobs import ChatJobPool
+from helpers.invalidation_bus import InvalidationBus
+from helpers.stream_replay import StreamReplayBuffer
+from helpers.db_routing import RoutingSessionFactory
+from helpers.admission import AdmissionController
+from helpers.loop_monitor import LoopLagSampler, LoopStallMonitor, shared_sampler_interval
+from helpers.request_profiler import RequestProfiler, RequestProfilerMiddleware
 
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 
+startup_profiler.mark("imports")
+
 
 def _setup_logging():
     """Configure logging so app and library loggers (e.g. OpenAI errors) show in the terminal."""
@@ -36,27 +53,46 @@ def _setup_logging():
     logging.getLogger("uvicorn.access").setLevel(logging.WARNING)  # optional: reduce access log noise
 
 
-_setup_logging()
 logger = logging.getLogger(__name__)
 
 
+def _postgres_url(settings, host: str, port: int) -> str:
+    return (
+        f"postgresql+asyncpg://{settings.POSTGRES_USERNAME}:{settings.POSTGRES_PASSWORD}"
+        f"@{host}:{port}/{settings.POSTGRES_MAIN_DATABASE}"
+    )
+
+
+def _replica_addresses(settings) -> list[tuple[str, int]]:
+    addresses = []
+    for entry in settings.DB_REPLICA_HOSTS.split(","):
+        host, _, port = entry.strip().partition(":")
+        if host:
+            addresses.append((host, int(port) if port else settings.POSTGRES_PORT))
+    return addresses
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Settings are read here (once, then cached) rather than at import, so importing the app stays cheap
+    _setup_logging()
     settings = get_settings()
-    postgres_conn = (
-        f"postgresql+asyncpg://{settings.POSTGRES_USERNAME}:{settings.POSTGRES_PASSWORD}"
-        f"@{settings.POSTGRES_HOST}:{settings.POSTGRES_PORT}/{settings.POSTGRES_MAIN_DATABASE}"
-    )
-    app.db_engine = create_async_engine(postgres_conn)
-    app.db_client = sessionmaker(
-        app.db_engine,
-        class_=AsyncSession,
-        expire_on_commit=False,
+    app.db_engine = create_async_engine(_postgres_url(settings, settings.POSTGRES_HOST, settings.POSTGRES_PORT))
+    app.db_replica_engines = [
+        create_async_engine(_postgres_url(settings, host, port)) for host, port in _replica_addresses(settings)
+    ]
+    # Writes go to the primary; models send heavy reads to a replica (read-your-writes, see helpers/db_routing.py)
+    app.db_client = RoutingSessionFactory(
+        sessionmaker(app.db_engine, class_=AsyncSession, expire_on_commit=False),
+        [sessionmaker(engine, class_=AsyncSession, expire_on_commit=False) for engine in app.db_replica_engines],
+        sticky_seconds=settings.DB_REPLICA_STICKY_SECONDS,
     )
+    # Cheap: the OpenAI SDK and its HTTP client are only built on the first provider call
     app.openai_provider = OpenAIProvider(
         api_key=settings.OPENAI_API_KEY,
         default_generation_max_output_tokens=settings.GENERATION_DAFAULT_MAX_TOKENS,
         default_generation_temperature=settings.GENERATION_DAFAULT_TEMPERATURE,
+        request_timeout=settings.OPENAI_REQUEST_TIMEOUT_SECONDS,
     )
     app.openai_provider.set_generation_model(model_id=settings.GENERATION_MODEL_ID)
  
@@ -64,14 +100,56 @@ async def lifespan(app: FastAPI):
     app.openai_provider.stt_language = getattr(settings, "STT_LANGUAGE", None) or None
     app.openai_provider.set_tts_model(getattr(settings, "TTS_MODEL_ID", "tts-1") or "tts-1")
     app.openai_provider.tts_voice = getattr(settings, "TTS_VOICE", "alloy") or "alloy"
-    logger.info("Application startup complete (DB and OpenAI provider ready).")
+    app.embedding_provider = EmbeddingProviderFactory(settings).create()
+    app.stream_replay = StreamReplayBuffer()
+    # One heartbeat per worker feeds both admission control (loop lag) and the stall monitor
+    app.loop_lag_sampler = LoopLagSampler(shared_sampler_interval(settings))
+    app.loop_lag_sampler.start()
+    app.admission = AdmissionController(settings, sampler=app.loop_lag_sampler)
+    app.request_profiler = RequestProfiler(settings)
+    app.loop_monitor = None
+    if settings.LOOP_MONITOR_ENABLED:
+        app.loop_monitor = LoopStallMonitor(settings, sampler=app.loop_lag_sampler)
+        app.loop_monitor.start()
+    # Starting the pool also re-enqueues jobs left queued (or orphaned while running) by a previous run
+    app.chat_job_pool = ChatJobPool(app.db_client, app.openai_provider, app.embedding_provider, settings)
+    await app.chat_job_pool.start()
+    app.invalidation_bus = InvalidationBus(app.db_engine)
+    app.invalidation_bus.start()
+    app.compaction_worker = None
+    if settings.COMPACTION_ENABLED:
+        app.compaction_worker = CompactionWorker(app.db_client, app.openai_provider, settings)
+        app.compaction_worker.start()
+    app.purge_worker = None
+    if settings.PURGE_ENABLED:
+        app.purge_worker = PurgeWorker(app.db_client, settings)
+        app.purge_worker.start()
+    startup_profiler.mark("lifespan")
+    logger.info(
+        "Application startup complete (DB with %s read replica(s) and OpenAI provider ready).",
+        len(app.db_replica_engines),
+    )
     yield
+    if app.compaction_worker is not None:
+        await app.compaction_worker.stop()
+    if app.purge_worker is not None:
+        await app.purge_worker.stop()
+    await app.chat_job_pool.stop()
+    await app.stream_replay.close()
+    if app.loop_monitor is not None:
+        await app.loop_monitor.stop()
+    await app.loop_lag_sampler.stop()
+    await app.invalidation_bus.stop()
+    for engine in app.db_replica_engines:
+        await engine.dispose()
     await app.db_engine.dispose()
     logger.info("Application shutdown complete.")
 
 
 app = FastAPI(title="AI Agent Platform", version="0.1.0", lifespan=lifespan)
 
+app.add_middleware(RequestProfilerMiddleware)
+app.add_middleware(startup_profiler.FirstRequestMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -94,6 +172,12 @@ async def favicon():
     return Response(status_code=204)
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Process metrics in Prometheus text format."""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
 app.include_router(api.api_router, prefix="/api/v1")
 
 
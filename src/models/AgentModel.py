@@ -1,6 +1,8 @@
 from .BaseDatamodel import BaseDatamodel
-from .ai_agent_platform_DB.schemes import Agent
-from sqlalchemy import select
+from .ai_agent_platform_DB.schemes import Agent, Session
+from sqlalchemy import select, update, func
+from helpers.local_cache import get_cache, AGENTS_CACHE, SESSIONS_CACHE
+from helpers.invalidation_bus import publish_invalidation
 
 
 class AgentModel(BaseDatamodel):
@@ -9,17 +11,65 @@ class AgentModel(BaseDatamodel):
         self.db_client = db_client
 
     async def get_by_id(self, agent_id: int) -> Agent | None:
-        """Get one agent by id."""
+        """Get one agent by id (served from the local cache when possible)."""
+        cache = get_cache(AGENTS_CACHE)
+        agent = cache.get(agent_id)
+        if agent is not None:
+            return agent
+        read_started = cache.read_started()
         async with self.db_client() as session:
-            result = await session.execute(select(Agent).where(Agent.agent_id == agent_id))
-            return result.scalar_one_or_none()
+            result = await session.execute(
+                select(Agent).where(Agent.agent_id == agent_id, Agent.deleted_at.is_(None))
+            )
+            agent = result.scalar_one_or_none()
+        cache.set(agent_id, agent, read_started)
+        return agent
+
+    async def get_many(self, agent_ids) -> dict[int, Agent]:
+        """Agents by id (missing ids are absent): cached ones from the local cache, the rest in one query."""
+        cache = get_cache(AGENTS_CACHE)
+        found = {}
+        missing = []
+        for agent_id in set(agent_ids):
+            agent = cache.get(agent_id)
+            if agent is not None:
+                found[agent_id] = agent
+            else:
+                missing.append(agent_id)
+        if missing:
+            read_started = cache.read_started()
+            async with self.db_client() as session:
+                result = await session.execute(
+                    select(Agent).where(Agent.agent_id.in_(missing), Agent.deleted_at.is_(None))
+                )
+                for agent in result.scalars().all():
+                    cache.set(agent.agent_id, agent, read_started)
+                    found[agent.agent_id] = agent
+        return found
 
     async def list_all(self) -> list[Agent]:
         """List all AI agents (Assessment: list of agents)."""
-        async with self.db_client() as session:
-            result = await session.execute(select(Agent).order_by(Agent.created_at))
+        async with self.read_session(("agents",)) as session:
+            result = await session.execute(
+                select(Agent).where(Agent.deleted_at.is_(None)).order_by(Agent.created_at)
+            )
             return list(result.scalars().all())
 
+    async def list_version(self) -> tuple[int, int, int]:
+        """
+        Fingerprint of list_all() without loading rows: (count, max agent_id, sum of versions) of live agents.
+        Ids and versions only grow, so any create, update or delete changes it.
+        """
+        async with self.read_session(("agents",)) as session:
+            result = await session.execute(
+                select(
+                    func.count(),
+                    func.coalesce(func.max(Agent.agent_id), 0),
+                    func.coalesce(func.sum(Agent.version), 0),
+                ).where(Agent.deleted_at.is_(None))
+            )
+            return tuple(result.one())
+
     async def create_agent(self, agent: Agent) -> Agent:
         """Create an AI agent (Assessment: add a new AI agent)."""
         async with self.db_client() as session:
@@ -29,22 +79,53 @@ class AgentModel(BaseDatamodel):
             await session.refresh(agent)
         return agent
 
-    async def update_agent(self, agent: Agent) -> Agent:
-        """Update an existing agent (Assessment: edit agent)."""
+    async def update_agent(self, agent_id: int, changes: dict) -> Agent | None:
+        """
+        Update an existing agent (Assessment: edit agent). Only the columns in `changes` are written, with one
+        UPDATE, so concurrent writes to other columns (or a delete) are not overwritten; cached instances are never
+        modified. Returns the updated row, or None if the agent is unknown or deleted.
+        """
         async with self.db_client() as session:
-            merged = await session.merge(agent)
-            await session.commit()
-            await session.refresh(merged)
-        return merged
+            async with session.begin():
+                result = await session.execute(
+                    update(Agent)
+                    .where(Agent.agent_id == agent_id, Agent.deleted_at.is_(None))
+                    .values(**changes, version=Agent.version + 1)
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount == 0:
+                    return None
+                await publish_invalidation(session, AGENTS_CACHE, agent_id)
+                updated = (await session.execute(select(Agent).where(Agent.agent_id == agent_id))).scalar_one()
+        self.mark_written(("agents",), ("agent_id", agent_id))
+        return updated
 
     async def delete_agent(self, agent_id: int) -> bool:
-        """Delete an agent by id. Returns True if deleted."""
+        """
+        Soft-delete an agent and its sessions: two UPDATEs, nothing is loaded. The rows (messages, knowledge
+        chunks, ...) are removed later by the purge worker (controllers/purge.py). Returns True if deleted.
+        """
         async with self.db_client() as session:
             async with session.begin():
-                result = await session.execute(select(Agent).where(Agent.agent_id == agent_id))
-                agent = result.scalar_one_or_none()
-                if agent is None:
+                result = await session.execute(
+                    update(Agent)
+                    .where(Agent.agent_id == agent_id, Agent.deleted_at.is_(None))
+                    .values(deleted_at=func.now(), version=Agent.version + 1)
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount == 0:
                     return False
-                await session.delete(agent)
-                await session.commit()
+                session_ids = (
+                    await session.execute(
+                        update(Session)
+                        .where(Session.agent_id == agent_id, Session.deleted_at.is_(None))
+                        .values(deleted_at=func.now(), version=Session.version + 1)
+                        .returning(Session.session_id)
+                        .execution_options(synchronize_session=False)
+                    )
+                ).scalars().all()
+                await publish_invalidation(session, AGENTS_CACHE, agent_id)
+                for session_id in session_ids:
+                    await publish_invalidation(session, SESSIONS_CACHE, session_id)
+        self.mark_written(("agents",), ("agent_id", agent_id))
         return True
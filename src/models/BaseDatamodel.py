@@ -4,4 +4,18 @@ from helpers.config import get_settings
 class BaseDatamodel:
     def __init__(self,db_client:object):
         self.db_client = db_client
-        self.app_settings = get_settings()
\ No newline at end of file
+        self.app_settings = get_settings()
+
+    def read_session(self, sticky_key: tuple | None = None):
+        """
+        Session for a read-only query: a read replica when db_client routes reads (helpers/db_routing.py),
+        except right after `sticky_key` was written; otherwise the primary.
+        """
+        reader = getattr(self.db_client, "reader", None)
+        return reader(sticky_key) if reader is not None else self.db_client()
+
+    def mark_written(self, *sticky_keys: tuple) -> None:
+        """Read-your-writes for bulk UPDATE/DELETE statements, which the flush-based tracking does not see."""
+        mark = getattr(self.db_client, "mark_written", None)
+        if mark is not None:
+            mark(sticky_keys)
@@ -0,0 +1,139 @@
+from datetime import datetime
+
+from .BaseDatamodel import BaseDatamodel
+from .MessageModel import add_message
+from .ai_agent_platform_DB.schemes import ChatJob, Message
+from sqlalchemy import select, update, func, or_, and_
+from stores.LLMEnums import OpenAIEnums, ChatJobStatusEnums
+
+
+def _owned(job_id: int, attempt: int):
+    """The job is still running the given attempt (not finished, nor requeued and claimed again)."""
+    return (
+        ChatJob.job_id == job_id,
+        ChatJob.status == ChatJobStatusEnums.RUNNING.value,
+        ChatJob.attempts == attempt,
+    )
+
+
+async def complete_job(db_session, job_id: int, attempt: int, assistant_message_id: int) -> bool:
+    """
+    Mark the job succeeded with its reply inside the caller's open transaction, only if `attempt` still owns it.
+    Returns False otherwise: the caller rolls back, so a run that outlived its timeout stores no second reply.
+    """
+    result = await db_session.execute(
+        update(ChatJob)
+        .where(*_owned(job_id, attempt))
+        .values(status=ChatJobStatusEnums.SUCCEEDED.value, assistant_message_id=assistant_message_id, error=None, finished_at=func.now())
+    )
+    return result.rowcount == 1
+
+
+class ChatJobModel(BaseDatamodel):
+    def __init__(self, db_client: object):
+        super().__init__(db_client=db_client)
+        self.db_client = db_client
+
+    async def get_by_id(self, job_id: int) -> ChatJob | None:
+        async with self.db_client() as db_session:
+            result = await db_session.execute(select(ChatJob).where(ChatJob.job_id == job_id))
+            return result.scalar_one_or_none()
+
+    async def create_job(self, session_id: int, content: str) -> ChatJob:
+        """Store the user message and a queued job for it in one transaction."""
+        async with self.db_client() as db_session:
+            async with db_session.begin():
+                user_message = Message(session_id=session_id, role=OpenAIEnums.ROLE_USER.value, content=content)
+                await add_message(db_session, user_message)
+                job = ChatJob(
+                    session_id=session_id,
+                    user_message_id=user_message.message_id,
+                    status=ChatJobStatusEnums.QUEUED.value,
+                )
+                db_session.add(job)
+            await db_session.commit()
+            await db_session.refresh(job)
+        return job
+
+    async def claim(self, job_id: int, max_attempts: int) -> ChatJob | None:
+        """
+        Move a queued job to running. Conditional, so a job enqueued twice (or in two workers) runs once, and a job
+        that already used `max_attempts` runs no more (fail_exhausted marks it failed).
+        """
+        async with self.db_client() as db_session:
+            async with db_session.begin():
+                result = await db_session.execute(
+                    update(ChatJob)
+                    .where(
+                        ChatJob.job_id == job_id,
+                        ChatJob.status == ChatJobStatusEnums.QUEUED.value,
+                        ChatJob.attempts < max_attempts,
+                    )
+                    .values(status=ChatJobStatusEnums.RUNNING.value, started_at=func.now(), attempts=ChatJob.attempts + 1)
+                )
+                if result.rowcount == 0:
+                    return None
+                job = await db_session.get(ChatJob, job_id, populate_existing=True)
+            return job
+
+    async def fail(self, job_id: int, attempt: int, error: str) -> bool:
+        """Mark the job failed, only if `attempt` still owns it (see complete_job). Returns whether it did."""
+        async with self.db_client() as db_session:
+            async with db_session.begin():
+                result = await db_session.execute(
+                    update(ChatJob)
+                    .where(*_owned(job_id, attempt))
+                    .values(status=ChatJobStatusEnums.FAILED.value, error=error, finished_at=func.now())
+                )
+                return result.rowcount == 1
+
+    async def fail_exhausted(self, started_before: datetime, max_attempts: int) -> int:
+        """
+        Mark failed the jobs that used up `max_attempts` and would otherwise run again: stale running jobs (see
+        requeue_stale) and queued ones. Returns how many.
+        """
+        async with self.db_client() as db_session:
+            async with db_session.begin():
+                result = await db_session.execute(
+                    update(ChatJob)
+                    .where(
+                        ChatJob.attempts >= max_attempts,
+                        or_(
+                            ChatJob.status == ChatJobStatusEnums.QUEUED.value,
+                            and_(
+                                ChatJob.status == ChatJobStatusEnums.RUNNING.value,
+                                ChatJob.started_at < started_before,
+                            ),
+                        ),
+                    )
+                    .values(
+                        status=ChatJobStatusEnums.FAILED.value,
+                        error=f"Gave up after {max_attempts} attempts",
+                        finished_at=func.now(),
+                    )
+                )
+                return result.rowcount
+
+    async def requeue_stale(self, started_before: datetime, max_attempts: int) -> list[int]:
+        """
+        Put running jobs that started before `started_before` back in the queue (their worker died: a live one
+        would have timed them out by now), then return the ids of all queued jobs that have attempts left, oldest
+        first. Jobs without attempts left are not requeued (see fail_exhausted).
+        """
+        async with self.db_client() as db_session:
+            async with db_session.begin():
+                await db_session.execute(
+                    update(ChatJob)
+                    .where(
+                        ChatJob.status == ChatJobStatusEnums.RUNNING.value,
+                        ChatJob.started_at < started_before,
+                        ChatJob.attempts < max_attempts,
+                    )
+                    .values(status=ChatJobStatusEnums.QUEUED.value)
+                )
+                result = await db_session.execute(
+                    select(ChatJob.job_id)
+                    .where(ChatJob.status == ChatJobStatusEnums.QUEUED.value, ChatJob.attempts < max_attempts)
+                    .order_by(ChatJob.job_id.asc())
+                )
+                return list(result.scalars().all())
@@ -0,0 +1,98 @@
+import math
+
+from .BaseDatamodel import BaseDatamodel
+from .ai_agent_platform_DB.schemes import KnowledgeChunk
+from sqlalchemy import select, delete, insert, func
+
+
+def _cosine_distance(a: list[float], b: list[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return 1.0 - (dot / norm if norm else 0.0)
+
+
+class KnowledgeModel(BaseDatamodel):
+    def __init__(self, db_client: object):
+        super().__init__(db_client=db_client)
+        self.db_client = db_client
+
+    async def create_chunks(self, chunks: list[dict]) -> int:
+        """Bulk insert a batch of chunks (dicts with KnowledgeChunk column values) in one statement."""
+        if not chunks:
+            return 0
+        async with self.db_client() as db_session:
+            async with db_session.begin():
+                await db_session.execute(insert(KnowledgeChunk), chunks)
+        return len(chunks)
+
+    async def has_chunks(self, agent_id: int) -> bool:
+        """Cheap existence check so agents without a knowledge base skip query embedding entirely."""
+        async with self.db_client() as db_session:
+            result = await db_session.execute(
+                select(KnowledgeChunk.chunk_id).where(KnowledgeChunk.agent_id == agent_id).limit(1)
+            )
+            return result.first() is not None
+
+    async def search_similar(self, agent_id: int, embedding: list[float], top_k: int) -> list[KnowledgeChunk]:
+        """
+        Top-k chunks of an agent by cosine distance to `embedding`, nearest first.
+        PostgreSQL orders by pgvector `<=>` (served by the HNSW index); other dialects rank in Python.
+        """
+        async with self.db_client() as db_session:
+            if db_session.bind.dialect.name == "postgresql":
+                result = await db_session.execute(
+                    select(KnowledgeChunk)
+                    .where(KnowledgeChunk.agent_id == agent_id)
+                    .order_by(KnowledgeChunk.embedding.cosine_distance(embedding))
+                    .limit(top_k)
+                )
+                return list(result.scalars().all())
+            result = await db_session.execute(
+                select(KnowledgeChunk).where(KnowledgeChunk.agent_id == agent_id)
+            )
+            chunks = list(result.scalars().all())
+            chunks.sort(key=lambda c: _cosine_distance(c.embedding, embedding))
+            return chunks[:top_k]
+
+    async def list_documents(self, agent_id: int) -> list[tuple[str, int, int]]:
+        """List (document_name, chunk_count, token_count) for an agent's knowledge base."""
+        async with self.db_client() as db_session:
+            result = await db_session.execute(
+                select(
+                    KnowledgeChunk.document_name,
+                    func.count(KnowledgeChunk.chunk_id),
+                    func.coalesce(func.sum(KnowledgeChunk.token_count), 0),
+                )
+                .where(KnowledgeChunk.agent_id == agent_id)
+                .group_by(KnowledgeChunk.document_name)
+                .order_by(KnowledgeChunk.document_name)
+            )
+            return [tuple(row) for row in result.all()]
+
+    async def last_chunk_id(self, agent_id: int, document_name: str) -> int | None:
+        """Highest chunk id of a stored document (None if absent): chunks above it belong to a newer version."""
+        async with self.db_client() as db_session:
+            result = await db_session.execute(
+                select(func.max(KnowledgeChunk.chunk_id)).where(
+                    KnowledgeChunk.agent_id == agent_id,
+                    KnowledgeChunk.document_name == document_name,
+                )
+            )
+            return result.scalar_one()
+
+    async def delete_document(
+        self, agent_id: int, document_name: str, through_chunk_id: int | None = None, after_chunk_id: int | None = None
+    ) -> bool:
+        """
+        Delete the chunks of one document; with `through_chunk_id` / `after_chunk_id` only those up to / after that
+        id (one version of it, see last_chunk_id). Returns True if anything was deleted.
+        """
+        conditions = [KnowledgeChunk.agent_id == agent_id, KnowledgeChunk.document_name == document_name]
+        if through_chunk_id is not None:
+            conditions.append(KnowledgeChunk.chunk_id <= through_chunk_id)
+        if after_chunk_id is not None:
+            conditions.append(KnowledgeChunk.chunk_id > after_chunk_id)
+        async with self.db_client() as db_session:
+            async with db_session.begin():
+                result = await db_session.execute(delete(KnowledgeChunk).where(*conditions))
+        return result.rowcount > 0
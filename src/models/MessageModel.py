@@ -1,6 +1,99 @@
 from .BaseDatamodel import BaseDatamodel
-from .ai_agent_platform_DB.schemes import Message
-from sqlalchemy import select
+from .ai_agent_platform_DB.schemes import Message, MessageUsage, Session
+from sqlalchemy import Integer, select, update, delete, func, case, cast, literal, literal_column, null, or_, and_
+from sqlalchemy.orm import aliased
+from stores.LLMEnums import MessageRoleEnums
+from helpers.local_cache import SESSIONS_CACHE
+from helpers.invalidation_bus import publish_invalidation
+from helpers.db_routing import mark_written_on_commit
+
+# Text search configuration used by the generated messages.search_vector column (see alembic migration)
+SEARCH_TS_CONFIG = "simple"
+SEARCH_SNIPPET_CHARS = 160
+
+# Column projections for history reads. Rows come back as SQLAlchemy Row tuples (attribute access: row.role,
+# row.content) instead of ORM entities: no identity map, no change tracking, no per-object instance state.
+LISTING_COLUMNS = (Message.message_id, Message.session_id, Message.role, Message.content, Message.created_at)
+HISTORY_COLUMNS = (Message.message_id, Message.role, Message.content)
+
+
+def _like_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _like_snippet(content: str, query: str, width: int = SEARCH_SNIPPET_CHARS) -> str:
+    """Cut a window of content around the first (case-insensitive) match, marking it like ts_headline does."""
+    pos = content.lower().find(query.lower())
+    if pos < 0:
+        return content[:width]
+    start = max(0, pos - (width - len(query)) // 2)
+    end = min(len(content), start + width)
+    match_end = pos + len(query)
+    snippet = content[start:pos] + "<b>" + content[pos:match_end] + "</b>" + content[match_end:end]
+    return ("..." if start > 0 else "") + snippet + ("..." if end < len(content) else "")
+
+
+def fork_chain(session_id: int):
+    """
+    Recursive CTE over a session and its fork ancestors: one (session_id, through_message_id) row per session whose
+    messages make up the history. through_message_id is NULL for the session itself (all its messages) and the
+    fork point for each ancestor. One primary-key lookup per fork level; no message rows are read.
+    """
+    chain = (
+        select(
+            Session.session_id,
+            Session.parent_session_id,
+            Session.fork_message_id,
+            cast(null(), Integer).label("through_message_id"),
+        )
+        .where(Session.session_id == session_id)
+        .cte("fork_chain", recursive=True)
+    )
+    parent = aliased(Session)
+    return chain.union_all(
+        select(parent.session_id, parent.parent_session_id, parent.fork_message_id, chain.c.fork_message_id)
+        .where(parent.session_id == chain.c.parent_session_id)
+    )
+
+
+def history_select(session_id: int, forked: bool, columns):
+    """SELECT of a session's own messages, or for a fork, of the messages along its chain up to each fork point."""
+    stmt = select(*columns)
+    if not forked:
+        return stmt.where(Message.session_id == session_id)
+    chain = fork_chain(session_id)
+    return stmt.join(
+        chain,
+        and_(
+            Message.session_id == chain.c.session_id,
+            or_(chain.c.through_message_id.is_(None), Message.message_id <= chain.c.through_message_id),
+        ),
+    )
+
+
+async def add_message(db_session, message: Message) -> None:
+    """
+    Add a message inside the caller's open transaction and bump the session's denormalized
+    message_count / last_message_id / updated_at and its version. For writes that must commit together with the message.
+    """
+    db_session.add(message)
+    await db_session.flush()
+    result = await db_session.execute(
+        update(Session)
+        .where(Session.session_id == message.session_id)
+        .values(
+            message_count=Session.message_count + 1,
+            last_message_id=message.message_id,
+            updated_at=func.now(),
+            version=Session.version + 1,
+        )
+        .returning(Session.agent_id)
+    )
+    agent_id = result.scalar_one_or_none()
+    if agent_id is not None:
+        # The agent's session listing (order and counts) changed too; the flush only saw ("session_id", ...)
+        mark_written_on_commit(db_session, ("agent_id", agent_id))
+    await publish_invalidation(db_session, SESSIONS_CACHE, message.session_id)
 
 
 class MessageModel(BaseDatamodel):
@@ -16,27 +109,196 @@ class MessageModel(BaseDatamodel):
             )
             return result.scalar_one_or_none()
 
-    async def list_by_session(self, session_id: int) -> list[Message]:
-        """List messages in a session in chronological order (Assessment: chronological history)."""
-        async with self.db_client() as db_session:
+    async def list_by_session(self, session_id: int, columns=LISTING_COLUMNS, forked: bool = False) -> list:
+        """
+        List messages in a session in chronological order (Assessment: chronological history). Excludes compaction summaries.
+        Returns Row tuples of `columns` (see LISTING_COLUMNS / HISTORY_COLUMNS), not ORM entities.
+        With `forked` (the session has a parent_session_id) the inherited messages along the fork chain come first.
+        """
+        async with self.read_session(("session_id", session_id)) as db_session:
             result = await db_session.execute(
-                select(Message)
-                .where(Message.session_id == session_id)
-                .order_by(Message.created_at.asc())
+                history_select(session_id, forked, columns)
+                .where(Message.role != MessageRoleEnums.ROLE_SUMMARY.value)
+                .order_by(Message.created_at.asc(), Message.message_id.asc())
+            )
+            return result.all()
+
+    async def list_context(
+        self,
+        session_id: int,
+        summary_message_id: int | None,
+        after_message_id: int | None,
+        columns=HISTORY_COLUMNS,
+        forked: bool = False,
+    ) -> list:
+        """
+        Messages the model needs for a compacted session: the summary message (if any) followed by
+        the raw messages newer than `after_message_id` (along the fork chain with `forked`), in chronological order.
+        Row tuples of `columns`.
+        """
+        async with self.read_session(("session_id", session_id)) as db_session:
+            stmt = history_select(session_id, forked, columns).where(
+                Message.role != MessageRoleEnums.ROLE_SUMMARY.value
             )
-            return list(result.scalars().all())
+            if after_message_id is not None:
+                stmt = stmt.where(Message.message_id > after_message_id)
+            result = await db_session.execute(stmt.order_by(Message.created_at.asc(), Message.message_id.asc()))
+            messages = result.all()
+            if summary_message_id is not None:
+                summary = (
+                    await db_session.execute(select(*columns).where(Message.message_id == summary_message_id))
+                ).first()
+                if summary is not None:
+                    messages.insert(0, summary)
+            return messages
 
-    async def create_message(self, message: Message) -> Message:
-        """Store a user or agent message (Assessment: all messages stored in DB)."""
+    async def store_summary(
+        self,
+        session_id: int,
+        content: str,
+        previous_through_message_id: int | None,
+        through_message_id: int,
+        covered_count: int,
+        tokens_saved: int,
+    ) -> Message | None:
+        """
+        Atomically store a new compaction summary for a session and advance its compaction state.
+        The session update is conditional on `previous_through_message_id`, so two workers compacting the
+        same session cannot both win; returns None (nothing stored) for the loser.
+        Summary rows do not touch the session's message_count / last_message_id.
+        """
         async with self.db_client() as db_session:
-            async with db_session.begin():
-                db_session.add(message)
+            transaction = await db_session.begin()
+            try:
+                summary = Message(session_id=session_id, role=MessageRoleEnums.ROLE_SUMMARY.value, content=content)
+                db_session.add(summary)
+                await db_session.flush()
+                if previous_through_message_id is None:
+                    unchanged = Session.compacted_through_message_id.is_(None)
+                else:
+                    unchanged = Session.compacted_through_message_id == previous_through_message_id
+                result = await db_session.execute(
+                    update(Session)
+                    .where(Session.session_id == session_id, unchanged)
+                    .values(
+                        summary_message_id=summary.message_id,
+                        compacted_through_message_id=through_message_id,
+                        compacted_message_count=Session.compacted_message_count + covered_count,
+                        compaction_tokens_saved=Session.compaction_tokens_saved + tokens_saved,
+                        version=Session.version + 1,
+                        updated_at=Session.updated_at,  # background bookkeeping, not session activity
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount == 0:
+                    await transaction.rollback()
+                    return None
+                # Older summaries are superseded by this one (it already includes them)
+                await db_session.execute(
+                    delete(Message).where(
+                        Message.session_id == session_id,
+                        Message.role == MessageRoleEnums.ROLE_SUMMARY.value,
+                        Message.message_id != summary.message_id,
+                    )
+                )
+                await publish_invalidation(db_session, SESSIONS_CACHE, session_id)
+                await transaction.commit()
+            except BaseException:
+                await transaction.rollback()
+                raise
+        return summary
+
+    async def search(
+        self,
+        query: str,
+        agent_id: int | None = None,
+        session_id: int | None = None,
+        role: str | None = None,
+        limit: int = 20,
+        after: tuple[float, int] | None = None,
+    ) -> list[dict]:
+        """
+        Full-text search over message content, ranked, with keyset pagination on (rank, message_id).
+        PostgreSQL uses the generated search_vector column (GIN index); other dialects (SQLite tests) fall back to LIKE.
+        `after` is the (rank, message_id) of the last hit of the previous page.
+        Served by a read replica when configured, so very recent messages may not be found yet.
+        """
+        async with self.read_session() as db_session:
+            is_postgres = db_session.bind.dialect.name == "postgresql"
+            if is_postgres:
+                tsquery = func.websearch_to_tsquery(SEARCH_TS_CONFIG, query)
+                search_vector = literal_column("messages.search_vector")
+                rank = func.ts_rank_cd(search_vector, tsquery)
+                snippet = func.ts_headline(
+                    SEARCH_TS_CONFIG, Message.content, tsquery, "MaxFragments=2, MaxWords=25, MinWords=8"
+                )
+                match = search_vector.op("@@")(tsquery)
+            else:
+                rank = literal(0.0)
+                snippet = Message.content
+                match = Message.content.ilike(f"%{_like_escape(query)}%", escape="\\")
+
+            stmt = (
+                select(
+                    Message.message_id,
+                    Message.session_id,
+                    Session.agent_id,
+                    Message.role,
+                    Message.created_at,
+                    rank.label("rank"),
+                    snippet.label("snippet"),
+                )
+                .join(Session, Session.session_id == Message.session_id)
+                .where(match, Session.deleted_at.is_(None))
+            )
+            if agent_id is not None:
+                stmt = stmt.where(Session.agent_id == agent_id)
+            if session_id is not None:
+                stmt = stmt.where(Message.session_id == session_id)
+            if role is not None:
+                stmt = stmt.where(Message.role == role)
+            if after is not None:
+                after_rank, after_id = after
+                stmt = stmt.where(or_(rank < after_rank, and_(rank == after_rank, Message.message_id < after_id)))
+            stmt = stmt.order_by(rank.desc(), Message.message_id.desc()).limit(limit)
+
+            result = await db_session.execute(stmt)
+            hits = []
+            for row in result.mappings().all():
+                hit = dict(row)
+                hit["rank"] = float(hit["rank"] or 0.0)
+                if not is_postgres:
+                    hit["snippet"] = _like_snippet(hit["snippet"], query)
+                hits.append(hit)
+            return hits
+
+    async def create_message(self, message: Message, usage: MessageUsage | None = None, guard=None) -> Message | None:
+        """
+        Store a user or agent message (Assessment: all messages stored in DB).
+        Also bumps the session's denormalized message_count / last_message_id / updated_at in the same transaction,
+        and stores `usage` (assistant replies: tokens and timings) for the new message.
+        `guard(db_session, message)` runs last in that transaction; when it returns False nothing is stored (None).
+        """
+        async with self.db_client() as db_session:
+            async with db_session.begin() as transaction:
+                await add_message(db_session, message)
+                if usage is not None:
+                    usage.message_id = message.message_id
+                    db_session.add(usage)
+                if guard is not None and not await guard(db_session, message):
+                    await transaction.rollback()
+                    return None
             await db_session.commit()
             await db_session.refresh(message)
         return message
 
     async def delete_message(self, message_id: int) -> bool:
-        """Delete a message by id. Returns True if deleted."""
+        """
+        Delete a message by id. Returns True if deleted.
+        Reverses add_message in the same transaction: message_count (and compacted_message_count for a summarized
+        turn) goes down by one and last_message_id falls back to the session's previous message (for a fork with none
+        of its own: the fork point; else NULL). Deleting a compaction summary only bumps the version.
+        """
         async with self.db_client() as db_session:
             async with db_session.begin():
                 result = await db_session.execute(
@@ -45,6 +307,35 @@ class MessageModel(BaseDatamodel):
                 message = result.scalar_one_or_none()
                 if message is None:
                     return False
+                session_id = message.session_id
+                counted = message.role != MessageRoleEnums.ROLE_SUMMARY.value
                 await db_session.delete(message)
-                await db_session.commit()
+                await db_session.flush()
+                values = {"version": Session.version + 1}
+                if counted:
+                    previous = (
+                        select(func.max(Message.message_id))
+                        .where(Message.session_id == session_id, Message.role != MessageRoleEnums.ROLE_SUMMARY.value)
+                        .scalar_subquery()
+                    )
+                    values.update(
+                        message_count=Session.message_count - 1,
+                        last_message_id=func.coalesce(previous, Session.fork_message_id),
+                        # Keep message_count - compacted_message_count (turns not yet summarized) right
+                        compacted_message_count=case(
+                            (Session.compacted_through_message_id >= message_id, Session.compacted_message_count - 1),
+                            else_=Session.compacted_message_count,
+                        ),
+                    )
+                result = await db_session.execute(
+                    update(Session)
+                    .where(Session.session_id == session_id)
+                    .values(**values)
+                    .returning(Session.agent_id)
+                    .execution_options(synchronize_session=False)
+                )
+                agent_id = result.scalar_one_or_none()
+                if agent_id is not None and counted:
+                    mark_written_on_commit(db_session, ("agent_id", agent_id))
+                await publish_invalidation(db_session, SESSIONS_CACHE, session_id)
         return True
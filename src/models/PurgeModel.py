@@ -0,0 +1,60 @@
+from .BaseDatamodel import BaseDatamodel
+from .ai_agent_platform_DB.schemes import Agent, Session, Message, KnowledgeChunk
+from sqlalchemy import select, delete, exists
+from sqlalchemy.orm import aliased
+
+
+class PurgeModel(BaseDatamodel):
+    """
+    Hard deletes of soft-deleted agents and sessions, one bounded batch per call (each in its own short
+    transaction). Large child tables are emptied in batches first, so the final parent DELETE, which relies on
+    the database's ON DELETE CASCADE for anything left (chat jobs, rows written meanwhile), stays small.
+    Sessions that still have forks keep their rows and messages (the forks' history reads them); they are purged
+    once their forks are, on a later pass.
+    """
+
+    def __init__(self, db_client: object):
+        super().__init__(db_client=db_client)
+        self.db_client = db_client
+
+    async def _delete(self, stmt) -> int:
+        async with self.db_client() as db_session:
+            async with db_session.begin():
+                result = await db_session.execute(stmt.execution_options(synchronize_session=False))
+        return result.rowcount
+
+    @staticmethod
+    def _purgeable_sessions():
+        """Soft-deleted sessions without forks (deleted or not)."""
+        fork = aliased(Session)
+        has_forks = exists().where(fork.parent_session_id == Session.session_id)
+        return select(Session.session_id).where(Session.deleted_at.is_not(None), ~has_forks)
+
+    async def purge_messages(self, batch_size: int) -> int:
+        """Delete up to `batch_size` messages of soft-deleted sessions."""
+        batch = (
+            select(Message.message_id)
+            .where(Message.session_id.in_(self._purgeable_sessions()))
+            .limit(batch_size)
+        )
+        return await self._delete(delete(Message).where(Message.message_id.in_(batch)))
+
+    async def purge_knowledge_chunks(self, batch_size: int) -> int:
+        """Delete up to `batch_size` knowledge chunks of soft-deleted agents."""
+        batch = (
+            select(KnowledgeChunk.chunk_id)
+            .where(KnowledgeChunk.agent_id.in_(select(Agent.agent_id).where(Agent.deleted_at.is_not(None))))
+            .limit(batch_size)
+        )
+        return await self._delete(delete(KnowledgeChunk).where(KnowledgeChunk.chunk_id.in_(batch)))
+
+    async def purge_sessions(self, batch_size: int) -> int:
+        """Delete up to `batch_size` soft-deleted sessions (their remaining child rows cascade in the database)."""
+        batch = self._purgeable_sessions().limit(batch_size)
+        return await self._delete(delete(Session).where(Session.session_id.in_(batch)))
+
+    async def purge_agents(self, batch_size: int) -> int:
+        """Delete up to `batch_size` soft-deleted agents whose soft-deleted sessions are already purged."""
+        pending_sessions = exists().where(Session.agent_id == Agent.agent_id, Session.deleted_at.is_not(None))
+        batch = select(Agent.agent_id).where(Agent.deleted_at.is_not(None), ~pending_sessions).limit(batch_size)
+        return await self._delete(delete(Agent).where(Agent.agent_id.in_(batch)))
@@ -1,6 +1,17 @@
 from .BaseDatamodel import BaseDatamodel
-from .ai_agent_platform_DB.schemes import Session
-from sqlalchemy import select
+from .ai_agent_platform_DB.schemes import Session, Message
+from .MessageModel import history_select
+from sqlalchemy import select, update, func, or_, and_
+from datetime import datetime
+from helpers.local_cache import get_cache, SESSIONS_CACHE
+from helpers.invalidation_bus import publish_invalidation
+from stores.LLMEnums import MessageRoleEnums
+
+# Characters of the last message returned as preview in session listings
+LAST_MESSAGE_PREVIEW_CHARS = 120
+
+# Listing order: updated_at is NULL until a session's first write, and databases disagree on where NULLs sort
+LAST_ACTIVITY = func.coalesce(Session.updated_at, Session.created_at)
 
 
 class SessionModel(BaseDatamodel):
@@ -9,20 +20,114 @@ class SessionModel(BaseDatamodel):
         self.db_client = db_client
 
     async def get_by_id(self, session_id: int) -> Session | None:
-        """Get one session by id."""
+        """Get one session by id (served from the local cache when possible)."""
+        cache = get_cache(SESSIONS_CACHE)
+        session = cache.get(session_id)
+        if session is not None:
+            return session
+        read_started = cache.read_started()
         async with self.db_client() as db_session:
             result = await db_session.execute(
-                select(Session).where(Session.session_id == session_id)
+                select(Session).where(Session.session_id == session_id, Session.deleted_at.is_(None))
             )
-            return result.scalar_one_or_none()
+            session = result.scalar_one_or_none()
+        cache.set(session_id, session, read_started)
+        return session
+
+    async def get_many(self, session_ids) -> dict[int, Session]:
+        """Sessions by id (missing ids are absent): cached ones from the local cache, the rest in one query."""
+        cache = get_cache(SESSIONS_CACHE)
+        found = {}
+        missing = []
+        for session_id in set(session_ids):
+            session = cache.get(session_id)
+            if session is not None:
+                found[session_id] = session
+            else:
+                missing.append(session_id)
+        if missing:
+            read_started = cache.read_started()
+            async with self.db_client() as db_session:
+                result = await db_session.execute(
+                    select(Session).where(Session.session_id.in_(missing), Session.deleted_at.is_(None))
+                )
+                for session in result.scalars().all():
+                    cache.set(session.session_id, session, read_started)
+                    found[session.session_id] = session
+        return found
 
     async def list_by_agent(self, agent_id: int) -> list[Session]:
         """List all chat sessions for an agent (Assessment: multiple chat sessions per agent)."""
+        async with self.read_session(("agent_id", agent_id)) as db_session:
+            result = await db_session.execute(
+                select(Session)
+                .where(Session.agent_id == agent_id, Session.deleted_at.is_(None))
+                .order_by(LAST_ACTIVITY.desc(), Session.session_id.desc())
+            )
+            return list(result.scalars().all())
+
+    async def list_by_agent_with_stats(self, agent_id: int, limit: int | None = None, offset: int = 0) -> list[tuple]:
+        """
+        List sessions for an agent with message count, last message preview and last activity, in one query.
+        Uses the denormalized counters on sessions, so cost depends on page size only, not on message volume.
+        Returns (Session, last_message_preview) rows.
+        """
+        async with self.read_session(("agent_id", agent_id)) as db_session:
+            stmt = (
+                select(Session, func.substr(Message.content, 1, LAST_MESSAGE_PREVIEW_CHARS))
+                .outerjoin(Message, Message.message_id == Session.last_message_id)
+                .where(Session.agent_id == agent_id, Session.deleted_at.is_(None))
+                .order_by(LAST_ACTIVITY.desc(), Session.session_id.desc())
+                .offset(offset)
+            )
+            if limit is not None:
+                stmt = stmt.limit(limit)
+            result = await db_session.execute(stmt)
+            return [tuple(row) for row in result.all()]
+
+    async def get_version(self, session_id: int) -> int | None:
+        """Current version of a live session (None if unknown or deleted): one primary-key lookup, no row loaded."""
+        async with self.read_session(("session_id", session_id)) as db_session:
+            result = await db_session.execute(
+                select(Session.version).where(Session.session_id == session_id, Session.deleted_at.is_(None))
+            )
+            return result.scalar_one_or_none()
+
+    async def list_version(self, agent_id: int) -> tuple[int, int, int]:
+        """
+        Fingerprint of an agent's session listings without loading rows: (count, max session_id, sum of versions)
+        of its live sessions. Ids and versions only grow, so any create, new message or delete changes it.
+        """
+        async with self.read_session(("agent_id", agent_id)) as db_session:
+            result = await db_session.execute(
+                select(
+                    func.count(),
+                    func.coalesce(func.max(Session.session_id), 0),
+                    func.coalesce(func.sum(Session.version), 0),
+                ).where(Session.agent_id == agent_id, Session.deleted_at.is_(None))
+            )
+            return tuple(result.one())
+
+    async def list_compaction_candidates(
+        self, max_messages: int, idle_before: datetime, keep_recent: int, limit: int
+    ) -> list[Session]:
+        """
+        Sessions worth compacting: more than `max_messages` raw messages outside the summary, or idle since
+        `idle_before` with more than `keep_recent` such messages. Oldest activity first.
+        """
+        uncompacted = Session.message_count - Session.compacted_message_count
         async with self.db_client() as db_session:
             result = await db_session.execute(
                 select(Session)
-                .where(Session.agent_id == agent_id)
-                .order_by(Session.updated_at.desc())
+                .where(
+                    Session.deleted_at.is_(None),
+                    or_(
+                        uncompacted > max_messages,
+                        and_(Session.updated_at < idle_before, uncompacted > keep_recent),
+                    ),
+                )
+                .order_by(Session.updated_at.asc())
+                .limit(limit)
             )
             return list(result.scalars().all())
 
@@ -35,24 +140,78 @@ class SessionModel(BaseDatamodel):
             await db_session.refresh(session)
         return session
 
+    async def fork_session(self, parent: Session, fork_message_id: int) -> Session | None:
+        """
+        Copy-on-write fork: a new session of the same agent whose history is `parent`'s history up to and including
+        `fork_message_id`, without copying a message. The fork hangs off the session that owns that message (an
+        ancestor when it is inherited), which keeps chains short. message_count / last_message_id start at the
+        inherited history; counting it reads nothing when forking at the owner's last message.
+        Returns None if the message is not in `parent`'s history.
+        """
+        not_summary = Message.role != MessageRoleEnums.ROLE_SUMMARY.value
+        async with self.db_client() as db_session:
+            async with db_session.begin():
+                owner_id = (
+                    await db_session.execute(
+                        history_select(parent.session_id, parent.parent_session_id is not None, (Message.session_id,))
+                        .where(Message.message_id == fork_message_id, not_summary)
+                    )
+                ).scalar_one_or_none()
+                if owner_id is None:
+                    return None
+                owner = (
+                    await db_session.execute(
+                        select(Session.message_count, Session.last_message_id).where(Session.session_id == owner_id)
+                    )
+                ).one()
+                later = 0
+                if owner.last_message_id != fork_message_id:
+                    later = (
+                        await db_session.execute(
+                            select(func.count()).where(
+                                Message.session_id == owner_id, Message.message_id > fork_message_id, not_summary
+                            )
+                        )
+                    ).scalar_one()
+                fork = Session(
+                    agent_id=parent.agent_id,
+                    parent_session_id=owner_id,
+                    fork_message_id=fork_message_id,
+                    message_count=owner.message_count - later,
+                    last_message_id=fork_message_id,
+                )
+                db_session.add(fork)
+            await db_session.refresh(fork)
+        return fork
+
     async def update_session(self, session: Session) -> Session:
         """Update session (e.g. updated_at on new message)."""
         async with self.db_client() as db_session:
             merged = await db_session.merge(session)
+            merged.version = Session.version + 1
+            await publish_invalidation(db_session, SESSIONS_CACHE, session.session_id)
             await db_session.commit()
             await db_session.refresh(merged)
         return merged
 
     async def delete_session(self, session_id: int) -> bool:
-        """Delete a session by id. Returns True if deleted."""
+        """
+        Soft-delete a session (one UPDATE); its messages are removed later by the purge worker
+        (controllers/purge.py). Returns True if deleted.
+        """
         async with self.db_client() as db_session:
             async with db_session.begin():
-                result = await db_session.execute(
-                    select(Session).where(Session.session_id == session_id)
-                )
-                session = result.scalar_one_or_none()
-                if session is None:
+                agent_id = (
+                    await db_session.execute(
+                        update(Session)
+                        .where(Session.session_id == session_id, Session.deleted_at.is_(None))
+                        .values(deleted_at=func.now(), version=Session.version + 1)
+                        .returning(Session.agent_id)
+                        .execution_options(synchronize_session=False)
+                    )
+                ).scalar_one_or_none()
+                if agent_id is None:
                     return False
-                await db_session.delete(session)
-                await db_session.commit()
+                await publish_invalidation(db_session, SESSIONS_CACHE, session_id)
+        self.mark_written(("sessions",), ("session_id", session_id), ("agent_id", agent_id))
         return True
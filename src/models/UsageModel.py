@@ -0,0 +1,105 @@
+from datetime import datetime, timezone
+
+from .BaseDatamodel import BaseDatamodel
+from .ai_agent_platform_DB.schemes import MessageUsage
+from sqlalchemy import select, func
+
+# SQLite (tests) has no date_trunc; strftime gives the same bucket start as text
+_SQLITE_BUCKET_FORMATS = {"hour": "%Y-%m-%d %H:00:00", "day": "%Y-%m-%d 00:00:00"}
+
+
+def _total_tokens():
+    return func.coalesce(func.sum(MessageUsage.prompt_tokens), 0) + func.coalesce(func.sum(MessageUsage.completion_tokens), 0)
+
+
+def _aggregates() -> tuple:
+    return (
+        func.count().label("messages"),
+        func.coalesce(func.sum(MessageUsage.prompt_tokens), 0).label("prompt_tokens"),
+        func.coalesce(func.sum(MessageUsage.completion_tokens), 0).label("completion_tokens"),
+        _total_tokens().label("total_tokens"),
+        func.avg(MessageUsage.ttft_ms).label("avg_ttft_ms"),
+        func.avg(MessageUsage.latency_ms).label("avg_latency_ms"),
+        func.max(MessageUsage.latency_ms).label("max_latency_ms"),
+        func.coalesce(func.sum(MessageUsage.tts_audio_bytes), 0).label("tts_audio_bytes"),
+    )
+
+
+def _aggregate_dict(row) -> dict:
+    out = dict(row._mapping)
+    for key in ("avg_ttft_ms", "avg_latency_ms"):
+        if out[key] is not None:
+            out[key] = round(float(out[key]), 1)
+    return out
+
+
+def _as_utc(value) -> datetime:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.replace(tzinfo=timezone.utc)
+
+
+class UsageModel(BaseDatamodel):
+    """
+    Aggregates over message_usage (one row per assistant message) to find which agents and sessions drive cost
+    and latency. Read-only, so served by a read replica when configured. Rows of deleted agents and sessions are
+    counted until the purge worker removes their messages.
+    """
+
+    def __init__(self, db_client: object):
+        super().__init__(db_client=db_client)
+        self.db_client = db_client
+
+    @staticmethod
+    def _filtered(stmt, agent_id: int | None, since: datetime | None, until: datetime | None):
+        if agent_id is not None:
+            stmt = stmt.where(MessageUsage.agent_id == agent_id)
+        if since is not None:
+            stmt = stmt.where(MessageUsage.created_at >= since)
+        if until is not None:
+            stmt = stmt.where(MessageUsage.created_at < until)
+        return stmt
+
+    async def by_agent(
+        self, bucket: str = "day", agent_id: int | None = None, since: datetime | None = None, until: datetime | None = None
+    ) -> list[dict]:
+        """Totals per agent and time bucket ("hour" or "day"), oldest bucket first."""
+        async with self.read_session() as db_session:
+            if db_session.bind.dialect.name == "postgresql":
+                # Buckets start on UTC hours / days whatever the server's TimeZone setting
+                bucket_start = func.date_trunc(bucket, func.timezone("UTC", MessageUsage.created_at))
+            else:
+                bucket_start = func.strftime(_SQLITE_BUCKET_FORMATS[bucket], MessageUsage.created_at)
+            stmt = (
+                select(MessageUsage.agent_id, bucket_start.label("bucket_start"), *_aggregates())
+                .group_by(MessageUsage.agent_id, bucket_start)
+                .order_by(bucket_start.asc(), MessageUsage.agent_id.asc())
+            )
+            result = await db_session.execute(self._filtered(stmt, agent_id, since, until))
+            rows = result.all()
+        out = []
+        for row in rows:
+            item = _aggregate_dict(row)
+            item["bucket_start"] = _as_utc(item["bucket_start"])
+            out.append(item)
+        return out
+
+    async def top_sessions(
+        self,
+        agent_id: int | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        order_by: str = "tokens",
+        limit: int = 20,
+    ) -> list[dict]:
+        """Sessions with the most tokens ("tokens") or the highest average latency ("latency"), per session totals."""
+        sort = _total_tokens() if order_by == "tokens" else func.avg(MessageUsage.latency_ms)
+        stmt = (
+            select(MessageUsage.session_id, MessageUsage.agent_id, *_aggregates())
+            .group_by(MessageUsage.session_id, MessageUsage.agent_id)
+            .order_by(sort.desc(), MessageUsage.session_id.asc())
+            .limit(limit)
+        )
+        async with self.read_session() as db_session:
+            result = await db_session.execute(self._filtered(stmt, agent_id, since, until))
+            return [_aggregate_dict(row) for row in result.all()]
@@ -0,0 +1,43 @@
+"""session message stats
+
+Revision ID: 3b7e2c9d41a6
+Revises: 1a4d75910fee
+Create Date: 2026-10-19 09:12:04.118342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7e2c9d41a6'
+down_revision: Union[str, Sequence[str], None] = '1a4d75910fee'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('sessions', sa.Column('message_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('sessions', sa.Column('last_message_id', sa.Integer(), nullable=True))
+    # Backfill counters for existing sessions
+    op.execute(
+        """
+        UPDATE sessions AS s
+        SET message_count = agg.cnt, last_message_id = agg.last_id
+        FROM (
+            SELECT session_id, count(*) AS cnt, max(message_id) AS last_id
+            FROM messages
+            GROUP BY session_id
+        ) AS agg
+        WHERE s.session_id = agg.session_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('sessions', 'last_message_id')
+    op.drop_column('sessions', 'message_count')
@@ -0,0 +1,52 @@
+"""agent knowledge chunks
+
+Revision ID: 5e9a0d3b7c14
+Revises: 8c1f4a7e5d20
+Create Date: 2026-10-19 11:27:40.664015
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e9a0d3b7c14'
+down_revision: Union[str, Sequence[str], None] = '8c1f4a7e5d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match KNOWLEDGE_EMBEDDING_DIMENSIONS (schemes/KnowledgeChunks.py) and EMBEDDING_DIMENSIONS (config)
+EMBEDDING_DIMENSIONS = 256
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    op.create_table('knowledge_chunks',
+    sa.Column('chunk_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('agent_id', sa.Integer(), nullable=False),
+    sa.Column('document_name', sa.String(length=255), nullable=False),
+    sa.Column('chunk_index', sa.Integer(), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('token_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['agent_id'], ['agents.agent_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('chunk_id')
+    )
+    op.execute(f"ALTER TABLE knowledge_chunks ADD COLUMN embedding vector({EMBEDDING_DIMENSIONS}) NOT NULL")
+    op.create_index('idx_knowledge_chunk_agent_document', 'knowledge_chunks', ['agent_id', 'document_name'], unique=False)
+    op.create_index(
+        'idx_knowledge_chunk_embedding_hnsw', 'knowledge_chunks', ['embedding'], unique=False,
+        postgresql_using='hnsw',
+        postgresql_with={'m': 16, 'ef_construction': 64},
+        postgresql_ops={'embedding': 'vector_cosine_ops'},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_knowledge_chunk_embedding_hnsw', table_name='knowledge_chunks')
+    op.drop_index('idx_knowledge_chunk_agent_document', table_name='knowledge_chunks')
+    op.drop_table('knowledge_chunks')
@@ -0,0 +1,36 @@
+"""message full text search
+
+Revision ID: 8c1f4a7e5d20
+Revises: 3b7e2c9d41a6
+Create Date: 2026-10-19 10:03:51.502117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c1f4a7e5d20'
+down_revision: Union[str, Sequence[str], None] = '3b7e2c9d41a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Generated column (PostgreSQL only; not mapped on the ORM model so SQLite tests can create_all)
+    op.execute(
+        "ALTER TABLE messages ADD COLUMN search_vector tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED"
+    )
+    op.create_index(
+        'idx_message_search_vector', 'messages', ['search_vector'], unique=False, postgresql_using='gin'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_message_search_vector', table_name='messages', postgresql_using='gin')
+    op.drop_column('messages', 'search_vector')
@@ -0,0 +1,37 @@
+"""session compaction state
+
+Revision ID: a2d6f81c9b37
+Revises: 5e9a0d3b7c14
+Create Date: 2026-10-19 13:05:12.370981
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a2d6f81c9b37'
+down_revision: Union[str, Sequence[str], None] = '5e9a0d3b7c14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('sessions', sa.Column('summary_message_id', sa.Integer(), nullable=True))
+    op.add_column('sessions', sa.Column('compacted_through_message_id', sa.Integer(), nullable=True))
+    op.add_column('sessions', sa.Column('compacted_message_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('sessions', sa.Column('compaction_tokens_saved', sa.Integer(), server_default='0', nullable=False))
+    # Candidate scan orders by last activity
+    op.create_index('idx_session_updated_at', 'sessions', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_session_updated_at', table_name='sessions')
+    op.drop_column('sessions', 'compaction_tokens_saved')
+    op.drop_column('sessions', 'compacted_message_count')
+    op.drop_column('sessions', 'compacted_through_message_id')
+    op.drop_column('sessions', 'summary_message_id')
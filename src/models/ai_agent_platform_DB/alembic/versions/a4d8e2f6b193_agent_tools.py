@@ -0,0 +1,28 @@
+"""agent tools
+
+Revision ID: a4d8e2f6b193
+Revises: f5c1a8e3d942
+Create Date: 2026-10-19 19:32:08.415726
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d8e2f6b193'
+down_revision: Union[str, Sequence[str], None] = 'f5c1a8e3d942'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('agents', sa.Column('tools', sa.JSON(), server_default='[]', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('agents', 'tools')
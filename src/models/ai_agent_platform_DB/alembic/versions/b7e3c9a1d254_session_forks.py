@@ -0,0 +1,36 @@
+"""session forks
+
+Revision ID: b7e3c9a1d254
+Revises: a4d8e2f6b193
+Create Date: 2026-10-19 20:14:51.902387
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3c9a1d254'
+down_revision: Union[str, Sequence[str], None] = 'a4d8e2f6b193'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('sessions', sa.Column('parent_session_id', sa.Integer(), nullable=True))
+    op.add_column('sessions', sa.Column('fork_message_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'sessions_parent_session_id_fkey', 'sessions', 'sessions', ['parent_session_id'], ['session_id']
+    )
+    op.create_index('idx_session_parent_session_id', 'sessions', ['parent_session_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_session_parent_session_id', table_name='sessions')
+    op.drop_constraint('sessions_parent_session_id_fkey', 'sessions', type_='foreignkey')
+    op.drop_column('sessions', 'fork_message_id')
+    op.drop_column('sessions', 'parent_session_id')
@@ -0,0 +1,41 @@
+"""soft delete for agents and sessions
+
+Revision ID: d7a3f5e1b820
+Revises: c4e8b2a19f63
+Create Date: 2026-10-19 16:42:08.113524
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a3f5e1b820'
+down_revision: Union[str, Sequence[str], None] = 'c4e8b2a19f63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('agents', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('sessions', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+    # The purge worker scans only soft-deleted rows; partial indexes stay tiny
+    op.create_index(
+        'idx_agent_deleted_at', 'agents', ['deleted_at'], unique=False,
+        postgresql_where=sa.text('deleted_at IS NOT NULL'),
+    )
+    op.create_index(
+        'idx_session_deleted_at', 'sessions', ['deleted_at'], unique=False,
+        postgresql_where=sa.text('deleted_at IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_session_deleted_at', table_name='sessions')
+    op.drop_index('idx_agent_deleted_at', table_name='agents')
+    op.drop_column('sessions', 'deleted_at')
+    op.drop_column('agents', 'deleted_at')
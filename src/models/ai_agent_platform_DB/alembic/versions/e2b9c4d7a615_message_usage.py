@@ -0,0 +1,46 @@
+"""message usage
+
+Revision ID: e2b9c4d7a615
+Revises: d7a3f5e1b820
+Create Date: 2026-10-19 18:05:31.204417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b9c4d7a615'
+down_revision: Union[str, Sequence[str], None] = 'd7a3f5e1b820'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'message_usage',
+        sa.Column('message_id', sa.Integer(), nullable=False),
+        sa.Column('session_id', sa.Integer(), nullable=False),
+        sa.Column('agent_id', sa.Integer(), nullable=False),
+        sa.Column('model_id', sa.String(length=128), nullable=True),
+        sa.Column('prompt_tokens', sa.Integer(), nullable=True),
+        sa.Column('completion_tokens', sa.Integer(), nullable=True),
+        sa.Column('ttft_ms', sa.Integer(), nullable=True),
+        sa.Column('latency_ms', sa.Integer(), nullable=True),
+        sa.Column('tts_audio_bytes', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['message_id'], ['messages.message_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('message_id'),
+    )
+    op.create_index('idx_message_usage_agent_created', 'message_usage', ['agent_id', 'created_at'], unique=False)
+    op.create_index('idx_message_usage_session_id', 'message_usage', ['session_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_message_usage_session_id', table_name='message_usage')
+    op.drop_index('idx_message_usage_agent_created', table_name='message_usage')
+    op.drop_table('message_usage')
@@ -0,0 +1,30 @@
+"""version counters on agents and sessions
+
+Revision ID: f5c1a8e3d942
+Revises: e2b9c4d7a615
+Create Date: 2026-10-19 18:47:12.630158
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5c1a8e3d942'
+down_revision: Union[str, Sequence[str], None] = 'e2b9c4d7a615'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('agents', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('sessions', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('sessions', 'version')
+    op.drop_column('agents', 'version')
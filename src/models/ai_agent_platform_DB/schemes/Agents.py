@@ -1,7 +1,7 @@
 from datetime import datetime
 
 from .ai_agent_base import SQLAlchemyBase
-from sqlalchemy import Column, Integer, String, Text, DateTime,func
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, func
 from sqlalchemy.orm import relationship
 
 
@@ -11,7 +11,14 @@ class Agent(SQLAlchemyBase):
     agent_id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String(255), nullable=False)
     prompt = Column(Text, nullable=False)
+    # Names of the registered tools the model may call for this agent (controllers/tools.py)
+    tools = Column(JSON, nullable=False, default=list, server_default="[]")
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True),  onupdate=func.now(),nullable=True)
+    # Soft delete: set by AgentModel.delete_agent, the row (and everything under it) is purged later (controllers/purge.py)
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
+    # Bumped by every write to the agent; the source of ETags for conditional GETs (helpers/etag.py)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
-    sessions = relationship("Session", back_populates="agent", cascade="all, delete-orphan")
+    # passive_deletes: child rows go through the database's ON DELETE CASCADE, never loaded into the session
+    sessions = relationship("Session", back_populates="agent", cascade="all, delete-orphan", passive_deletes=True)
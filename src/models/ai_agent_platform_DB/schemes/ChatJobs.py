@@ -0,0 +1,26 @@
+from .ai_agent_base import SQLAlchemyBase
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, func
+from sqlalchemy import Index
+
+
+class ChatJob(SQLAlchemyBase):
+    """An asynchronous chat turn (POST /sessions/jobs), driven by the ChatJobPool; see controllers/chat_jobs.py."""
+
+    __tablename__ = "chat_jobs"
+
+    job_id = Column(Integer, primary_key=True, autoincrement=True)
+    session_id = Column(Integer, ForeignKey("sessions.session_id", ondelete="CASCADE"), nullable=False)
+    # The user message is stored when the job is submitted, so a job re-run after a restart never duplicates it
+    user_message_id = Column(Integer, nullable=False)
+    status = Column(String(16), nullable=False)  # ChatJobStatusEnums
+    assistant_message_id = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("idx_chat_job_status", "status"),
+        Index("idx_chat_job_session_id", "session_id"),
+    )
@@ -0,0 +1,60 @@
+from .ai_agent_base import SQLAlchemyBase
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float, func
+from sqlalchemy.types import UserDefinedType
+from sqlalchemy import Index
+
+# Dimension of knowledge_chunks.embedding; EMBEDDING_DIMENSIONS in config must match (see migration)
+KNOWLEDGE_EMBEDDING_DIMENSIONS = 256
+
+
+class EmbeddingVector(UserDefinedType):
+    """
+    pgvector `vector(n)` column without requiring the pgvector Python package.
+    Values travel in pgvector's text format ("[0.1,0.2,...]"), which asyncpg passes through as text;
+    on SQLite (tests) the same text is simply stored in the column.
+    """
+
+    cache_ok = True
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+
+    def get_col_spec(self, **kw):
+        return f"VECTOR({self.dimensions})"
+
+    def bind_processor(self, dialect):
+        def process(value):
+            if value is None:
+                return None
+            return "[" + ",".join(repr(float(v)) for v in value) + "]"
+        return process
+
+    def result_processor(self, dialect, coltype):
+        def process(value):
+            if value is None:
+                return None
+            if isinstance(value, str):
+                return [float(v) for v in value.strip("[]").split(",") if v]
+            return [float(v) for v in value]
+        return process
+
+    class comparator_factory(UserDefinedType.Comparator):
+        def cosine_distance(self, other):
+            return self.op("<=>", return_type=Float)(other)
+
+
+class KnowledgeChunk(SQLAlchemyBase):
+    __tablename__ = "knowledge_chunks"
+
+    chunk_id = Column(Integer, primary_key=True, autoincrement=True)
+    agent_id = Column(Integer, ForeignKey("agents.agent_id", ondelete="CASCADE"), nullable=False)
+    document_name = Column(String(255), nullable=False)
+    chunk_index = Column(Integer, nullable=False)
+    content = Column(Text, nullable=False)
+    token_count = Column(Integer, nullable=False)
+    embedding = Column(EmbeddingVector(KNOWLEDGE_EMBEDDING_DIMENSIONS), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("idx_knowledge_chunk_agent_document", "agent_id", "document_name"),
+    )
@@ -0,0 +1,31 @@
+from .ai_agent_base import SQLAlchemyBase
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, func
+from sqlalchemy import Index
+
+
+class MessageUsage(SQLAlchemyBase):
+    """
+    Cost and latency of one assistant message, written in the same transaction as the message.
+    agent_id / session_id are copied from the session (no FKs) so the usage aggregates need no joins.
+    Timings run from the provider call: ttft_ms to the first token (= latency_ms for non-streamed replies),
+    latency_ms to the end of the reply (for voice: the last TTS audio byte).
+    Token counts are NULL when the provider did not report them (e.g. a stream cut short by a disconnect).
+    """
+
+    __tablename__ = "message_usage"
+
+    message_id = Column(Integer, ForeignKey("messages.message_id", ondelete="CASCADE"), primary_key=True)
+    session_id = Column(Integer, nullable=False)
+    agent_id = Column(Integer, nullable=False)
+    model_id = Column(String(128), nullable=True)
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
+    ttft_ms = Column(Integer, nullable=True)
+    latency_ms = Column(Integer, nullable=True)
+    tts_audio_bytes = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("idx_message_usage_agent_created", "agent_id", "created_at"),
+        Index("idx_message_usage_session_id", "session_id"),
+    )
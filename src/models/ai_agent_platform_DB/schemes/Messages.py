@@ -14,6 +14,9 @@ class Message(SQLAlchemyBase):
     content = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
+    # PostgreSQL also has a generated `search_vector` tsvector column + GIN index (migration 8c1f4a7e5d20);
+    # it is intentionally not mapped here, MessageModel.search references it directly.
+
     session = relationship("Session", back_populates="messages")
 
     __table_args__ = (
@@ -13,10 +13,31 @@ class Session(SQLAlchemyBase):
     agent_id = Column(Integer, ForeignKey("agents.agent_id", ondelete="CASCADE"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True),  onupdate=func.now(),nullable=True)
+    # Soft delete: set by SessionModel.delete_session (or with the agent), purged later (controllers/purge.py)
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
+    # Bumped by every write to the session or its messages; the source of ETags for conditional GETs (helpers/etag.py)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    # Denormalized stats, maintained by MessageModel.create_message (no FK on purpose: avoids a sessions <-> messages cycle)
+    message_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_message_id = Column(Integer, nullable=True)
+
+    # Conversation compaction state, maintained by MessageModel.store_summary (controllers/compaction.py)
+    summary_message_id = Column(Integer, nullable=True)
+    compacted_through_message_id = Column(Integer, nullable=True)
+    compacted_message_count = Column(Integer, nullable=False, default=0, server_default="0")
+    compaction_tokens_saved = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # Copy-on-write forks (SessionModel.fork_session): the history is the parent's history up to and including
+    # fork_message_id, then the session's own messages. Nothing is copied; MessageModel walks the parent chain with
+    # a recursive CTE. Parents are purged only after their forks (models/PurgeModel.py).
+    parent_session_id = Column(Integer, ForeignKey("sessions.session_id"), nullable=True)
+    fork_message_id = Column(Integer, nullable=True)  # no FK, like last_message_id
 
     agent = relationship("Agent", back_populates="sessions")
-    messages = relationship("Message", back_populates="session", cascade="all, delete-orphan")
+    messages = relationship("Message", back_populates="session", cascade="all, delete-orphan", passive_deletes=True)
 
     __table_args__ = (
         Index("idx_session_agent_id", "agent_id"),
-    )
\ No newline at end of file
+        Index("idx_session_parent_session_id", "parent_session_id"),
+    )
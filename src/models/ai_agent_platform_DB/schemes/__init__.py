@@ -2,5 +2,8 @@ from .ai_agent_base import SQLAlchemyBase
 from .Agents import Agent
 from .Sessions import Session
 from .Messages import Message
+from .KnowledgeChunks import KnowledgeChunk
+from .ChatJobs import ChatJob
+from .MessageUsages import MessageUsage
 
-__all__ = ["SQLAlchemyBase", "Agent", "Session", "Message"]
+__all__ = ["SQLAlchemyBase", "Agent", "Session", "Message", "KnowledgeChunk", "ChatJob", "MessageUsage"]
@@ -1,15 +1,20 @@
 """
-Agent management endpoints: list, get, create, update, delete.
+Agent management endpoints: list, get, create, update, delete, and the tools agents can be given.
 """
 from fastapi import APIRouter, Request
 from fastapi.responses import JSONResponse
 
+from controllers.tools import get_tool_registry
+from helpers.etag import make_etag, etag_matches, not_modified, with_etag
+from helpers.serialization import FastJSONResponse
 from models.AgentModel import AgentModel
 from models.ai_agent_platform_DB.schemes import Agent
 from routes.schemes import (
     AgentCreate,
     AgentUpdate,
     AgentResponse,
+    ToolResponse,
+    DeletedResponse,
     ErrorResponse,
 )
 
@@ -25,45 +30,100 @@ def agent_to_response(a) -> AgentResponse:
         agent_id=a.agent_id,
         name=a.name,
         prompt=a.prompt,
+        tools=a.tools or [],
         created_at=a.created_at.isoformat() if a.created_at else None,
         updated_at=a.updated_at.isoformat() if a.updated_at else None,
     )
 
 
-@agents_router.get("", summary="List all agents", response_model=list[AgentResponse])
+def agent_to_dict(a) -> dict:
+    """Plain-dict AgentResponse payload for FastJSONResponse (no Pydantic round trip)."""
+    return {
+        "agent_id": a.agent_id,
+        "name": a.name,
+        "prompt": a.prompt,
+        "tools": a.tools or [],
+        "created_at": a.created_at,
+        "updated_at": a.updated_at,
+    }
+
+
+def unknown_tools_response(tools: list[str] | None) -> JSONResponse | None:
+    unknown = get_tool_registry().unknown(tools or [])
+    if not unknown:
+        return None
+    return JSONResponse(status_code=400, content=ErrorResponse(detail=f"Unknown tools: {', '.join(unknown)}").model_dump())
+
+
+@agents_router.get(
+    "",
+    summary="List all agents",
+    response_model=list[AgentResponse],
+    responses={304: {"description": "Not modified"}},
+)
 async def list_agents(request: Request):
     model = AgentModel(get_db(request))
+    etag = make_etag("agents", *await model.list_version())
+    if etag_matches(request, etag):
+        return not_modified(etag)
     agents = await model.list_all()
-    return [agent_to_response(a) for a in agents]
+    return with_etag(FastJSONResponse([agent_to_dict(a) for a in agents]), etag)
+
+
+@agents_router.get("/tools", summary="List the tools agents can be given", response_model=list[ToolResponse])
+async def list_tools():
+    return [
+        ToolResponse(name=t.name, description=t.description, parameters=t.parameters)
+        for t in get_tool_registry().all()
+    ]
 
 
 
 
-@agents_router.post("", summary="Create agent", response_model=AgentResponse)
+@agents_router.post("", summary="Create agent", response_model=AgentResponse, responses={400: {"model": ErrorResponse}})
 async def create_agent(request: Request, body: AgentCreate):
+    error = unknown_tools_response(body.tools)
+    if error is not None:
+        return error
     model = AgentModel(get_db(request))
-    created = await model.create_agent(Agent(name=body.name, prompt=body.prompt))
+    created = await model.create_agent(Agent(name=body.name, prompt=body.prompt, tools=body.tools))
     return AgentResponse(
         agent_id=created.agent_id,
         name=created.name,
         prompt=created.prompt,
+        tools=created.tools or [],
         created_at=created.created_at.isoformat() if created.created_at else None,
         updated_at=created.updated_at.isoformat() if created.updated_at else None,
     )
 
 
-@agents_router.put("/{agent_id}", summary="Update agent", response_model=AgentResponse, responses={404: {"model": ErrorResponse}})
+@agents_router.put(
+    "/{agent_id}",
+    summary="Update agent",
+    response_model=AgentResponse,
+    responses={400: {"model": ErrorResponse}, 404: {"model": ErrorResponse}},
+)
 async def update_agent(request: Request, agent_id: int, body: AgentUpdate):
-    model = AgentModel(get_db(request))
-    agent = await model.get_by_id(agent_id)
-    if agent is None:
+    error = unknown_tools_response(body.tools)
+    if error is not None:
+        return error
+    changes = body.model_dump(exclude_none=True)
+    updated = await AgentModel(get_db(request)).update_agent(agent_id, changes)
+    if updated is None:
         return JSONResponse(status_code=404, content=ErrorResponse(detail="Agent not found").model_dump())
-    if body.name is not None:
-        agent.name = body.name
-    if body.prompt is not None:
-        agent.prompt = body.prompt
-    updated = await model.update_agent(agent)
     return agent_to_response(updated)
 
 
+@agents_router.delete(
+    "/{agent_id}",
+    summary="Delete agent with its sessions, messages and knowledge base",
+    response_model=DeletedResponse,
+    responses={404: {"model": ErrorResponse}},
+)
+async def delete_agent(request: Request, agent_id: int):
+    if not await AgentModel(get_db(request)).delete_agent(agent_id):
+        return JSONResponse(status_code=404, content=ErrorResponse(detail="Agent not found").model_dump())
+    return DeletedResponse()
+
+
 
@@ -1,14 +1,24 @@
 """
-API router: agents, sessions, chat (text + voice).
+API router: agents, sessions, knowledge base, chat (text + voice), chat jobs, message search, usage, diagnostics.
 Mounts under /api/v1 in main.py.
 """
 from fastapi import APIRouter
 from routes.agents_router import agents_router
 from routes.sessions_router import sessions_router
 from routes.chat_router import chat_router
+from routes.jobs_router import jobs_router
+from routes.search_router import search_router
+from routes.knowledge_router import knowledge_router
+from routes.usage_router import usage_router
+from routes.debug_router import debug_router
 
 api_router = APIRouter(tags=["AI Agent Platform"])
 
 api_router.include_router(agents_router, prefix="/agents", tags=["Agents"])
 api_router.include_router(sessions_router, prefix="/agents", tags=["Sessions"])
+api_router.include_router(knowledge_router, prefix="/agents", tags=["Knowledge Base"])
 api_router.include_router(chat_router, prefix="/sessions", tags=["Chat & Voice"])
+api_router.include_router(jobs_router, prefix="/sessions", tags=["Chat Jobs"])
+api_router.include_router(search_router, prefix="/messages", tags=["Search"])
+api_router.include_router(usage_router, prefix="/usage", tags=["Usage"])
+api_router.include_router(debug_router, prefix="/debug", tags=["Diagnostics"])
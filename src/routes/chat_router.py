@@ -1,14 +1,34 @@
 """
-Chat and voice endpoints: list messages, send text (optional stream), send voice (audio upload).
+Chat and voice endpoints: list messages, send text (optional stream), send voice (audio upload), fan out one message to
+several agents.
 """
 import json
 from base64 import b64encode
+from contextlib import aclosing
 
-from fastapi import APIRouter, Request, UploadFile, File, Form, Query
+from fastapi import APIRouter, Request, UploadFile, File, Form, Query, Header
 from fastapi.responses import StreamingResponse, JSONResponse
 
 from controllers import conversation
-from routes.schemes import SendMessageRequest, MessageResponse, ErrorResponse
+from controllers.batch import run_batch
+from controllers.fanout import fan_out
+from helpers.admission import AdmissionController, AdmissionRejected, AdmissionTicket, TEXT, VOICE
+from helpers.config import get_settings
+from helpers.etag import make_etag, etag_matches, not_modified, with_etag
+from helpers.sse import coalesce_text
+from helpers.stream_replay import StreamReplayBuffer, ReplayStream, ReplayGap
+from helpers.serialization import FastJSONResponse, dumps
+from models.AgentModel import AgentModel
+from models.SessionModel import SessionModel
+from models.ai_agent_platform_DB.schemes import Session
+from routes.schemes import (
+    SendMessageRequest,
+    BatchMessagesRequest,
+    BatchItemResult,
+    FanOutRequest,
+    MessageResponse,
+    ErrorResponse,
+)
 
 chat_router = APIRouter()
 
@@ -21,71 +41,315 @@ def get_openai_provider(request: Request):
     return getattr(request.app, "openai_provider", None)
 
 
-@chat_router.get("/session-messages", summary="List messages in a session", response_model=list[MessageResponse])
+def get_embedding_provider(request: Request):
+    return getattr(request.app, "embedding_provider", None)
+
+
+def get_stream_replay(request: Request) -> StreamReplayBuffer:
+    replay = getattr(request.app, "stream_replay", None)
+    if replay is None:
+        replay = request.app.stream_replay = StreamReplayBuffer()
+    return replay
+
+
+def get_admission(request: Request) -> AdmissionController:
+    admission = getattr(request.app, "admission", None)
+    if admission is None:
+        admission = request.app.admission = AdmissionController()
+    return admission
+
+
+async def admit_turn(request: Request, kind: str, session_id: int) -> tuple[AdmissionTicket | None, JSONResponse | None]:
+    """(ticket, None) when the turn may start, else (None, 429/503 response with Retry-After)."""
+    session = await SessionModel(get_db(request)).get_by_id(session_id)  # cached; unknown sessions fail later as before
+    try:
+        return get_admission(request).admit(kind, session.agent_id if session is not None else None), None
+    except AdmissionRejected as e:
+        return None, rejection_response(e)
+
+
+def rejection_response(e: AdmissionRejected) -> JSONResponse:
+    return JSONResponse(
+        status_code=e.status_code,
+        content=ErrorResponse(detail=e.detail).model_dump(),
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
+def release_when_done(ticket: AdmissionTicket, stream: ReplayStream | None) -> None:
+    """Streams hold their ticket until the background generation ends (not when the client disconnects)."""
+    if stream is None or stream.task is None:
+        ticket.release()
+    else:
+        stream.task.add_done_callback(lambda _: ticket.release())
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def replay_response(stream: ReplayStream, last_event_id: int = 0) -> StreamingResponse:
+    """SSE response reading a buffered stream; every frame carries its event id for Last-Event-ID resume."""
+
+    async def sse_generator():
+        events = stream.events(last_event_id)
+        async with aclosing(events):
+            try:
+                async for event_id, frame in events:
+                    yield f"id: {event_id}\n{frame}"
+            except ReplayGap:
+                yield f"data: {json.dumps({'error': 'Stream events expired; cannot resume'})}\n\n"
+
+    return StreamingResponse(
+        sse_generator(), media_type="text/event-stream", headers={**SSE_HEADERS, "X-Stream-Id": stream.stream_id}
+    )
+
+
+@chat_router.get(
+    "/session-messages",
+    summary="List messages in a session",
+    response_model=list[MessageResponse],
+    responses={304: {"description": "Not modified"}},
+)
 async def list_messages(request: Request, session_id: int = Query(..., description="Session ID")):
-    return await conversation.get_messages(get_db(request), session_id)
+    version = await SessionModel(get_db(request)).get_version(session_id)
+    if version is None:
+        return FastJSONResponse([])  # unknown, or deleted and not purged yet
+    etag = make_etag("messages", session_id, version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return with_etag(FastJSONResponse(await conversation.get_messages(get_db(request), session_id)), etag)
 
 
 @chat_router.post(
     "/send-message",
     summary="Send a text message; returns assistant reply (JSON)",
     response_model=MessageResponse,
-    responses={404: {"model": ErrorResponse}, 503: {"model": ErrorResponse}},
+    responses={404: {"model": ErrorResponse}, 429: {"model": ErrorResponse}, 503: {"model": ErrorResponse}},
 )
 async def send_text_message(request: Request, body: SendMessageRequest):
     provider = get_openai_provider(request)
     if provider is None:
         return JSONResponse(status_code=503, content=ErrorResponse(detail="LLM provider not available").model_dump())
-    out = await conversation.send_text_message(get_db(request), provider, body.session_id, body.content)
+    ticket, rejection = await admit_turn(request, TEXT, body.session_id)
+    if rejection is not None:
+        return rejection
+    with ticket:
+        out = await conversation.send_text_message(
+            get_db(request), provider, body.session_id, body.content, embedding_provider=get_embedding_provider(request)
+        )
     if out is None:
         return JSONResponse(status_code=404, content=ErrorResponse(detail="Session not found or LLM error").model_dump())
     return out
 
 
-@chat_router.post("/stream-message", summary="Send a text message; stream assistant reply (SSE)", responses={503: {"model": ErrorResponse}})
+@chat_router.post(
+    "/batch-messages",
+    summary="Send many text messages; streams one NDJSON result line per item as turns complete",
+    responses={200: {"model": BatchItemResult, "content": {"application/x-ndjson": {}}}, 400: {"model": ErrorResponse}, 503: {"model": ErrorResponse}},
+)
+async def send_batch_messages(request: Request, body: BatchMessagesRequest):
+    """
+    Turns of one session run in request order; different sessions run concurrently, at most `max_parallel` at a time.
+    Lines arrive in completion order; match them to the request with `index`. Each turn is admission-controlled on its
+    own: a refused turn is an error line ("ok": false) and the other turns go on.
+    """
+    provider = get_openai_provider(request)
+    if provider is None:
+        return JSONResponse(status_code=503, content=ErrorResponse(detail="LLM provider not available").model_dump())
+    settings = get_settings()
+    if not body.items or len(body.items) > settings.BATCH_MAX_ITEMS:
+        return JSONResponse(
+            status_code=400,
+            content=ErrorResponse(detail=f"A batch must have between 1 and {settings.BATCH_MAX_ITEMS} items").model_dump(),
+        )
+    max_parallel = min(body.max_parallel or settings.BATCH_MAX_PARALLEL, settings.BATCH_MAX_PARALLEL)
+    if max_parallel < 1:
+        return JSONResponse(status_code=400, content=ErrorResponse(detail="max_parallel must be at least 1").model_dump())
+    results = run_batch(
+        get_db(request),
+        provider,
+        [(item.session_id, item.content) for item in body.items],
+        max_parallel,
+        embedding_provider=get_embedding_provider(request),
+        admission=get_admission(request),
+    )
+
+    async def ndjson_generator():
+        async with aclosing(results):
+            async for result in results:
+                yield dumps(result) + b"\n"
+
+    return StreamingResponse(ndjson_generator(), media_type="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
+
+
+@chat_router.post("/stream-message", summary="Send a text message; stream assistant reply (SSE)", responses={429: {"model": ErrorResponse}, 503: {"model": ErrorResponse}})
 async def send_text_message_stream(request: Request, body: SendMessageRequest):
-    """Stream LLM response as Server-Sent Events. Each event: data: {\"content\": \"chunk\"}. Final event: data: {\"done\": true}."""
+    """
+    Stream LLM response as Server-Sent Events. Each event: data: {\"content\": \"chunk\"}. Final event: data: {\"done\": true}.
+    Events are numbered (`id:`) and the response carries `X-Stream-Id`; after a dropped connection, resume with
+    GET /streams/{stream_id} and `Last-Event-ID` while the generation keeps running.
+    """
+    provider = get_openai_provider(request)
+    if provider is None:
+        return JSONResponse(status_code=503, content=ErrorResponse(detail="LLM provider not available").model_dump())
+    ticket, rejection = await admit_turn(request, TEXT, body.session_id)
+    if rejection is not None:
+        return rejection
+    stream = None
+    try:
+        gen = conversation.stream_text_message(
+            get_db(request),
+            provider,
+            body.session_id,
+            body.content,
+            embedding_provider=get_embedding_provider(request),
+        )
+        stream = get_stream_replay(request).start(gen)
+        return replay_response(stream)
+    finally:
+        release_when_done(ticket, stream)
+
+
+@chat_router.post(
+    "/fan-out-message",
+    summary="Send one text message to several agents; stream their replies interleaved (SSE)",
+    responses={400: {"model": ErrorResponse}, 404: {"model": ErrorResponse}, 429: {"model": ErrorResponse}, 503: {"model": ErrorResponse}},
+)
+async def send_fan_out_message(request: Request, body: FanOutRequest):
+    """
+    Every target (each of `session_ids`, plus a new session for each of `agent_ids`) stores the message and its reply
+    in its own session; the replies are generated concurrently. Events: first data: {"sessions": [{"agent_id",
+    "session_id"}, ...]}, then {"agent_id", "session_id", "content"} chunks and one {"agent_id", "session_id",
+    "done": true} (or "error") per target, interleaved as they arrive, and finally data: {"done": true} without an
+    agent. Resumable like stream-message (X-Stream-Id, Last-Event-ID).
+    """
     provider = get_openai_provider(request)
     if provider is None:
         return JSONResponse(status_code=503, content=ErrorResponse(detail="LLM provider not available").model_dump())
-    gen = conversation.stream_text_message(get_db(request), provider, body.session_id, body.content)
-    return StreamingResponse(gen, media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    settings = get_settings()
+    session_ids = list(dict.fromkeys(body.session_ids))
+    target_count = len(session_ids) + len(body.agent_ids)
+    if not 0 < target_count <= settings.FANOUT_MAX_TARGETS:
+        return JSONResponse(
+            status_code=400,
+            content=ErrorResponse(detail=f"A fan-out must have between 1 and {settings.FANOUT_MAX_TARGETS} sessions and agents").model_dump(),
+        )
+    db_client = get_db(request)
+    sessions = await SessionModel(db_client).get_many(session_ids)
+    agents = await AgentModel(db_client).get_many([*body.agent_ids, *(s.agent_id for s in sessions.values())])
+    missing = [f"session {sid}" for sid in session_ids if sid not in sessions or sessions[sid].agent_id not in agents]
+    missing += [f"agent {aid}" for aid in body.agent_ids if aid not in agents]
+    if missing:
+        return JSONResponse(status_code=404, content=ErrorResponse(detail=f"Not found: {', '.join(missing)}").model_dump())
 
+    admission = get_admission(request)
+    tickets = []
+    try:
+        for agent_id in [*(sessions[sid].agent_id for sid in session_ids), *body.agent_ids]:
+            tickets.append(admission.admit(TEXT, agent_id))
+    except AdmissionRejected as e:
+        for ticket in tickets:
+            ticket.release()
+        return rejection_response(e)
 
-@chat_router.post("/send-voice-message", summary="Send voice message; streams SSE with text + audio", responses={400: {"model": ErrorResponse}, 500: {"model": ErrorResponse}, 503: {"model": ErrorResponse}})
+    stream = None
+    try:
+        targets = [(sessions[sid], agents[sessions[sid].agent_id]) for sid in session_ids]
+        for agent_id in body.agent_ids:
+            created = await SessionModel(db_client).create_session(Session(agent_id=agent_id))
+            targets.append((created, agents[agent_id]))
+        events = fan_out(db_client, provider, targets, body.content, embedding_provider=get_embedding_provider(request))
+
+        async def frames():
+            started = [{"agent_id": s.agent_id, "session_id": s.session_id} for s, _ in targets]
+            yield f"data: {json.dumps({'sessions': started})}\n\n"
+            async with aclosing(events):
+                async for event in events:
+                    yield f"data: {json.dumps(event)}\n\n"
+            yield 'data: {"done": true}\n\n'
+
+        stream = get_stream_replay(request).start(frames())
+        return replay_response(stream)
+    finally:
+        for ticket in tickets:
+            release_when_done(ticket, stream)
+
+
+@chat_router.post("/send-voice-message", summary="Send voice message; streams SSE with text + audio", responses={400: {"model": ErrorResponse}, 429: {"model": ErrorResponse}, 500: {"model": ErrorResponse}, 503: {"model": ErrorResponse}})
 async def send_voice_message(
     request: Request,
     session_id: int = Form(..., description="Session ID"),
     audio: UploadFile = File(..., description="Audio file (e.g. webm, mp3)"),
 ):
+    """Transcribe, then stream typed SSE events (user_text, assistant_text, audio, done); resumable like stream-message."""
     provider = get_openai_provider(request)
     if provider is None:
         return JSONResponse(status_code=503, content=ErrorResponse(detail="LLM provider not available").model_dump())
-    filename = audio.filename or "audio.webm"
-    content = await audio.read()
+    # Admitted before STT: transcription is part of the turn's cost
+    ticket, rejection = await admit_turn(request, VOICE, session_id)
+    if rejection is not None:
+        return rejection
+    stream = None
+    try:
+        filename = audio.filename or "audio.webm"
+        content = await audio.read()
 
-    stt_text, stt_error = conversation.run_voice_stt(provider, content, filename)
-    if stt_error:
-        status = 400 if "no text" in stt_error.lower() or "speech-to-text" in stt_error.lower() else 500
-        return JSONResponse(status_code=status, content=ErrorResponse(detail=stt_error).model_dump())
+        stt_text, stt_error = await conversation.run_voice_stt(provider, content, filename)
+        if stt_error:
+            status = 400 if "no text" in stt_error.lower() or "speech-to-text" in stt_error.lower() else 500
+            return JSONResponse(status_code=status, content=ErrorResponse(detail=stt_error).model_dump())
 
-    async def sse_generator():
-        async for event_type, data in conversation.stream_voice_after_stt(
-            get_db(request), provider, session_id, stt_text
-        ):
-            if event_type == "audio":
-                yield f"data: {json.dumps({'type': 'audio', 'chunk': b64encode(data).decode()})}\n\n"
-            elif event_type == "user_text":
-                yield f"data: {json.dumps({'type': 'user_text', 'content': data})}\n\n"
-            elif event_type == "assistant_text":
-                yield f"data: {json.dumps({'type': 'assistant_text', 'content': data})}\n\n"
-            elif event_type == "error":
-                yield f"data: {json.dumps({'type': 'error', 'content': data})}\n\n"
-            elif event_type == "done":
-                yield f"data: {json.dumps({'type': 'done'})}\n\n"
+        settings = get_settings()
+        events = coalesce_text(
+            conversation.stream_voice_after_stt(
+                get_db(request),
+                provider,
+                session_id,
+                stt_text,
+                embedding_provider=get_embedding_provider(request),
+            ),
+            settings.SSE_COALESCE_WINDOW_MS,
+            settings.SSE_COALESCE_MAX_BYTES,
+            text_of=lambda event: event[1] if event[0] == "assistant_text" else None,
+            make=lambda text: ("assistant_text", text),
+        )
 
-    return StreamingResponse(
-        sse_generator(),
-        media_type="text/event-stream",
-        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
-    )
+        async def frames():
+            async with aclosing(events):
+                async for event_type, data in events:
+                    if event_type == "audio":
+                        yield f"data: {json.dumps({'type': 'audio', 'chunk': b64encode(data).decode()})}\n\n"
+                    elif event_type == "user_text":
+                        yield f"data: {json.dumps({'type': 'user_text', 'content': data})}\n\n"
+                    elif event_type == "assistant_text":
+                        yield f"data: {json.dumps({'type': 'assistant_text', 'content': data})}\n\n"
+                    elif event_type == "error":
+                        yield f"data: {json.dumps({'type': 'error', 'content': data})}\n\n"
+                    elif event_type == "done":
+                        yield f"data: {json.dumps({'type': 'done'})}\n\n"
+
+        stream = get_stream_replay(request).start(frames())
+        return replay_response(stream)
+    finally:
+        release_when_done(ticket, stream)
+
+
+@chat_router.get(
+    "/streams/{stream_id}",
+    summary="Resume a text or voice SSE stream after a dropped connection",
+    responses={404: {"model": ErrorResponse}, 410: {"model": ErrorResponse}},
+)
+async def resume_stream(
+    request: Request,
+    stream_id: str,
+    last_event_id: int | None = Header(None, alias="Last-Event-ID"),
+    from_event_id: int | None = Query(None, alias="last_event_id", description="Alternative to the Last-Event-ID header"),
+):
+    """Replay events after Last-Event-ID (0 or absent: from the start), then follow the live generation."""
+    stream = get_stream_replay(request).get(stream_id)
+    if stream is None:
+        return JSONResponse(status_code=404, content=ErrorResponse(detail="Stream not found or expired").model_dump())
+    after = last_event_id if last_event_id is not None else (from_event_id or 0)
+    if not stream.can_resume_from(after):
+        return JSONResponse(status_code=410, content=ErrorResponse(detail="Requested events are no longer buffered").model_dump())
+    return replay_response(stream, after)
@@ -0,0 +1,26 @@
+"""
+Diagnostics endpoints (admin token required): profiles recorded by the request profiler.
+"""
+from fastapi import APIRouter, Request, Header
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from helpers.request_profiler import get_request_profiler
+from routes.schemes import ErrorResponse
+
+debug_router = APIRouter()
+
+
+@debug_router.get(
+    "/profiles/{profile_id}",
+    summary="Folded-stack profile of a request sent with X-Profile",
+    response_class=PlainTextResponse,
+    responses={403: {"model": ErrorResponse}, 404: {"model": ErrorResponse}},
+)
+async def get_profile(request: Request, profile_id: str, x_admin_token: str | None = Header(None)):
+    profiler = get_request_profiler(request.app)
+    if not profiler.authorized(x_admin_token):
+        return JSONResponse(status_code=403, content=ErrorResponse(detail="Admin token required").model_dump())
+    profile = profiler.get(profile_id)
+    if profile is None:
+        return JSONResponse(status_code=404, content=ErrorResponse(detail="Profile not found").model_dump())
+    return PlainTextResponse(profile.folded())
@@ -0,0 +1,104 @@
+"""
+Asynchronous chat job endpoints: submit a message, then poll or subscribe (SSE) for the reply.
+"""
+import asyncio
+import json
+
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from controllers.chat_jobs import ChatJobPool, get_job, FINISHED_STATUSES
+from helpers.config import get_settings
+from routes.schemes import SendMessageRequest, ChatJobResponse, ErrorResponse
+
+jobs_router = APIRouter()
+
+
+def get_db(request: Request):
+    return request.app.db_client
+
+
+async def get_chat_job_pool(request: Request) -> ChatJobPool | None:
+    pool = getattr(request.app, "chat_job_pool", None)
+    if pool is None:
+        provider = getattr(request.app, "openai_provider", None)
+        if provider is None:
+            return None
+        pool = request.app.chat_job_pool = ChatJobPool(
+            request.app.db_client, provider, getattr(request.app, "embedding_provider", None)
+        )
+        await pool.start()
+    return pool
+
+
+@jobs_router.post(
+    "/jobs",
+    summary="Submit a text message as a background job; returns the job id at once",
+    status_code=202,
+    response_model=ChatJobResponse,
+    responses={404: {"model": ErrorResponse}, 503: {"model": ErrorResponse}},
+)
+async def submit_job(request: Request, body: SendMessageRequest):
+    pool = await get_chat_job_pool(request)
+    if pool is None:
+        return JSONResponse(status_code=503, content=ErrorResponse(detail="LLM provider not available").model_dump())
+    try:
+        job = await pool.submit(body.session_id, body.content)
+    except asyncio.QueueFull:
+        return JSONResponse(
+            status_code=503,
+            content=ErrorResponse(detail="Too many queued jobs; retry later").model_dump(),
+            headers={"Retry-After": str(int(get_settings().CHAT_JOB_POLL_SECONDS) or 1)},
+        )
+    if job is None:
+        return JSONResponse(status_code=404, content=ErrorResponse(detail="Session not found").model_dump())
+    return JSONResponse(status_code=202, content=job, headers={"Location": f"{request.url.path}/{job['job_id']}"})
+
+
+@jobs_router.get(
+    "/jobs/{job_id}",
+    summary="Get a chat job's status and, once finished, its reply",
+    response_model=ChatJobResponse,
+    responses={404: {"model": ErrorResponse}},
+)
+async def get_job_status(request: Request, job_id: int):
+    job = await get_job(get_db(request), job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content=ErrorResponse(detail="Job not found").model_dump())
+    return job
+
+
+@jobs_router.get(
+    "/jobs/{job_id}/events",
+    summary="Subscribe to a chat job (SSE): one event per status change, the last one carries the reply",
+    responses={404: {"model": ErrorResponse}},
+)
+async def job_events(request: Request, job_id: int):
+    db_client = get_db(request)
+    job = await get_job(db_client, job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content=ErrorResponse(detail="Job not found").model_dump())
+    pool = await get_chat_job_pool(request)
+    poll_seconds = get_settings().CHAT_JOB_POLL_SECONDS
+
+    async def sse_generator():
+        current = job
+        last_status = None
+        while True:
+            if current is None:
+                yield f"data: {json.dumps({'error': 'Job not found'})}\n\n"
+                return
+            if current["status"] != last_status:
+                last_status = current["status"]
+                yield f"data: {json.dumps(current)}\n\n"
+            if last_status in FINISHED_STATUSES:
+                return
+            if pool is not None:
+                await pool.wait_for_any(poll_seconds)
+            else:
+                await asyncio.sleep(poll_seconds)
+            current = await get_job(db_client, job_id)
+
+    return StreamingResponse(
+        sse_generator(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
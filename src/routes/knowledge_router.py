@@ -0,0 +1,75 @@
+"""
+Agent knowledge base endpoints: upload (ingest) a document, list documents, delete a document.
+"""
+from fastapi import APIRouter, Request, UploadFile, File, Form
+from fastapi.responses import JSONResponse
+
+from controllers import knowledge
+from helpers.text_chunker import iter_decoded
+from models.AgentModel import AgentModel
+from models.KnowledgeModel import KnowledgeModel
+from routes.schemes import (
+    KnowledgeIngestResponse,
+    KnowledgeDocumentResponse,
+    DeletedResponse,
+    ErrorResponse,
+)
+
+knowledge_router = APIRouter()
+
+
+def get_db(request: Request):
+    return request.app.db_client
+
+
+def get_embedding_provider(request: Request):
+    return getattr(request.app, "embedding_provider", None)
+
+
+@knowledge_router.post(
+    "/{agent_id}/knowledge",
+    summary="Upload a text document into the agent's knowledge base",
+    response_model=KnowledgeIngestResponse,
+    responses={404: {"model": ErrorResponse}, 503: {"model": ErrorResponse}},
+)
+async def upload_document(
+    request: Request,
+    agent_id: int,
+    file: UploadFile = File(..., description="UTF-8 text document (txt, md, ...)"),
+    document_name: str | None = Form(None, description="Name to store the document under (defaults to file name)"),
+):
+    provider = get_embedding_provider(request)
+    if provider is None:
+        return JSONResponse(status_code=503, content=ErrorResponse(detail="Embedding provider not available").model_dump())
+    if await AgentModel(get_db(request)).get_by_id(agent_id) is None:
+        return JSONResponse(status_code=404, content=ErrorResponse(detail="Agent not found").model_dump())
+    name = document_name or file.filename or "document.txt"
+    result = await knowledge.ingest_document(get_db(request), provider, agent_id, name, iter_decoded(file.read))
+    return KnowledgeIngestResponse(**result)
+
+
+@knowledge_router.get(
+    "/{agent_id}/knowledge",
+    summary="List documents in the agent's knowledge base",
+    response_model=list[KnowledgeDocumentResponse],
+)
+async def list_documents(request: Request, agent_id: int):
+    model = KnowledgeModel(get_db(request))
+    documents = await model.list_documents(agent_id)
+    return [
+        KnowledgeDocumentResponse(document_name=name, chunk_count=chunks, token_count=tokens)
+        for name, chunks, tokens in documents
+    ]
+
+
+@knowledge_router.delete(
+    "/{agent_id}/knowledge/{document_name}",
+    summary="Delete a document from the agent's knowledge base",
+    response_model=DeletedResponse,
+    responses={404: {"model": ErrorResponse}},
+)
+async def delete_document(request: Request, agent_id: int, document_name: str):
+    model = KnowledgeModel(get_db(request))
+    if not await model.delete_document(agent_id, document_name):
+        return JSONResponse(status_code=404, content=ErrorResponse(detail="Document not found").model_dump())
+    return DeletedResponse()
@@ -7,9 +7,22 @@ from routes.schemes.schemes import (
     AgentCreate,
     AgentUpdate,
     AgentResponse,
+    ToolResponse,
     SessionResponse,
+    SessionForkRequest,
+    SessionStatsResponse,
     SendMessageRequest,
+    BatchMessagesRequest,
+    BatchItemResult,
+    FanOutRequest,
     MessageResponse,
+    ChatJobResponse,
+    MessageSearchHit,
+    MessageSearchResponse,
+    KnowledgeIngestResponse,
+    KnowledgeDocumentResponse,
+    AgentUsageBucket,
+    SessionUsageResponse,
 )
 
 __all__ = [
@@ -18,7 +31,20 @@ __all__ = [
     "AgentCreate",
     "AgentUpdate",
     "AgentResponse",
+    "ToolResponse",
     "SessionResponse",
+    "SessionForkRequest",
+    "SessionStatsResponse",
     "SendMessageRequest",
+    "BatchMessagesRequest",
+    "BatchItemResult",
+    "FanOutRequest",
     "MessageResponse",
+    "ChatJobResponse",
+    "MessageSearchHit",
+    "MessageSearchResponse",
+    "KnowledgeIngestResponse",
+    "KnowledgeDocumentResponse",
+    "AgentUsageBucket",
+    "SessionUsageResponse",
 ]
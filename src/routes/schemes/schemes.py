@@ -30,6 +30,7 @@ class AgentCreate(BaseModel):
 
     name: str
     prompt: str
+    tools: list[str] = []  # registered tool names (GET /agents/tools)
 
 
 class AgentUpdate(BaseModel):
@@ -37,6 +38,7 @@ class AgentUpdate(BaseModel):
 
     name: str | None = None
     prompt: str | None = None
+    tools: list[str] | None = None
 
 
 class AgentResponse(BaseModel):
@@ -45,10 +47,19 @@ class AgentResponse(BaseModel):
     agent_id: int
     name: str
     prompt: str
+    tools: list[str] = []
     created_at: str | None
     updated_at: str | None
 
 
+class ToolResponse(BaseModel):
+    """A tool agents can be given: its name, description and JSON schema of arguments."""
+
+    name: str
+    description: str
+    parameters: dict
+
+
 # ----- Sessions -----
 
 
@@ -57,10 +68,28 @@ class SessionResponse(BaseModel):
 
     session_id: int
     agent_id: int
+    parent_session_id: int | None = None  # set for forks
+    fork_message_id: int | None = None  # last inherited message of the parent's history
     created_at: str | None
     updated_at: str | None
 
 
+class SessionForkRequest(BaseModel):
+    """Request body for forking a session: the last message to keep (default: the session's last message)."""
+
+    message_id: int | None = None
+
+
+class SessionStatsResponse(SessionResponse):
+    """Session with aggregated stats for listings (message count, last message preview, last activity)."""
+
+    message_count: int
+    last_message_id: int | None
+    last_message_preview: str | None
+    last_activity_at: str | None
+    compaction_tokens_saved: int = 0
+
+
 # ----- Chat / Messages -----
 
 
@@ -71,6 +100,21 @@ class SendMessageRequest(BaseModel):
     content: str
 
 
+class BatchMessagesRequest(BaseModel):
+    """Request body for the batch chat endpoint: turns to run, optional parallelism cap (server default/maximum applies)."""
+
+    items: list[SendMessageRequest]
+    max_parallel: int | None = None
+
+
+class FanOutRequest(BaseModel):
+    """Request body for the fan-out endpoint: one message for existing sessions and/or agents (a new session each)."""
+
+    content: str
+    session_ids: list[int] = []
+    agent_ids: list[int] = []
+
+
 class MessageResponse(BaseModel):
     """Response for a single message (e.g. assistant reply)."""
 
@@ -79,3 +123,98 @@ class MessageResponse(BaseModel):
     role: str
     content: str
     created_at: str | None
+
+
+class BatchItemResult(BaseModel):
+    """One NDJSON line of a batch response; `index` is the item's position in the request."""
+
+    index: int
+    session_id: int
+    ok: bool
+    message: MessageResponse | None
+    error: str | None
+
+
+class ChatJobResponse(BaseModel):
+    """State of an asynchronous chat job; assistant_message is set once it succeeded."""
+
+    job_id: int
+    session_id: int
+    status: str
+    user_message_id: int
+    assistant_message: MessageResponse | None
+    error: str | None
+    created_at: str | None
+    started_at: str | None
+    finished_at: str | None
+
+
+# ----- Knowledge base -----
+
+
+class KnowledgeIngestResponse(BaseModel):
+    """Result of ingesting one document into an agent's knowledge base."""
+
+    document_name: str
+    chunks: int
+    tokens: int
+
+
+class KnowledgeDocumentResponse(BaseModel):
+    """One document in an agent's knowledge base."""
+
+    document_name: str
+    chunk_count: int
+    token_count: int
+
+
+# ----- Search -----
+
+
+class MessageSearchHit(BaseModel):
+    """One ranked search hit with a highlighted snippet."""
+
+    message_id: int
+    session_id: int
+    agent_id: int
+    role: str
+    snippet: str
+    rank: float
+    created_at: str | None
+
+
+class MessageSearchResponse(BaseModel):
+    """Page of search hits; pass next_cursor back as `cursor` to fetch the next page."""
+
+    results: list[MessageSearchHit]
+    next_cursor: str | None
+
+
+# ----- Usage -----
+
+
+class UsageTotals(BaseModel):
+    """Token, latency and TTS totals over a group of assistant messages."""
+
+    messages: int
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    avg_ttft_ms: float | None
+    avg_latency_ms: float | None
+    max_latency_ms: int | None
+    tts_audio_bytes: int
+
+
+class AgentUsageBucket(UsageTotals):
+    """Usage of one agent in one time bucket (bucket_start: start of the hour or day, UTC)."""
+
+    agent_id: int
+    bucket_start: str
+
+
+class SessionUsageResponse(UsageTotals):
+    """Usage of one session."""
+
+    session_id: int
+    agent_id: int
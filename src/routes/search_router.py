@@ -0,0 +1,68 @@
+"""
+Message search endpoint: ranked full-text search over message content with keyset pagination.
+"""
+import base64
+import json
+
+from fastapi import APIRouter, Request, Query
+from fastapi.responses import JSONResponse
+
+from models.MessageModel import MessageModel
+from routes.schemes import MessageSearchHit, MessageSearchResponse, ErrorResponse
+
+search_router = APIRouter()
+
+
+def get_db(request: Request):
+    return request.app.db_client
+
+
+def encode_cursor(rank: float, message_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([rank, message_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[float, int]:
+    rank, message_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return float(rank), int(message_id)
+
+
+@search_router.get(
+    "/search",
+    summary="Search messages by content",
+    response_model=MessageSearchResponse,
+    responses={400: {"model": ErrorResponse}},
+)
+async def search_messages(
+    request: Request,
+    q: str = Query(..., min_length=1, description="Search query (web-search syntax on PostgreSQL)"),
+    agent_id: int | None = Query(None, description="Only messages of this agent's sessions"),
+    session_id: int | None = Query(None, description="Only messages of this session"),
+    role: str | None = Query(None, description="Only messages with this role (user, assistant, system)"),
+    limit: int = Query(20, ge=1, le=100, description="Page size"),
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+):
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except (ValueError, TypeError):
+            return JSONResponse(status_code=400, content=ErrorResponse(detail="Invalid cursor").model_dump())
+
+    model = MessageModel(get_db(request))
+    hits = await model.search(q, agent_id=agent_id, session_id=session_id, role=role, limit=limit, after=after)
+    next_cursor = encode_cursor(hits[-1]["rank"], hits[-1]["message_id"]) if len(hits) == limit else None
+    return MessageSearchResponse(
+        results=[
+            MessageSearchHit(
+                message_id=h["message_id"],
+                session_id=h["session_id"],
+                agent_id=h["agent_id"],
+                role=h["role"],
+                snippet=h["snippet"],
+                rank=h["rank"],
+                created_at=h["created_at"].isoformat() if h["created_at"] else None,
+            )
+            for h in hits
+        ],
+        next_cursor=next_cursor,
+    )
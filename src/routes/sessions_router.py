@@ -1,12 +1,14 @@
 """
-Session endpoints: list by agent, get, create, delete.
+Session endpoints: list by agent, get, create, fork, delete.
 """
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Request, Query
 from fastapi.responses import JSONResponse
 
+from helpers.etag import make_etag, etag_matches, not_modified, with_etag
+from helpers.serialization import FastJSONResponse
 from models.SessionModel import SessionModel
 from models.ai_agent_platform_DB.schemes import Session
-from routes.schemes import SessionResponse, DeletedResponse, ErrorResponse
+from routes.schemes import SessionResponse, SessionForkRequest, SessionStatsResponse, DeletedResponse, ErrorResponse
 
 sessions_router = APIRouter()
 
@@ -19,27 +21,117 @@ def session_to_response(s) -> SessionResponse:
     return SessionResponse(
         session_id=s.session_id,
         agent_id=s.agent_id,
+        parent_session_id=s.parent_session_id,
+        fork_message_id=s.fork_message_id,
         created_at=s.created_at.isoformat() if s.created_at else None,
         updated_at=s.updated_at.isoformat() if s.updated_at else None,
     )
 
 
+def session_to_dict(s) -> dict:
+    """Plain-dict SessionResponse payload for FastJSONResponse (no Pydantic round trip)."""
+    return {
+        "session_id": s.session_id,
+        "agent_id": s.agent_id,
+        "parent_session_id": s.parent_session_id,
+        "fork_message_id": s.fork_message_id,
+        "created_at": s.created_at,
+        "updated_at": s.updated_at,
+    }
+
+
+def session_stats_to_dict(s, last_message_preview: str | None) -> dict:
+    """Plain-dict SessionStatsResponse payload."""
+    out = session_to_dict(s)
+    out.update(
+        message_count=s.message_count or 0,
+        last_message_id=s.last_message_id,
+        last_message_preview=last_message_preview,
+        last_activity_at=s.updated_at or s.created_at,
+        compaction_tokens_saved=s.compaction_tokens_saved or 0,
+    )
+    return out
+
+
 # More specific paths first so "sessions" is not captured as agent_id
-@sessions_router.get("/sessions/{session_id}", summary="Get session by id", response_model=SessionResponse, responses={404: {"model": ErrorResponse}})
+@sessions_router.get(
+    "/sessions/{session_id}",
+    summary="Get session by id",
+    response_model=SessionResponse,
+    responses={304: {"description": "Not modified"}, 404: {"model": ErrorResponse}},
+)
 async def get_session(request: Request, session_id: int):
     model = SessionModel(get_db(request))
     session = await model.get_by_id(session_id)
     if session is None:
         return JSONResponse(status_code=404, content=ErrorResponse(detail="Session not found").model_dump())
-    return session_to_response(session)
+    etag = make_etag("session", session.session_id, session.version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return with_etag(FastJSONResponse(session_to_dict(session)), etag)
+
+
+@sessions_router.post(
+    "/sessions/{session_id}/fork",
+    summary="Fork a session at a message (copy-on-write)",
+    response_model=SessionResponse,
+    responses={400: {"model": ErrorResponse}, 404: {"model": ErrorResponse}},
+)
+async def fork_session(request: Request, session_id: int, body: SessionForkRequest | None = None):
+    """
+    New session of the same agent whose history is this session's history up to and including `message_id`
+    (default: its last message); later messages go to the fork only. No message is copied.
+    """
+    model = SessionModel(get_db(request))
+    session = await model.get_by_id(session_id)
+    if session is None:
+        return JSONResponse(status_code=404, content=ErrorResponse(detail="Session not found").model_dump())
+    message_id = body.message_id if body is not None and body.message_id is not None else session.last_message_id
+    if message_id is None:
+        return JSONResponse(status_code=400, content=ErrorResponse(detail="Session has no messages to fork").model_dump())
+    fork = await model.fork_session(session, message_id)
+    if fork is None:
+        return JSONResponse(
+            status_code=404, content=ErrorResponse(detail="Message not found in the session's history").model_dump()
+        )
+    return session_to_response(fork)
+
+
+@sessions_router.delete(
+    "/sessions/{session_id}",
+    summary="Delete session and its messages",
+    response_model=DeletedResponse,
+    responses={404: {"model": ErrorResponse}},
+)
+async def delete_session(request: Request, session_id: int):
+    if not await SessionModel(get_db(request)).delete_session(session_id):
+        return JSONResponse(status_code=404, content=ErrorResponse(detail="Session not found").model_dump())
+    return DeletedResponse()
 
 
 
-@sessions_router.get("/{agent_id}/sessions", summary="List sessions for an agent", response_model=list[SessionResponse])
-async def list_sessions(request: Request, agent_id: int):
+@sessions_router.get(
+    "/{agent_id}/sessions",
+    summary="List sessions for an agent",
+    response_model=list[SessionStatsResponse] | list[SessionResponse],
+    responses={304: {"description": "Not modified"}},
+)
+async def list_sessions(
+    request: Request,
+    agent_id: int,
+    include_stats: bool = Query(False, description="Include message count, last message preview and last activity"),
+    limit: int | None = Query(None, ge=1, le=500, description="Page size (only with include_stats)"),
+    offset: int = Query(0, ge=0, description="Page offset (only with include_stats)"),
+):
     model = SessionModel(get_db(request))
+    etag = make_etag("sessions", agent_id, include_stats, limit, offset, *await model.list_version(agent_id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    if include_stats:
+        rows = await model.list_by_agent_with_stats(agent_id, limit=limit, offset=offset)
+        return with_etag(FastJSONResponse([session_stats_to_dict(s, preview) for s, preview in rows]), etag)
     sessions = await model.list_by_agent(agent_id)
-    return [session_to_response(s) for s in sessions]
+    return with_etag(FastJSONResponse([session_to_dict(s) for s in sessions]), etag)
 
 
 @sessions_router.post("/{agent_id}/sessions", summary="Create a new chat session", response_model=SessionResponse)
@@ -0,0 +1,50 @@
+"""
+Usage endpoints: token, latency and TTS totals of assistant messages per agent and time bucket, and per session.
+"""
+from datetime import datetime
+
+from fastapi import APIRouter, Request, Query
+
+from models.UsageModel import UsageModel
+from routes.schemes import AgentUsageBucket, SessionUsageResponse
+
+usage_router = APIRouter()
+
+
+def get_db(request: Request):
+    return request.app.db_client
+
+
+@usage_router.get(
+    "/agents",
+    summary="Usage per agent and time bucket",
+    response_model=list[AgentUsageBucket],
+)
+async def usage_by_agent(
+    request: Request,
+    bucket: str = Query("day", pattern="^(hour|day)$", description="Bucket size: hour or day"),
+    agent_id: int | None = Query(None, description="Only this agent"),
+    since: datetime | None = Query(None, description="Messages created at or after this time"),
+    until: datetime | None = Query(None, description="Messages created before this time"),
+):
+    rows = await UsageModel(get_db(request)).by_agent(bucket, agent_id=agent_id, since=since, until=until)
+    return [AgentUsageBucket(**{**row, "bucket_start": row["bucket_start"].isoformat()}) for row in rows]
+
+
+@usage_router.get(
+    "/sessions",
+    summary="Sessions ranked by tokens or latency",
+    response_model=list[SessionUsageResponse],
+)
+async def usage_by_session(
+    request: Request,
+    agent_id: int | None = Query(None, description="Only sessions of this agent"),
+    since: datetime | None = Query(None, description="Messages created at or after this time"),
+    until: datetime | None = Query(None, description="Messages created before this time"),
+    order_by: str = Query("tokens", pattern="^(tokens|latency)$", description="tokens (total) or latency (average)"),
+    limit: int = Query(20, ge=1, le=100, description="Sessions returned"),
+):
+    rows = await UsageModel(get_db(request)).top_sessions(
+        agent_id=agent_id, since=since, until=until, order_by=order_by, limit=limit
+    )
+    return [SessionUsageResponse(**row) for row in rows]
@@ -0,0 +1,22 @@
+from ..LLMEnums import EmbeddingBackendEnums
+
+
+class EmbeddingProviderFactory():
+
+    def __init__(self, config):
+        self.config = config
+
+    def create(self, backend: str | None = None):
+        """Build the embedding provider for the configured backend (EMBEDDING_BACKEND)."""
+        backend = (backend or self.config.EMBEDDING_BACKEND or EmbeddingBackendEnums.LOCAL.value).lower()
+        if backend == EmbeddingBackendEnums.OPENAI.value:
+            from .OpenAIEmbeddingProvider import OpenAIEmbeddingProvider
+            return OpenAIEmbeddingProvider(
+                api_key=self.config.OPENAI_API_KEY,
+                model_id=self.config.EMBEDDING_MODEL_ID,
+                dimensions=self.config.EMBEDDING_DIMENSIONS,
+            )
+        if backend == EmbeddingBackendEnums.LOCAL.value:
+            from .LocalHashEmbeddingProvider import LocalHashEmbeddingProvider
+            return LocalHashEmbeddingProvider(dimensions=self.config.EMBEDDING_DIMENSIONS)
+        raise ValueError(f"Unknown embedding backend: {backend}")
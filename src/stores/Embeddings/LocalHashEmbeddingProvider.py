@@ -0,0 +1,35 @@
+import hashlib
+import math
+import re
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+class LocalHashEmbeddingProvider():
+    """
+    Deterministic, offline embeddings via feature hashing of word unigrams and bigrams.
+    No model download or network; quality is lexical only, but good enough for tests and local development.
+    """
+
+    def __init__(self, dimensions: int = 256):
+        self.dimensions = dimensions
+
+    def _bucket(self, feature: str) -> tuple[int, float]:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dimensions, (1.0 if (value >> 63) & 1 else -1.0)
+
+    def embed_text(self, text: str) -> list[float]:
+        vector = [0.0] * self.dimensions
+        words = [w.lower() for w in _TOKEN.findall(text)]
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for feature in features:
+            index, sign = self._bucket(feature)
+            vector[index] += sign
+        norm = math.sqrt(sum(v * v for v in vector))
+        if norm == 0:
+            return vector
+        return [v / norm for v in vector]
+
+    def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed_text(t) for t in texts]
@@ -0,0 +1,26 @@
+import logging
+
+
+class OpenAIEmbeddingProvider():
+
+    def __init__(self, api_key: str, model_id: str = "text-embedding-3-small", dimensions: int = 256):
+        self.model_id = model_id
+        self.dimensions = dimensions
+        from openai import OpenAI  # only imported when this backend is configured
+        self.client = OpenAI(api_key=api_key or "")
+        self.logger = logging.getLogger(__name__)
+
+    def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        """Embed a batch of texts in one API call; output order matches input order."""
+        if not texts:
+            return []
+        response = self.client.embeddings.create(
+            model=self.model_id,
+            input=texts,
+            dimensions=self.dimensions,
+        )
+        data = sorted(response.data, key=lambda d: d.index)
+        return [list(d.embedding) for d in data]
+
+    def embed_text(self, text: str) -> list[float]:
+        return self.embed_texts([text])[0]
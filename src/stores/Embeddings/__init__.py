@@ -0,0 +1,2 @@
+from .EmbeddingProviderFactory import EmbeddingProviderFactory
+from .LocalHashEmbeddingProvider import LocalHashEmbeddingProvider
@@ -1,15 +1,64 @@
 import logging
-
-from openai import OpenAI
+import threading
+from functools import lru_cache
 
 from ..LLMEnums import OpenAIEnums
 
+
+@lru_cache(maxsize=1)
+def connection_errors() -> tuple[type[BaseException], ...]:
+    """
+    Exceptions meaning "the provider could not be reached". Resolved on first use so importing this module
+    (and everything that catches these) does not pull in the openai SDK; by the time one of them can be raised
+    the SDK has been imported by the client anyway.
+    """
+    from openai import APIConnectionError
+    import httpx
+    return (APIConnectionError, httpx.ConnectError)
+
+def _fill_usage(usage: dict, response) -> None:
+    """Add the response's token counts to `usage`, so one dict can total several calls (tool-calling rounds)."""
+    counts = getattr(response, "usage", None)
+    if counts is not None:
+        for key in ("prompt_tokens", "completion_tokens"):
+            value = getattr(counts, key, None)
+            if value is not None:
+                usage[key] = usage.get(key, 0) + value
+    if getattr(response, "model", None):
+        usage["model"] = response.model
+
+
+class ToolCallRequest:
+    """
+    The model asked for tool calls instead of (or before) answering. `calls` are {"id", "name", "arguments"} dicts,
+    arguments being the JSON text the model produced. Returned by generate_chat and yielded as the last item of
+    generate_chat_stream; the caller runs the tools and asks again with the results (controllers/tools.py).
+    """
+
+    def __init__(self, calls: list[dict], content: str | None = None):
+        self.calls = calls
+        self.content = content
+
+    def assistant_message(self) -> dict:
+        """The assistant turn to send back, followed by one "tool" message per call."""
+        return {
+            "role": "assistant",
+            "content": self.content,
+            "tool_calls": [
+                {"id": c["id"], "type": "function", "function": {"name": c["name"], "arguments": c["arguments"]}}
+                for c in self.calls
+            ],
+        }
+
+
 class OpenAIProvider():
 
     def __init__(self, api_key: str,
                 default_generation_max_output_tokens: int = 1000,
-                default_generation_temperature: float = 0.1):
+                default_generation_temperature: float = 0.1,
+                request_timeout: float | None = None):
         self.api_key = api_key
+        self.request_timeout = request_timeout  # seconds per HTTP request (None = the SDK default, 600)
         self.default_generation_max_output_tokens = default_generation_max_output_tokens
         self.default_generation_temperature = default_generation_temperature
         self.generation_model_id = None
@@ -17,11 +66,23 @@ class OpenAIProvider():
         self.stt_language = None
         self.tts_model_id = None
         self.tts_voice = None
-      
-        self.client = OpenAI(api_key=api_key or "")
-        
+
+        # The SDK import and HTTP client are the most expensive part of startup; build them on first call
+        self._client = None
+        self._client_lock = threading.Lock()
+
         self.logger = logging.getLogger(__name__)
 
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:  # provider methods run in worker threads
+                if self._client is None:
+                    from openai import OpenAI
+                    timeout = {"timeout": self.request_timeout} if self.request_timeout else {}
+                    self._client = OpenAI(api_key=self.api_key or "", **timeout)
+        return self._client
+
     def set_generation_model(self, model_id: str):
         self.generation_model_id = model_id # this will allow dynamic model selection while run time
 
@@ -38,8 +99,14 @@ class OpenAIProvider():
         messages: list[dict],
         max_output_tokens: int = None,
         temperature: float = None,
-    ) -> str | None:
-        """Generate assistant reply given full conversation history (for chat with context)."""
+        usage: dict | None = None,
+        tools: list[dict] | None = None,
+    ) -> str | ToolCallRequest | None:
+        """
+        Generate assistant reply given full conversation history (for chat with context).
+        Pass a dict as `usage` to receive the token counts: prompt_tokens, completion_tokens and model.
+        With `tools` (function specs) the model may answer with a ToolCallRequest instead of text.
+        """
         if not self.client:
             self.logger.error("OpenAI client is not initialized.")
             return None
@@ -53,11 +120,20 @@ class OpenAIProvider():
             messages=messages,
             max_tokens=max_output_tokens,
             temperature=temperature,
+            **({"tools": tools} if tools else {}),
         )
         if not response or not response.choices or len(response.choices) == 0 or not response.choices[0].message:
             self.logger.error("Error while generating chat with OpenAI.")
             return None
+        if usage is not None:
+            _fill_usage(usage, response)
         msg = response.choices[0].message
+        tool_calls = getattr(msg, "tool_calls", None)
+        if tool_calls:
+            return ToolCallRequest(
+                [{"id": c.id, "name": c.function.name, "arguments": c.function.arguments or ""} for c in tool_calls],
+                content=getattr(msg, "content", None),
+            )
         return getattr(msg, "content", None) or (msg.model_dump().get("content") if hasattr(msg, "model_dump") else None)
 
     def generate_chat_stream(
@@ -65,8 +141,15 @@ class OpenAIProvider():
         messages: list[dict],
         max_output_tokens: int = None,
         temperature: float = None,
+        usage: dict | None = None,
+        tools: list[dict] | None = None,
     ):
-        """Stream assistant reply chunk by chunk. Yields content deltas (str). Caller can accumulate and persist when done."""
+        """
+        Stream assistant reply chunk by chunk. Yields content deltas (str). Caller can accumulate and persist when done.
+        A dict passed as `usage` is filled like generate_chat's once the stream is read to the end (the API sends the
+        counts in a final chunk without choices); a stream closed early leaves it empty.
+        With `tools`, tool call fragments are assembled and yielded as one ToolCallRequest after the last delta.
+        """
         if not self.client:
             self.logger.error("OpenAI client is not initialized.")
             return
@@ -81,16 +164,35 @@ class OpenAIProvider():
             max_tokens=max_output_tokens,
             temperature=temperature,
             stream=True,
+            stream_options={"include_usage": True},
+            **({"tools": tools} if tools else {}),
         )
-        for chunk in stream:
-            if not chunk.choices or len(chunk.choices) == 0:
-                continue
-            delta = chunk.choices[0].delta
-            if delta is None:
-                continue
-            content = getattr(delta, "content", None) or (delta.model_dump().get("content") if hasattr(delta, "model_dump") else None)
-            if content:
-                yield content
+        calls: dict[int, dict] = {}
+        try:
+            for chunk in stream:
+                if usage is not None and getattr(chunk, "usage", None):
+                    _fill_usage(usage, chunk)
+                if not chunk.choices or len(chunk.choices) == 0:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta is None:
+                    continue
+                for fragment in getattr(delta, "tool_calls", None) or ():
+                    # The id and name come in the first fragment of each call, the arguments JSON in pieces
+                    call = calls.setdefault(fragment.index, {"id": None, "name": "", "arguments": ""})
+                    call["id"] = fragment.id or call["id"]
+                    if fragment.function is not None:
+                        call["name"] += fragment.function.name or ""
+                        call["arguments"] += fragment.function.arguments or ""
+                content = getattr(delta, "content", None) or (delta.model_dump().get("content") if hasattr(delta, "model_dump") else None)
+                if content:
+                    yield content
+            if calls:
+                yield ToolCallRequest([calls[index] for index in sorted(calls)])
+        finally:
+            # Closing the generator early (client went away) must also close the upstream HTTP stream,
+            # otherwise the model keeps generating tokens nobody reads.
+            stream.close()
 
     def speech_to_text(self, audio_file, filename: str = "audio.webm") -> str | None:
         """Convert audio file to text using OpenAI transcription API."""
@@ -144,12 +246,12 @@ class OpenAIProvider():
             return
         model = getattr(self, "tts_model_id", None) or "tts-1"
         try:
-            response = self.client.audio.speech.create(
+            with self.client.audio.speech.with_streaming_response.create(
                 model=model,
                 voice=voice,
                 input=text,
-            )
-            yield from response.iter_bytes(chunk_size=4096)
+            ) as response:
+                yield from response.iter_bytes(chunk_size=4096)
         except Exception as e:
             self.logger.error("Text-to-speech streaming error: %s", e)
 
@@ -1 +1 @@
-from .OpenAIProvider import OpenAIProvider
\ No newline at end of file
+from .OpenAIProvider import OpenAIProvider, ToolCallRequest, connection_errors
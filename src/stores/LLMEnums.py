@@ -5,3 +5,20 @@ class OpenAIEnums(str, Enum):
     ROLE_SYSTEM = "system"
     ROLE_USER = "user"
     ROLE_ASSISTANT = "assistant"
+
+
+class MessageRoleEnums(str, Enum):
+    # Stored-only role: compacted summary of older turns, sent to the model as a system message
+    ROLE_SUMMARY = "summary"
+
+
+class EmbeddingBackendEnums(str, Enum):
+    LOCAL = "local"
+    OPENAI = "openai"
+
+
+class ChatJobStatusEnums(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
@@ -3,12 +3,14 @@ Shared pytest fixtures: in-memory SQLite database, FastAPI test client, mock Ope
 """
 import sys
 import asyncio
+from contextlib import asynccontextmanager
 from pathlib import Path
 from unittest.mock import MagicMock
 
 import pytest
 import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 
@@ -17,6 +19,9 @@ if str(src_dir) not in sys.path:
     sys.path.insert(0, str(src_dir))
 
 from models.ai_agent_platform_DB.schemes import SQLAlchemyBase
+from stores.Embeddings import LocalHashEmbeddingProvider
+from helpers.local_cache import clear_all_caches
+from helpers.stream_replay import StreamReplayBuffer
 
 
 @pytest.fixture(scope="session")
@@ -29,6 +34,14 @@ def event_loop():
 @pytest_asyncio.fixture()
 async def db_engine():
     engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+
+    # SQLite ignores ON DELETE CASCADE unless foreign keys are switched on per connection
+    @event.listens_for(engine.sync_engine, "connect")
+    def _enable_foreign_keys(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
     async with engine.begin() as conn:
         await conn.run_sync(SQLAlchemyBase.metadata.create_all)
     yield engine
@@ -44,6 +57,7 @@ async def db_session_factory(db_engine):
 
 def _make_mock_openai_provider():
     provider = MagicMock()
+    provider.generation_model_id = "gpt-test"
     provider.generate_chat.return_value = "Hello from the assistant!"
     provider.generate_chat_stream.return_value = iter(["Hello ", "from ", "stream!"])
     provider.speech_to_text.return_value = "transcribed text"
@@ -57,9 +71,55 @@ def _make_mock_openai_provider():
 async def app(db_session_factory):
     from main import app as fastapi_app
 
+    # Each test gets a fresh database whose ids restart at 1, so drop rows cached by earlier tests
+    clear_all_caches()
     fastapi_app.db_client = db_session_factory
     fastapi_app.openai_provider = _make_mock_openai_provider()
-    return fastapi_app
+    fastapi_app.embedding_provider = LocalHashEmbeddingProvider(dimensions=64)
+    fastapi_app.stream_replay = StreamReplayBuffer()
+    fastapi_app.admission = None  # created on first use with default limits
+    fastapi_app.request_profiler = None  # created on first use (disabled: no admin token)
+    fastapi_app.chat_job_pool = None  # created on first use, bound to this test's database
+    yield fastapi_app
+    if fastapi_app.chat_job_pool is not None:
+        await fastapi_app.chat_job_pool.stop()
+
+
+class _OneSessionAtATime:
+    """The in-memory SQLite test database is one shared connection: concurrent tasks must take turns using it."""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def __call__(self):
+        async with self.lock:
+            async with self.factory() as db_session:
+                yield db_session
+
+
+@pytest.fixture()
+def serialized_db(app):
+    """For tests with concurrent database work (background workers, parallel generations)."""
+    app.db_client = _OneSessionAtATime(app.db_client)
+
+
+@pytest.fixture()
+def run_until_abandoned():
+    """
+    Run a stream's frames in a replay buffer, as the stream routes do, and detach its only client after the first
+    event; the short resume grace period then cancels the generation. Returns the event the client received.
+    """
+    async def run(frames):
+        replay = StreamReplayBuffer(ttl_seconds=60, max_streams=10, max_events=100, resume_grace_seconds=0.01)
+        stream = replay.start(frames)
+        events = stream.events(0)
+        first = await events.__anext__()
+        await events.aclose()
+        await asyncio.wait_for(stream.task, timeout=2)
+        return first
+    return run
 
 
 @pytest_asyncio.fixture()
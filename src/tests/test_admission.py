@@ -0,0 +1,137 @@
+"""
+Tests for admission control: endpoint and per-agent budgets, provider queue and loop lag shedding, ticket lifetime.
+"""
+import asyncio
+import json
+import time
+
+import pytest
+
+from helpers.admission import AdmissionController, TEXT, VOICE
+from helpers.config import get_settings
+
+
+def _controller(**limits) -> AdmissionController:
+    return AdmissionController(get_settings().model_copy(update=limits), queue_depth=lambda: 0)
+
+
+async def _session(client) -> tuple[int, int]:
+    agent_id = (await client.post("/api/v1/agents", json={"name": "A", "prompt": "p"})).json()["agent_id"]
+    session_id = (await client.post(f"/api/v1/agents/{agent_id}/sessions")).json()["session_id"]
+    return agent_id, session_id
+
+
+async def _send(client, session_id: int):
+    return await client.post("/api/v1/sessions/send-message", json={"session_id": session_id, "content": "hi"})
+
+
+@pytest.mark.asyncio
+async def test_busy_agent_gets_429_while_other_agents_are_served(client, app):
+    app.admission = _controller(ADMISSION_MAX_AGENT_IN_FLIGHT=1, ADMISSION_RETRY_AFTER_SECONDS=3)
+    busy_agent, busy_session = await _session(client)
+    _, other_session = await _session(client)
+
+    ticket = app.admission.admit(TEXT, busy_agent)
+    response = await _send(client, busy_session)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "3"
+    assert (await _send(client, other_session)).status_code == 200
+
+    ticket.release()
+    assert (await _send(client, busy_session)).status_code == 200
+    assert app.admission.in_flight[TEXT] == 0 and not app.admission.agent_in_flight
+
+
+@pytest.mark.asyncio
+async def test_endpoint_budgets_are_separate(client, app):
+    app.admission = _controller(ADMISSION_MAX_VOICE_IN_FLIGHT=0)
+    _, session_id = await _session(client)
+    voice = await client.post(
+        "/api/v1/sessions/send-voice-message",
+        data={"session_id": str(session_id)},
+        files={"audio": ("a.webm", b"fake-audio", "audio/webm")},
+    )
+    assert voice.status_code == 503
+    assert "Retry-After" in voice.headers
+    app.openai_provider.speech_to_text.assert_not_called()
+    assert (await _send(client, session_id)).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_provider_queue_and_loop_lag_shed_with_503(client, app):
+    _, session_id = await _session(client)
+    app.admission = AdmissionController(get_settings().model_copy(update={"ADMISSION_MAX_PROVIDER_QUEUE": 5}), queue_depth=lambda: 6)
+    assert (await _send(client, session_id)).status_code == 503
+
+    app.admission = _controller(ADMISSION_MAX_LOOP_LAG_MS=100)
+    app.admission.loop_lag_seconds = 0.5
+    response = await _send(client, session_id)
+    assert response.status_code == 503 and response.json()["detail"] == "Server overloaded; retry later"
+    app.openai_provider.generate_chat.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_disabled_admission_admits_everything(client, app):
+    app.admission = _controller(ADMISSION_ENABLED=False, ADMISSION_MAX_TEXT_IN_FLIGHT=0)
+    _, session_id = await _session(client)
+    assert (await _send(client, session_id)).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_stream_holds_its_ticket_until_generation_ends(client, app):
+    app.admission = _controller(ADMISSION_MAX_TEXT_IN_FLIGHT=1)
+    _, session_id = await _session(client)
+    response = await client.post("/api/v1/sessions/stream-message", json={"session_id": session_id, "content": "hi"})
+    assert response.status_code == 200 and '"done": true' in response.text
+    await asyncio.sleep(0)  # done-callbacks run on the next loop iteration
+    assert app.admission.in_flight[TEXT] == 0
+
+
+@pytest.mark.asyncio
+async def test_rejected_voice_upload_releases_its_ticket(client, app):
+    app.admission = _controller()
+    app.openai_provider.speech_to_text.return_value = None
+    _, session_id = await _session(client)
+    response = await client.post(
+        "/api/v1/sessions/send-voice-message",
+        data={"session_id": str(session_id)},
+        files={"audio": ("a.webm", b"fake-audio", "audio/webm")},
+    )
+    assert response.status_code == 400
+    assert app.admission.in_flight[VOICE] == 0
+
+
+@pytest.mark.asyncio
+async def test_loop_lag_sampler_sees_a_blocked_loop():
+    controller = _controller(ADMISSION_LAG_SAMPLE_MS=10)
+    controller.start()
+    try:
+        await asyncio.sleep(0.02)
+        time.sleep(0.2)  # block the event loop
+        await asyncio.sleep(0.03)
+        assert controller.loop_lag_seconds > 0.1
+    finally:
+        await controller.stop()
+
+
+@pytest.mark.asyncio
+async def test_batch_turns_take_tickets_and_refused_items_do_not_stop_the_batch(client, app, monkeypatch):
+    from controllers import conversation
+
+    app.admission = _controller(ADMISSION_MAX_AGENT_IN_FLIGHT=1)
+    busy_agent, first = await _session(client)
+    second = (await client.post(f"/api/v1/agents/{busy_agent}/sessions")).json()["session_id"]
+    _, other = await _session(client)
+
+    async def slow_reply(db_client, provider, session, agent, content, embedding_provider=None):
+        await asyncio.sleep(0.05)
+        return {"message_id": 0, "session_id": session.session_id, "role": "assistant", "content": "ok", "created_at": None}
+
+    monkeypatch.setattr(conversation, "reply_to_message", slow_reply)
+    items = [{"session_id": sid, "content": "hi"} for sid in (first, second, other)]
+    resp = await client.post("/api/v1/sessions/batch-messages", json={"items": items, "max_parallel": 3})
+
+    results = {r["index"]: r for r in map(json.loads, resp.text.splitlines())}
+    assert [results[i]["ok"] for i in range(3)] == [True, False, True]
+    assert results[1]["error"] == "Too many messages in progress for this agent; retry later"
+    assert app.admission.in_flight[TEXT] == 0 and not app.admission.agent_in_flight
@@ -0,0 +1,69 @@
+"""
+Tests for the batch chat endpoint (NDJSON results, per-session ordering, parallelism cap).
+"""
+import asyncio
+import json
+
+import pytest
+
+from controllers import batch, conversation
+
+
+async def _create_session(client, agent_id=None):
+    if agent_id is None:
+        agent_id = (await client.post("/api/v1/agents", json={"name": "Bot", "prompt": "p"})).json()["agent_id"]
+    return (await client.post(f"/api/v1/agents/{agent_id}/sessions")).json()["session_id"]
+
+
+@pytest.mark.asyncio
+async def test_batch_streams_ndjson_results(client):
+    first = await _create_session(client)
+    second = await _create_session(client)
+    items = [
+        {"session_id": first, "content": "one"},
+        {"session_id": second, "content": "two"},
+        {"session_id": 9999, "content": "lost"},
+        {"session_id": first, "content": "three"},
+    ]
+    resp = await client.post("/api/v1/sessions/batch-messages", json={"items": items, "max_parallel": 1})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    results = {r["index"]: r for r in map(json.loads, resp.text.splitlines())}
+    assert sorted(results) == [0, 1, 2, 3]
+    assert results[2]["ok"] is False and results[2]["error"] == "Session not found"
+    assert all(results[i]["ok"] for i in (0, 1, 3))
+    assert results[0]["message"]["role"] == "assistant"
+
+    messages = (await client.get(f"/api/v1/sessions/session-messages?session_id={first}")).json()
+    assert [(m["role"], m["content"]) for m in messages][::2] == [("user", "one"), ("user", "three")]
+
+
+@pytest.mark.asyncio
+async def test_batch_rejects_empty_request(client):
+    resp = await client.post("/api/v1/sessions/batch-messages", json={"items": []})
+    assert resp.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_batch_respects_parallelism_and_session_order(client, app, monkeypatch):
+    sessions = [await _create_session(client) for _ in range(3)]
+    active = 0
+    peak = 0
+    seen: dict[int, list[str]] = {}
+
+    async def fake_reply(db_client, provider, session, agent, content, embedding_provider=None):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        seen.setdefault(session.session_id, []).append(content)
+        active -= 1
+        return {"message_id": 0, "session_id": session.session_id, "role": "assistant", "content": "ok", "created_at": None}
+
+    monkeypatch.setattr(conversation, "reply_to_message", fake_reply)
+    items = [(sid, f"turn-{n}") for n in range(3) for sid in sessions]
+    results = [r async for r in batch.run_batch(app.db_client, app.openai_provider, items, max_parallel=2)]
+
+    assert len(results) == len(items) and all(r["ok"] for r in results)
+    assert peak == 2
+    assert all(turns == ["turn-0", "turn-1", "turn-2"] for turns in seen.values())
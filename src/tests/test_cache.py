@@ -0,0 +1,80 @@
+"""
+Tests for local caches and the invalidation bus (writes invalidate cached agents/sessions).
+"""
+import pytest
+
+from helpers.invalidation_bus import InvalidationBus
+from helpers.local_cache import get_cache, AGENTS_CACHE, SESSIONS_CACHE, LocalCache
+from models.AgentModel import AgentModel
+from models.SessionModel import SessionModel
+
+
+@pytest.mark.asyncio
+async def test_agent_update_invalidates_cache(client, app):
+    agent_id = (await client.post("/api/v1/agents", json={"name": "Old", "prompt": "p"})).json()["agent_id"]
+    model = AgentModel(app.db_client)
+    assert (await model.get_by_id(agent_id)).name == "Old"
+    assert get_cache(AGENTS_CACHE).get(agent_id) is not None
+
+    await client.put(f"/api/v1/agents/{agent_id}", json={"name": "New"})
+    assert get_cache(AGENTS_CACHE).get(agent_id) is None
+    assert (await model.get_by_id(agent_id)).name == "New"
+
+
+@pytest.mark.asyncio
+async def test_agent_update_writes_only_the_given_fields(client, app):
+    agent_id = (await client.post("/api/v1/agents", json={"name": "A", "prompt": "old"})).json()["agent_id"]
+    model = AgentModel(app.db_client)
+    stale = await model.get_by_id(agent_id)
+    await model.update_agent(agent_id, {"prompt": "from another worker"})
+    get_cache(AGENTS_CACHE).set(agent_id, stale)  # this worker has not seen the invalidation yet
+
+    updated = (await client.put(f"/api/v1/agents/{agent_id}", json={"name": "B"})).json()
+    assert (updated["name"], updated["prompt"]) == ("B", "from another worker")
+
+    await client.delete(f"/api/v1/agents/{agent_id}")
+    assert (await client.put(f"/api/v1/agents/{agent_id}", json={"name": "C"})).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_message_write_invalidates_session_cache(client, app):
+    agent_id = (await client.post("/api/v1/agents", json={"name": "A", "prompt": "p"})).json()["agent_id"]
+    session_id = (await client.post(f"/api/v1/agents/{agent_id}/sessions")).json()["session_id"]
+    model = SessionModel(app.db_client)
+    assert (await model.get_by_id(session_id)).message_count == 0
+
+    await client.post("/api/v1/sessions/send-message", json={"session_id": session_id, "content": "hi"})
+    assert (await model.get_by_id(session_id)).message_count == 2
+
+
+def test_notification_payload_invalidates_entry():
+    cache = get_cache(SESSIONS_CACHE)
+    cache.set(5, object())
+    InvalidationBus(db_engine=None, channel="test")._on_notify(None, 1, "test", f"{SESSIONS_CACHE}:5")
+    assert cache.get(5) is None
+
+
+def test_reads_older_than_an_invalidation_are_not_cached():
+    cache = LocalCache("t", ttl_seconds=60, max_entries=2)
+    read_started = cache.read_started()
+    cache.invalidate(1)
+    cache.set(1, "stale", read_started)
+    assert cache.get(1) is None
+    cache.set(1, "fresh", cache.read_started())
+    assert cache.get(1) == "fresh"
+
+    cache.invalidate(2)
+    cache.invalidate(3)  # evicts the record for 1: older reads of any key are now refused
+    cache.set(1, "stale", read_started)
+    assert cache.get(1) == "fresh"
+
+
+def test_local_cache_evicts_least_recently_used():
+    cache = LocalCache("t", ttl_seconds=60, max_entries=2)
+    cache.set(1, "a")
+    cache.set(2, "b")
+    cache.get(1)
+    cache.set(3, "c")
+    assert cache.get(2) is None
+    assert cache.get(1) == "a"
+    assert cache.get(3) == "c"
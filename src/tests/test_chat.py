@@ -1,6 +1,8 @@
 """
 Tests for Chat endpoints: list messages, send message (JSON), stream message (SSE), send voice.
 """
+import time
+
 import pytest
 
 
@@ -107,3 +109,65 @@ async def test_send_voice_message_no_audio(client):
         data={"session_id": str(session_id)},
     )
     assert resp.status_code == 422
+
+
+def _stalling_stream(chunks, closed: dict | None = None, stall: float = 0.2):
+    """A provider stream that stalls after its first chunk, long enough for the stream to be abandoned."""
+    try:
+        for i, chunk in enumerate(chunks):
+            if i == 1:
+                time.sleep(stall)
+            yield chunk
+    finally:
+        if closed is not None:
+            closed["closed"] = True
+
+
+@pytest.mark.asyncio
+async def test_abandoned_stream_is_cancelled_and_persists_partial(client, app, run_until_abandoned):
+    from controllers import conversation
+    from helpers import metrics
+
+    session_id = await _setup_session(client)
+    closed = {}
+    app.openai_provider.generate_chat_stream.return_value = _stalling_stream(["Partial ", "answer ", "unsent"], closed)
+    before = metrics.get_value("stream_cancellations_total", route="text")
+
+    frames = conversation.stream_text_message(app.db_client, app.openai_provider, session_id, "Hi")
+    assert await run_until_abandoned(frames) == (1, 'data: {"content": "Partial "}\n\n')
+    assert closed["closed"] is True
+    assert metrics.get_value("stream_cancellations_total", route="text") == before + 1
+
+    messages = (await client.get(f"/api/v1/sessions/session-messages?session_id={session_id}")).json()
+    assert messages[-1]["role"] == "assistant"
+    assert messages[-1]["content"] == "Partial " + conversation.TRUNCATED_MARKER
+
+
+@pytest.mark.asyncio
+async def test_abandoned_voice_stream_skips_further_tts(client, app, run_until_abandoned):
+    from controllers import conversation
+
+    session_id = await _setup_session(client)
+    app.openai_provider.generate_chat_stream.return_value = _stalling_stream(["First sentence. ", "Second one. ", "Third."])
+
+    await run_until_abandoned(conversation.stream_voice_after_stt(app.db_client, app.openai_provider, session_id, "Hi"))
+    # The first sentence is complete (and synthesized) with the first chunk; nothing is synthesized after the cancellation
+    app.openai_provider.text_to_speech_stream.assert_called_once()
+    messages = (await client.get(f"/api/v1/sessions/session-messages?session_id={session_id}")).json()
+    assert messages[-1]["content"] == "First sentence. " + conversation.TRUNCATED_MARKER
+
+
+@pytest.mark.asyncio
+async def test_history_is_loaded_as_column_projections(client, app):
+    from models.MessageModel import MessageModel, HISTORY_COLUMNS
+    from models.ai_agent_platform_DB.schemes import Message
+
+    session_id = await _setup_session(client)
+    await client.post("/api/v1/sessions/send-message", json={"session_id": session_id, "content": "Hi"})
+
+    rows = await MessageModel(app.db_client).list_by_session(session_id, columns=HISTORY_COLUMNS)
+    assert not any(isinstance(row, Message) for row in rows)
+    assert [(row.role, row.content) for row in rows] == [("user", "Hi"), ("assistant", "Hello from the assistant!")]
+    # The model request is built from the projected history
+    sent = app.openai_provider.generate_chat.call_args.args[0]
+    assert sent[1:] == [{"role": "user", "content": "Hi"}]
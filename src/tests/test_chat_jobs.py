@@ -0,0 +1,142 @@
+"""
+Tests for asynchronous chat jobs (submit, poll, subscribe, failure, recovery after restart).
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from controllers.chat_jobs import ChatJobPool
+from helpers.config import get_settings
+from models.ChatJobModel import ChatJobModel, complete_job
+from models.MessageModel import MessageModel
+from models.ai_agent_platform_DB.schemes import Message
+from stores.LLM import OpenAIProvider
+
+pytestmark = pytest.mark.usefixtures("serialized_db")
+
+
+async def _setup_session(client):
+    agent = await client.post("/api/v1/agents", json={"name": "Bot", "prompt": "Be helpful."})
+    session = await client.post(f"/api/v1/agents/{agent.json()['agent_id']}/sessions")
+    return session.json()["session_id"]
+
+
+async def _wait_finished(client, pool, job_id: int) -> dict:
+    # Drain before reading: the in-memory SQLite test database has a single connection
+    await asyncio.wait_for(pool.drain(), timeout=5)
+    return (await client.get(f"/api/v1/sessions/jobs/{job_id}")).json()
+
+
+@pytest.mark.asyncio
+async def test_submit_and_poll_job(client, app):
+    session_id = await _setup_session(client)
+    resp = await client.post("/api/v1/sessions/jobs", json={"session_id": session_id, "content": "Hi"})
+    assert resp.status_code == 202
+    job_id = resp.json()["job_id"]
+    assert resp.headers["Location"].endswith(f"/jobs/{job_id}")
+
+    job = await _wait_finished(client, app.chat_job_pool, job_id)
+    assert job["status"] == "succeeded"
+    assert job["assistant_message"]["content"] == "Hello from the assistant!"
+
+    messages = (await client.get(f"/api/v1/sessions/session-messages?session_id={session_id}")).json()
+    assert [m["role"] for m in messages] == ["user", "assistant"]
+
+
+@pytest.mark.asyncio
+async def test_job_events_end_with_result(client, app):
+    session_id = await _setup_session(client)
+    job_id = (await client.post("/api/v1/sessions/jobs", json={"session_id": session_id, "content": "Hi"})).json()["job_id"]
+    await app.chat_job_pool.drain()
+    resp = await client.get(f"/api/v1/sessions/jobs/{job_id}/events")
+    assert resp.status_code == 200
+    assert "text/event-stream" in resp.headers["content-type"]
+    assert '"status": "succeeded"' in resp.text.strip().split("\n\n")[-1]
+
+
+@pytest.mark.asyncio
+async def test_failed_generation_marks_job_failed(client, app):
+    app.openai_provider.generate_chat.return_value = None
+    session_id = await _setup_session(client)
+    job_id = (await client.post("/api/v1/sessions/jobs", json={"session_id": session_id, "content": "Hi"})).json()["job_id"]
+    job = await _wait_finished(client, app.chat_job_pool, job_id)
+    assert job["status"] == "failed"
+    assert job["error"]
+    assert job["assistant_message"] is None
+
+
+@pytest.mark.asyncio
+async def test_submit_job_unknown_session_or_job(client):
+    resp = await client.post("/api/v1/sessions/jobs", json={"session_id": 9999, "content": "Hi"})
+    assert resp.status_code == 404
+    assert (await client.get("/api/v1/sessions/jobs/9999")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_queued_job_is_recovered_after_restart(client, app):
+    session_id = await _setup_session(client)
+    job_model = ChatJobModel(app.db_client)
+    # Left queued by a previous process
+    job = await job_model.create_job(session_id, "Hi")
+
+    pool = ChatJobPool(app.db_client, app.openai_provider)
+    await pool.start()
+    try:
+        finished = await _wait_finished(client, pool, job.job_id)
+    finally:
+        await pool.stop()
+    assert finished["status"] == "succeeded"
+    assert await job_model.claim(job.job_id, 3) is None  # finished jobs cannot be claimed again
+
+
+@pytest.mark.asyncio
+async def test_a_run_that_lost_its_job_stores_nothing(client, app):
+    session_id = await _setup_session(client)
+    job_model = ChatJobModel(app.db_client)
+    job = await job_model.create_job(session_id, "Hi")
+    first = await job_model.claim(job.job_id, 3)
+    # Its worker looked dead: requeued and claimed again while the first run is still generating
+    await job_model.requeue_stale(datetime.now(timezone.utc) + timedelta(seconds=1), 3)
+    second = await job_model.claim(job.job_id, 3)
+    assert (first.attempts, second.attempts) == (1, 2)
+
+    def complete(attempt):
+        return lambda db_session, message: complete_job(db_session, job.job_id, attempt, message.message_id)
+
+    reply = Message(session_id=session_id, role="assistant", content="late")
+    assert await MessageModel(app.db_client).create_message(reply, guard=complete(first.attempts)) is None
+    assert await job_model.fail(job.job_id, first.attempts, "Timed out waiting for the LLM") is False
+    assert (await job_model.get_by_id(job.job_id)).status == "running"
+
+    reply = Message(session_id=session_id, role="assistant", content="on time")
+    stored = await MessageModel(app.db_client).create_message(reply, guard=complete(second.attempts))
+    finished = await job_model.get_by_id(job.job_id)
+    assert (finished.status, finished.assistant_message_id) == ("succeeded", stored.message_id)
+    messages = (await client.get(f"/api/v1/sessions/session-messages?session_id={session_id}")).json()
+    assert [m["content"] for m in messages] == ["Hi", "on time"]
+
+
+@pytest.mark.asyncio
+async def test_job_fails_once_its_attempts_are_used_up(client, app):
+    session_id = await _setup_session(client)
+    job_model = ChatJobModel(app.db_client)
+    job = await job_model.create_job(session_id, "Hi")
+    later = datetime.now(timezone.utc) + timedelta(seconds=1)
+    # Every run's worker dies: the job is requeued until its second (last) attempt
+    assert (await job_model.claim(job.job_id, 2)).attempts == 1
+    assert await job_model.fail_exhausted(later, 2) == 0
+    assert await job_model.requeue_stale(later, 2) == [job.job_id]
+    assert (await job_model.claim(job.job_id, 2)).attempts == 2
+    assert await job_model.fail_exhausted(later, 2) == 1
+    assert await job_model.requeue_stale(later, 2) == []
+
+    failed = (await client.get(f"/api/v1/sessions/jobs/{job.job_id}")).json()
+    assert (failed["status"], failed["error"]) == ("failed", "Gave up after 2 attempts")
+    assert await job_model.claim(job.job_id, 2) is None
+
+
+def test_provider_requests_time_out_before_the_job():
+    provider = OpenAIProvider(api_key="test", request_timeout=get_settings().OPENAI_REQUEST_TIMEOUT_SECONDS)
+    assert provider.client.timeout == get_settings().OPENAI_REQUEST_TIMEOUT_SECONDS
+    assert provider.client.timeout * (provider.client.max_retries + 1) < get_settings().CHAT_JOB_TIMEOUT_SECONDS
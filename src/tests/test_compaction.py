@@ -0,0 +1,92 @@
+"""
+Tests for background conversation compaction: summary storage, history building, resumability.
+"""
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import select, update
+
+from controllers.compaction import CompactionWorker
+from helpers.config import get_settings
+from models.SessionModel import SessionModel
+from models.ai_agent_platform_DB.schemes import Session
+
+
+async def _session_with_turns(client, turns: int) -> int:
+    agent = await client.post("/api/v1/agents", json={"name": "Long", "prompt": "You are helpful."})
+    session = await client.post(f"/api/v1/agents/{agent.json()['agent_id']}/sessions")
+    session_id = session.json()["session_id"]
+    for i in range(turns):
+        await client.post("/api/v1/sessions/send-message", json={"session_id": session_id, "content": f"question {i} " * 20})
+    return session_id
+
+
+def _worker(app, **overrides):
+    settings = get_settings().model_copy(update={
+        "COMPACTION_MAX_MESSAGES": 4,
+        "COMPACTION_KEEP_RECENT_MESSAGES": 2,
+        "COMPACTION_REQUESTS_PER_MINUTE": 6000,
+        **overrides,
+    })
+    return CompactionWorker(app.db_client, app.openai_provider, settings)
+
+
+@pytest.mark.asyncio
+async def test_compaction_summarizes_older_turns(client, app):
+    session_id = await _session_with_turns(client, 3)  # 6 messages
+    app.openai_provider.generate_chat.return_value = "short summary"
+
+    results = await _worker(app).run_once()
+
+    assert results == [{"session_id": session_id, "compacted_messages": 4, "tokens_saved": results[0]["tokens_saved"]}]
+    assert results[0]["tokens_saved"] > 0
+    session = await SessionModel(app.db_client).get_by_id(session_id)
+    assert session.compacted_message_count == 4
+    assert session.compaction_tokens_saved == results[0]["tokens_saved"]
+
+
+@pytest.mark.asyncio
+async def test_history_uses_summary_plus_recent_turns(client, app):
+    session_id = await _session_with_turns(client, 3)
+    app.openai_provider.generate_chat.return_value = "short summary"
+    await _worker(app).run_once()
+
+    await client.post("/api/v1/sessions/send-message", json={"session_id": session_id, "content": "next"})
+    sent = app.openai_provider.generate_chat.call_args[0][0]
+    assert sent[1]["role"] == "system"
+    assert "short summary" in sent[1]["content"]
+    # summary + 2 kept raw messages + new user message
+    assert len(sent) == 1 + 1 + 2 + 1
+
+    ui_messages = (await client.get(f"/api/v1/sessions/session-messages?session_id={session_id}")).json()
+    assert len(ui_messages) == 8
+    assert all(m["role"] != "summary" for m in ui_messages)
+
+
+@pytest.mark.asyncio
+async def test_compaction_keeps_the_session_activity_time(client, app):
+    session_id = await _session_with_turns(client, 3)
+    last_active = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    async with app.db_client() as db_session:
+        await db_session.execute(update(Session).where(Session.session_id == session_id).values(updated_at=last_active))
+        await db_session.commit()
+
+    assert len(await _worker(app).run_once()) == 1
+    async with app.db_client() as db_session:
+        session = (await db_session.execute(select(Session).where(Session.session_id == session_id))).scalar_one()
+    assert session.compacted_message_count == 4
+    assert session.updated_at.replace(tzinfo=timezone.utc) == last_active
+
+
+@pytest.mark.asyncio
+async def test_compaction_is_idempotent_between_passes(client, app):
+    await _session_with_turns(client, 3)
+    worker = _worker(app)
+    assert len(await worker.run_once()) == 1
+    assert await worker.run_once() == []
+
+
+@pytest.mark.asyncio
+async def test_short_sessions_are_not_compacted(client, app):
+    await _session_with_turns(client, 1)
+    assert await _worker(app).run_once() == []
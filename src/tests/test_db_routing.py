@@ -0,0 +1,90 @@
+"""
+Tests for read-replica routing: replica reads, read-your-writes stickiness, fallback to the primary.
+
+The "replica" is a second, empty in-memory database, so a read that reaches it sees no rows.
+"""
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from helpers.db_routing import RoutingSessionFactory
+from models.AgentModel import AgentModel
+from models.MessageModel import MessageModel
+from models.ai_agent_platform_DB.schemes import SQLAlchemyBase, Agent, Message
+
+
+@pytest_asyncio.fixture()
+async def replica_factory():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLAlchemyBase.metadata.create_all)
+    yield sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_without_replicas_reads_use_the_primary(db_session_factory):
+    router = RoutingSessionFactory(db_session_factory)
+    await AgentModel(router).create_agent(Agent(name="A", prompt="p"))
+    router.sticky_seconds = 0
+    assert [a.name for a in await AgentModel(router).list_all()] == ["A"]
+
+
+@pytest.mark.asyncio
+async def test_reads_go_to_replica_once_stickiness_expires(db_session_factory, replica_factory):
+    router = RoutingSessionFactory(db_session_factory, [replica_factory], sticky_seconds=60)
+    model = AgentModel(router)
+    await model.create_agent(Agent(name="A", prompt="p"))
+
+    assert router.is_sticky(("agents",))
+    assert [a.name for a in await model.list_all()] == ["A"]  # just written: primary
+
+    router._sticky_until.clear()
+    assert await model.list_all() == []  # replica (empty here)
+
+
+@pytest.mark.asyncio
+async def test_stickiness_is_per_key_and_skipped_on_rollback(db_session_factory, replica_factory):
+    router = RoutingSessionFactory(db_session_factory, [replica_factory], sticky_seconds=60)
+    async with router() as db_session:
+        async with db_session.begin():
+            db_session.add(Agent(name="A", prompt="p"))
+        agent_id = (await db_session.execute(Agent.__table__.select())).first().agent_id
+    assert router.is_sticky(("agent_id", agent_id))
+    assert not router.is_sticky(("agent_id", agent_id + 1))
+    assert not router.is_sticky(("session_id", 1))
+
+    router._sticky_until.clear()
+    async with router() as db_session:
+        db_session.add(Agent(name="B", prompt="p"))
+        await db_session.flush()
+        await db_session.rollback()
+    assert not router.is_sticky(("agents",))
+
+
+@pytest.mark.asyncio
+async def test_history_right_after_a_message_reads_from_primary(client, app, replica_factory):
+    app.db_client = RoutingSessionFactory(app.db_client, [replica_factory], sticky_seconds=60)
+    agent_id = (await client.post("/api/v1/agents", json={"name": "A", "prompt": "p"})).json()["agent_id"]
+    session_id = (await client.post(f"/api/v1/agents/{agent_id}/sessions")).json()["session_id"]
+    await client.post("/api/v1/sessions/send-message", json={"session_id": session_id, "content": "hi"})
+
+    response = await client.get(f"/api/v1/sessions/session-messages?session_id={session_id}")
+    assert [m["content"] for m in response.json()] == ["hi", "Hello from the assistant!"]
+    sessions = (await client.get(f"/api/v1/agents/{agent_id}/sessions")).json()
+    assert [s["session_id"] for s in sessions] == [session_id]
+
+
+@pytest.mark.asyncio
+async def test_a_new_message_makes_the_agents_session_listing_sticky(client, app, replica_factory):
+    router = RoutingSessionFactory(app.db_client, [replica_factory], sticky_seconds=60)
+    app.db_client = router
+    agent_id = (await client.post("/api/v1/agents", json={"name": "A", "prompt": "p"})).json()["agent_id"]
+    session_id = (await client.post(f"/api/v1/agents/{agent_id}/sessions")).json()["session_id"]
+    router._sticky_until.clear()
+
+    await MessageModel(router).create_message(Message(session_id=session_id, role="user", content="hi"))
+    assert router.is_sticky(("agent_id", agent_id))
+    sessions = (await client.get(f"/api/v1/agents/{agent_id}/sessions")).json()
+    assert [s["session_id"] for s in sessions] == [session_id]
@@ -0,0 +1,160 @@
+"""
+Tests for the event loop stall monitor and the on-demand request profiler.
+"""
+import asyncio
+import logging
+import time
+
+import pytest
+
+from controllers import conversation
+from helpers import metrics
+from helpers.config import get_settings
+from helpers.admission import AdmissionController
+from helpers.loop_monitor import LoopLagSampler, LoopStallMonitor
+from helpers.request_profiler import RequestProfiler, WAITING_FRAME
+
+TOKEN = "s3cret"
+
+
+async def _session(client) -> int:
+    agent_id = (await client.post("/api/v1/agents", json={"name": "A", "prompt": "p"})).json()["agent_id"]
+    return (await client.post(f"/api/v1/agents/{agent_id}/sessions")).json()["session_id"]
+
+
+def _profiler(**overrides) -> RequestProfiler:
+    settings = {"PROFILER_ADMIN_TOKEN": TOKEN, "PROFILER_SAMPLE_MS": 1, **overrides}
+    return RequestProfiler(get_settings().model_copy(update=settings))
+
+
+async def _profile(client, profile_id: str) -> str:
+    response = await client.get(f"/api/v1/debug/profiles/{profile_id}", headers={"X-Admin-Token": TOKEN})
+    assert response.status_code == 200
+    return response.text
+
+
+def _block_the_loop():
+    time.sleep(0.3)
+
+
+@pytest.mark.asyncio
+async def test_stall_monitor_logs_the_blocking_stack(caplog):
+    monitor = LoopStallMonitor(get_settings().model_copy(update={"LOOP_MONITOR_THRESHOLD_MS": 50}))
+    before = metrics.get_value("event_loop_stalls_total")
+    monitor.start()
+    try:
+        with caplog.at_level(logging.WARNING, logger="helpers.loop_monitor"):
+            await asyncio.sleep(0.05)
+            _block_the_loop()
+            await asyncio.sleep(0.05)
+    finally:
+        await monitor.stop()
+
+    stacks = [r.getMessage() for r in caplog.records if "loop thread stack" in r.getMessage()]
+    assert len(stacks) == 1  # once per stall, not once per watchdog tick
+    assert "_block_the_loop" in stacks[0] and "test_stall_monitor_logs_the_blocking_stack" in stacks[0]
+    assert any("was blocked for" in r.getMessage() for r in caplog.records)
+    assert metrics.get_value("event_loop_stalls_total") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_admission_and_stall_monitor_share_one_heartbeat():
+    settings = get_settings().model_copy(update={"LOOP_MONITOR_THRESHOLD_MS": 50})
+    sampler = LoopLagSampler(0.01)
+    admission = AdmissionController(settings, queue_depth=lambda: 0, sampler=sampler)
+    monitor = LoopStallMonitor(settings, sampler=sampler)
+    before = metrics.get_value("event_loop_stalls_total")
+    sampler.start()
+    monitor.start()
+    try:
+        await asyncio.sleep(0.03)
+        _block_the_loop()
+        await asyncio.sleep(0.03)
+        heartbeats = [t for t in asyncio.all_tasks() if "loop" in t.get_name()]
+        assert [t.get_name() for t in heartbeats] == ["loop-lag-heartbeat"]
+        assert admission.loop_lag_seconds > 0.1
+        assert metrics.get_value("event_loop_stalls_total") == before + 1
+    finally:
+        started = time.perf_counter()
+        await monitor.stop()
+        await sampler.stop()
+        assert time.perf_counter() - started < 0.05  # no thread joins on the loop
+
+
+@pytest.mark.asyncio
+async def test_profiled_request_returns_folded_stacks(client, app, monkeypatch):
+    app.request_profiler = _profiler()
+    session_id = await _session(client)
+    build = conversation._build_openai_messages
+
+    def slow_build(*args, **kwargs):
+        time.sleep(0.05)  # blocks the event loop
+        return build(*args, **kwargs)
+
+    def slow_generate_chat(messages, **kwargs):
+        time.sleep(0.05)  # in a worker thread: the request waits
+        return "Hello from the assistant!"
+
+    monkeypatch.setattr(conversation, "_build_openai_messages", slow_build)
+    app.openai_provider.generate_chat.side_effect = slow_generate_chat
+
+    response = await client.post(
+        "/api/v1/sessions/send-message", json={"session_id": session_id, "content": "hi"}, headers={"X-Profile": TOKEN}
+    )
+    assert response.status_code == 200
+    folded = await _profile(client, response.headers["X-Profile-Id"])
+
+    lines = folded.splitlines()
+    assert all(line.startswith("POST /api/v1/sessions/send-message;") for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    on_loop = [line for line in lines if "test_diagnostics.py:slow_build" in line]
+    waiting = [line for line in lines if "controllers/conversation.py:reply_to_message" in line and WAITING_FRAME in line]
+    assert on_loop and not any(WAITING_FRAME in line for line in on_loop)
+    assert "controllers/conversation.py:reply_to_message" in on_loop[0]
+    assert waiting
+
+
+@pytest.mark.asyncio
+async def test_profiler_follows_stream_tasks(client, app):
+    app.request_profiler = _profiler()
+    session_id = await _session(client)
+
+    def slow_stream(messages, **kwargs):
+        for chunk in ("Hello ", "there."):
+            time.sleep(0.03)
+            yield chunk
+
+    app.openai_provider.generate_chat_stream.side_effect = slow_stream
+    response = await client.post(
+        "/api/v1/sessions/stream-message", json={"session_id": session_id, "content": "hi"}, headers={"X-Profile": TOKEN}
+    )
+    assert '"done": true' in response.text
+    folded = await _profile(client, response.headers["X-Profile-Id"])
+    # The generation runs in a task created during the request, inside the conversation async generator
+    assert "controllers/conversation.py:stream_text_message" in folded
+
+
+@pytest.mark.asyncio
+async def test_profiling_needs_the_admin_token(client, app):
+    session_id = await _session(client)
+    body = {"session_id": session_id, "content": "hi"}
+
+    # No token configured: the header is ignored
+    response = await client.post("/api/v1/sessions/send-message", json=body, headers={"X-Profile": "anything"})
+    assert response.status_code == 200 and "X-Profile-Id" not in response.headers
+
+    app.request_profiler = _profiler()
+    response = await client.post("/api/v1/sessions/send-message", json=body, headers={"X-Profile": "wrong"})
+    assert response.status_code == 403
+    app.openai_provider.generate_chat.assert_called_once()
+
+    profile_id = (await client.get("/api/v1/agents", headers={"X-Profile": TOKEN})).headers["X-Profile-Id"]
+    assert (await client.get(f"/api/v1/debug/profiles/{profile_id}")).status_code == 403
+    assert (await client.get("/api/v1/debug/profiles/nope", headers={"X-Admin-Token": TOKEN})).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_only_recent_profiles_are_kept(client, app):
+    app.request_profiler = _profiler(PROFILER_MAX_PROFILES=2)
+    ids = [(await client.get("/api/v1/agents", headers={"X-Profile": TOKEN})).headers["X-Profile-Id"] for _ in range(3)]
+    assert list(app.request_profiler.profiles) == ids[1:]
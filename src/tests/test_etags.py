@@ -0,0 +1,101 @@
+"""
+Tests for conditional GETs: ETags from agent/session versions, 304 before rows are loaded, invalidation on writes.
+"""
+import pytest
+
+from models.AgentModel import AgentModel
+from models.MessageModel import MessageModel
+from models.SessionModel import SessionModel
+
+
+async def _session(client) -> tuple[int, int]:
+    agent_id = (await client.post("/api/v1/agents", json={"name": "A", "prompt": "p"})).json()["agent_id"]
+    session_id = (await client.post(f"/api/v1/agents/{agent_id}/sessions")).json()["session_id"]
+    return agent_id, session_id
+
+
+async def _revalidate(client, url: str, etag: str):
+    return await client.get(url, headers={"If-None-Match": etag})
+
+
+def _fail(*args, **kwargs):
+    raise AssertionError("rows loaded for a 304")
+
+
+@pytest.mark.asyncio
+async def test_agent_list_revalidates_until_an_agent_changes(client, monkeypatch):
+    agent_id, _ = await _session(client)
+    first = await client.get("/api/v1/agents")
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "no-cache"
+
+    with monkeypatch.context() as m:
+        m.setattr(AgentModel, "list_all", _fail)
+        not_modified = await _revalidate(client, "/api/v1/agents", etag)
+    assert not_modified.status_code == 304 and not_modified.content == b""
+    assert not_modified.headers["ETag"] == etag
+
+    await client.put(f"/api/v1/agents/{agent_id}", json={"name": "renamed"})
+    updated = await _revalidate(client, "/api/v1/agents", etag)
+    assert updated.status_code == 200 and updated.json()[0]["name"] == "renamed"
+
+    etag = updated.headers["ETag"]
+    other = (await client.post("/api/v1/agents", json={"name": "B", "prompt": "p"})).json()["agent_id"]
+    etag_with_b = (await _revalidate(client, "/api/v1/agents", etag)).headers["ETag"]
+    assert etag_with_b != etag
+    await client.delete(f"/api/v1/agents/{other}")
+    assert (await _revalidate(client, "/api/v1/agents", etag_with_b)).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_message_history_revalidates_until_a_message_is_added(client, monkeypatch):
+    _, session_id = await _session(client)
+    url = f"/api/v1/sessions/session-messages?session_id={session_id}"
+    await client.post("/api/v1/sessions/send-message", json={"session_id": session_id, "content": "hi"})
+    etag = (await client.get(url)).headers["ETag"]
+
+    with monkeypatch.context() as m:
+        m.setattr(MessageModel, "list_by_session", _fail)
+        assert (await _revalidate(client, url, etag)).status_code == 304
+
+    await client.post("/api/v1/sessions/send-message", json={"session_id": session_id, "content": "again"})
+    response = await _revalidate(client, url, etag)
+    assert response.status_code == 200 and len(response.json()) == 4
+    assert response.headers["ETag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_session_listings_change_with_messages_and_deletes(client, monkeypatch):
+    agent_id, session_id = await _session(client)
+    plain_url = f"/api/v1/agents/{agent_id}/sessions"
+    stats_url = f"{plain_url}?include_stats=true"
+    plain = (await client.get(plain_url)).headers["ETag"]
+    stats = (await client.get(stats_url)).headers["ETag"]
+    assert plain != stats
+
+    with monkeypatch.context() as m:
+        m.setattr(SessionModel, "list_by_agent_with_stats", _fail)
+        assert (await _revalidate(client, stats_url, stats)).status_code == 304
+
+    await client.post("/api/v1/sessions/send-message", json={"session_id": session_id, "content": "hi"})
+    response = await _revalidate(client, stats_url, stats)
+    assert response.status_code == 200 and response.json()[0]["message_count"] == 2
+
+    stats = response.headers["ETag"]
+    await client.delete(f"/api/v1/agents/sessions/{session_id}")
+    assert (await _revalidate(client, stats_url, stats)).json() == []
+
+
+@pytest.mark.asyncio
+async def test_single_session_and_if_none_match_forms(client):
+    _, session_id = await _session(client)
+    url = f"/api/v1/agents/sessions/{session_id}"
+    etag = (await client.get(url)).headers["ETag"]
+
+    assert (await _revalidate(client, url, f'"other", W/{etag}')).status_code == 304
+    assert (await _revalidate(client, url, "*")).status_code == 304
+    assert (await _revalidate(client, url, '"other"')).status_code == 200
+
+    await client.post("/api/v1/sessions/send-message", json={"session_id": session_id, "content": "hi"})
+    response = await _revalidate(client, url, etag)
+    assert response.status_code == 200 and response.json()["session_id"] == session_id
@@ -0,0 +1,98 @@
+"""
+Tests for the fan-out endpoint: one message to several sessions/agents, concurrent generation, tagged SSE events.
+"""
+import json
+import time
+
+import pytest
+
+URL = "/api/v1/sessions/fan-out-message"
+
+
+pytestmark = pytest.mark.usefixtures("serialized_db")
+
+
+async def _agent(client, prompt: str) -> int:
+    return (await client.post("/api/v1/agents", json={"name": prompt, "prompt": prompt})).json()["agent_id"]
+
+
+async def _session(client, agent_id: int) -> int:
+    return (await client.post(f"/api/v1/agents/{agent_id}/sessions")).json()["session_id"]
+
+
+def _events(response) -> list[dict]:
+    return [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+
+
+def _stream_per_agent(delay: float = 0.0, fail_prompt: str | None = None):
+    def generate_chat_stream(messages, **kwargs):
+        prompt = messages[0]["content"]
+        if prompt == fail_prompt:
+            raise RuntimeError("provider exploded")
+        for word in ("Reply ", "from ", prompt):
+            time.sleep(delay)
+            yield word
+    return generate_chat_stream
+
+
+@pytest.mark.asyncio
+async def test_fan_out_streams_tagged_replies_into_each_session(client, app):
+    agent_a, agent_b, agent_c = [await _agent(client, p) for p in ("alpha", "beta", "gamma")]
+    session_a, session_b = await _session(client, agent_a), await _session(client, agent_b)
+    app.openai_provider.generate_chat_stream.side_effect = _stream_per_agent()
+
+    response = await client.post(URL, json={"content": "Which is best?", "session_ids": [session_a, session_b], "agent_ids": [agent_c]})
+    assert response.status_code == 200 and response.headers["X-Stream-Id"]
+    events = _events(response)
+
+    started = events[0]["sessions"]
+    assert [s["agent_id"] for s in started] == [agent_a, agent_b, agent_c]
+    assert events[-1] == {"done": True}
+    by_session = {s["session_id"]: s["agent_id"] for s in started}
+    for session_id, agent_id in by_session.items():
+        own = [e for e in events[1:-1] if e["session_id"] == session_id]
+        assert all(e["agent_id"] == agent_id for e in own)
+        assert own[-1]["done"] is True
+        reply = "".join(e.get("content", "") for e in own)
+        messages = (await client.get(f"/api/v1/sessions/session-messages?session_id={session_id}")).json()
+        assert [(m["role"], m["content"]) for m in messages] == [("user", "Which is best?"), ("assistant", reply)]
+    new_session = started[2]["session_id"]
+    assert new_session not in (session_a, session_b)
+    assert (await client.get(f"/api/v1/agents/{agent_c}/sessions")).json()[0]["session_id"] == new_session
+
+
+@pytest.mark.asyncio
+async def test_fan_out_takes_as_long_as_the_slowest_agent(client, app):
+    agents = [await _agent(client, p) for p in ("alpha", "beta", "gamma")]
+    app.openai_provider.generate_chat_stream.side_effect = _stream_per_agent(delay=0.1)
+
+    started = time.perf_counter()
+    response = await client.post(URL, json={"content": "hi", "agent_ids": agents})
+    elapsed = time.perf_counter() - started
+    assert elapsed < 0.6  # three 0.3 s generations overlap
+    assert sum(1 for e in _events(response) if e.get("done") and "agent_id" in e) == 3
+
+
+@pytest.mark.asyncio
+async def test_one_failing_agent_does_not_stop_the_others(client, app):
+    ok_agent, failing_agent = await _agent(client, "alpha"), await _agent(client, "broken")
+    app.openai_provider.generate_chat_stream.side_effect = _stream_per_agent(fail_prompt="broken")
+
+    events = _events(await client.post(URL, json={"content": "hi", "agent_ids": [ok_agent, failing_agent]}))
+    outcome = {e["agent_id"]: e for e in events if "agent_id" in e and ("done" in e or "error" in e)}
+    assert outcome[ok_agent]["done"] is True
+    assert outcome[failing_agent]["error"] == "Generation failed"
+    assert events[-1] == {"done": True}
+
+
+@pytest.mark.asyncio
+async def test_fan_out_validates_targets_before_streaming(client, app):
+    agent_id = await _agent(client, "alpha")
+    assert (await client.post(URL, json={"content": "hi"})).status_code == 400
+    too_many = await client.post(URL, json={"content": "hi", "agent_ids": [agent_id] * 11})
+    assert too_many.status_code == 400
+
+    missing = await client.post(URL, json={"content": "hi", "agent_ids": [agent_id, 999], "session_ids": [998]})
+    assert missing.status_code == 404 and missing.json()["detail"] == "Not found: session 998, agent 999"
+    assert (await client.get(f"/api/v1/agents/{agent_id}/sessions")).json() == []
+    app.openai_provider.generate_chat_stream.assert_not_called()
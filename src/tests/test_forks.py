@@ -0,0 +1,141 @@
+"""
+Tests for copy-on-write session forks: inherited history through the parent chain, no copied rows, purge order.
+"""
+import pytest
+from sqlalchemy import select, func
+
+from controllers.compaction import CompactionWorker
+from controllers.purge import PurgeWorker
+from helpers.config import get_settings
+from models.ai_agent_platform_DB.schemes import Session, Message
+
+
+async def _session_with_turns(client, turns: int) -> tuple[int, int]:
+    agent_id = (await client.post("/api/v1/agents", json={"name": "A", "prompt": "p"})).json()["agent_id"]
+    session_id = (await client.post(f"/api/v1/agents/{agent_id}/sessions")).json()["session_id"]
+    for i in range(turns):
+        await _send(client, session_id, f"question {i}")
+    return agent_id, session_id
+
+
+async def _send(client, session_id: int, content: str) -> None:
+    await client.post("/api/v1/sessions/send-message", json={"session_id": session_id, "content": content})
+
+
+async def _history(client, session_id: int) -> list[tuple[int, str]]:
+    messages = (await client.get(f"/api/v1/sessions/session-messages?session_id={session_id}")).json()
+    return [(m["message_id"], m["content"]) for m in messages]
+
+
+async def _fork(client, session_id: int, message_id: int | None = None):
+    body = {"message_id": message_id} if message_id is not None else None
+    return await client.post(f"/api/v1/agents/sessions/{session_id}/fork", json=body)
+
+
+async def _count(app, entity) -> int:
+    async with app.db_client() as db_session:
+        return (await db_session.execute(select(func.count()).select_from(entity))).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_fork_shares_history_and_diverges(client, app):
+    agent_id, parent_id = await _session_with_turns(client, 2)
+    parent_history = await _history(client, parent_id)
+    messages_before = await _count(app, Message)
+
+    response = await _fork(client, parent_id)
+    assert response.status_code == 200
+    fork = response.json()
+    assert (fork["agent_id"], fork["parent_session_id"], fork["fork_message_id"]) == (agent_id, parent_id, parent_history[-1][0])
+    assert await _count(app, Message) == messages_before  # nothing copied
+    assert await _history(client, fork["session_id"]) == parent_history
+
+    await _send(client, fork["session_id"], "only in the fork")
+    sent = app.openai_provider.generate_chat.call_args[0][0]
+    assert [m["content"] for m in sent[1:]] == [c for _, c in parent_history] + ["only in the fork"]
+    await _send(client, parent_id, "only in the parent")
+
+    fork_history = await _history(client, fork["session_id"])
+    assert fork_history[:4] == parent_history and fork_history[4][1] == "only in the fork"
+    assert [c for _, c in await _history(client, parent_id)][4] == "only in the parent"
+
+    stats = {s["session_id"]: s for s in (await client.get(f"/api/v1/agents/{agent_id}/sessions?include_stats=true")).json()}
+    assert stats[fork["session_id"]]["message_count"] == 6
+
+
+@pytest.mark.asyncio
+async def test_fork_at_an_earlier_message_and_forks_of_forks(client, app):
+    agent_id, root_id = await _session_with_turns(client, 3)
+    root = await _history(client, root_id)
+
+    first = (await _fork(client, root_id, root[1][0])).json()
+    assert await _history(client, first["session_id"]) == root[:2]
+    await _send(client, first["session_id"], "branch one")
+    first_history = await _history(client, first["session_id"])
+
+    # At one of its own messages: a chain of three sessions
+    second = (await _fork(client, first["session_id"], first_history[2][0])).json()
+    assert second["parent_session_id"] == first["session_id"]
+    await _send(client, second["session_id"], "branch two")
+    assert [c for _, c in await _history(client, second["session_id"])] == [
+        root[0][1], root[1][1], "branch one", "branch two", "Hello from the assistant!",
+    ]
+
+    # At an inherited message: hangs off the session that owns it
+    third = (await _fork(client, second["session_id"], root[0][0])).json()
+    assert third["parent_session_id"] == root_id
+    assert await _history(client, third["session_id"]) == root[:1]
+
+    stats = {s["session_id"]: s["message_count"] for s in (await client.get(f"/api/v1/agents/{agent_id}/sessions?include_stats=true")).json()}
+    assert (stats[first["session_id"]], stats[second["session_id"]], stats[third["session_id"]]) == (4, 5, 1)
+
+
+@pytest.mark.asyncio
+async def test_fork_validation(client, app):
+    _, session_id = await _session_with_turns(client, 1)
+    _, other_id = await _session_with_turns(client, 1)
+    other_message = (await _history(client, other_id))[0][0]
+    empty_id = (await client.post(f"/api/v1/agents/{(await client.get('/api/v1/agents')).json()[0]['agent_id']}/sessions")).json()["session_id"]
+
+    assert (await _fork(client, 999)).status_code == 404
+    assert (await _fork(client, empty_id)).status_code == 400
+    missing = await _fork(client, session_id, other_message)
+    assert missing.status_code == 404 and missing.json()["detail"] == "Message not found in the session's history"
+
+
+@pytest.mark.asyncio
+async def test_forks_compact_their_inherited_history(client, app):
+    _, parent_id = await _session_with_turns(client, 3)
+    fork_id = (await _fork(client, parent_id)).json()["session_id"]
+    app.openai_provider.generate_chat.return_value = "short summary"
+    settings = get_settings().model_copy(update={
+        "COMPACTION_MAX_MESSAGES": 4, "COMPACTION_KEEP_RECENT_MESSAGES": 2, "COMPACTION_REQUESTS_PER_MINUTE": 6000,
+    })
+    worker = CompactionWorker(app.db_client, app.openai_provider, settings)
+    async with app.db_client() as db_session:
+        fork = (await db_session.execute(select(Session).where(Session.session_id == fork_id))).scalar_one()
+
+    result = await worker.compact_session(fork)
+    assert result == {"session_id": fork_id, "compacted_messages": 4, "tokens_saved": result["tokens_saved"]}
+    summarized = app.openai_provider.generate_chat.call_args[0][0][1]["content"]
+    assert "question 0" in summarized and "question 1" in summarized
+
+
+@pytest.mark.asyncio
+async def test_parents_are_purged_after_their_forks(client, app):
+    _, parent_id = await _session_with_turns(client, 2)
+    fork_id = (await _fork(client, parent_id)).json()["session_id"]
+    await _send(client, fork_id, "in the fork")
+    fork_history = await _history(client, fork_id)
+    worker = PurgeWorker(app.db_client, get_settings())
+
+    await client.delete(f"/api/v1/agents/sessions/{parent_id}")
+    await worker.run_once()
+    assert await _history(client, fork_id) == fork_history
+    assert await _count(app, Session) == 2 and await _count(app, Message) == 6
+
+    await client.delete(f"/api/v1/agents/sessions/{fork_id}")
+    await worker.run_once()  # the fork, then its parent on the next pass
+    assert await _count(app, Session) == 1
+    await worker.run_once()
+    assert await _count(app, Session) == 0 and await _count(app, Message) == 0
@@ -0,0 +1,127 @@
+"""
+Tests for the agent knowledge base: ingest, list, delete, retrieval into the system prompt, streaming chunker.
+"""
+from unittest.mock import patch
+
+import pytest
+
+from controllers.conversation import _build_openai_messages
+from controllers.knowledge import ingest_document
+from helpers.config import get_settings
+from models.KnowledgeModel import KnowledgeModel
+from helpers.text_chunker import iter_chunks
+
+
+async def _create_agent(client):
+    resp = await client.post("/api/v1/agents", json={"name": "KB", "prompt": "You are a support bot."})
+    return resp.json()["agent_id"]
+
+
+async def _pieces(*parts):
+    for p in parts:
+        yield p
+
+
+@pytest.mark.asyncio
+async def test_upload_and_list_document(client):
+    agent_id = await _create_agent(client)
+    text = " ".join(f"word{i}" for i in range(450))
+    resp = await client.post(
+        f"/api/v1/agents/{agent_id}/knowledge",
+        files={"file": ("manual.txt", text.encode(), "text/plain")},
+    )
+    assert resp.status_code == 200
+    assert resp.json()["document_name"] == "manual.txt"
+    assert resp.json()["chunks"] == 3
+
+    docs = (await client.get(f"/api/v1/agents/{agent_id}/knowledge")).json()
+    assert docs == [{"document_name": "manual.txt", "chunk_count": 3, "token_count": resp.json()["tokens"]}]
+
+
+@pytest.mark.asyncio
+async def test_reupload_replaces_document(client):
+    agent_id = await _create_agent(client)
+    for _ in range(2):
+        await client.post(
+            f"/api/v1/agents/{agent_id}/knowledge",
+            files={"file": ("faq.txt", b"short answer", "text/plain")},
+        )
+    docs = (await client.get(f"/api/v1/agents/{agent_id}/knowledge")).json()
+    assert docs[0]["chunk_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_reupload_keeps_the_previous_version(client, app):
+    agent_id = await _create_agent(client)
+    embedder = app.embedding_provider
+    words = " ".join(f"word{i}" for i in range(450))
+    await ingest_document(app.db_client, embedder, agent_id, "faq.txt", _pieces("old answer"))
+
+    class FailsOnSecondBatch:
+        def __init__(self):
+            self.calls = 0
+
+        def embed_texts(self, texts):
+            self.calls += 1
+            if self.calls > 1:
+                raise RuntimeError("embedding service down")
+            return embedder.embed_texts(texts)
+
+    settings = get_settings().model_copy(update={"EMBEDDING_BATCH_SIZE": 1, "EMBEDDING_MAX_CONCURRENCY": 1})
+    with patch("controllers.knowledge.get_settings", return_value=settings), pytest.raises(RuntimeError):
+        await ingest_document(app.db_client, FailsOnSecondBatch(), agent_id, "faq.txt", _pieces(words))
+    chunks = await KnowledgeModel(app.db_client).search_similar(agent_id, embedder.embed_text("answer"), top_k=10)
+    assert [c.content for c in chunks] == ["old answer"]
+
+    await ingest_document(app.db_client, embedder, agent_id, "faq.txt", _pieces("new answer"))
+    chunks = await KnowledgeModel(app.db_client).search_similar(agent_id, embedder.embed_text("answer"), top_k=10)
+    assert [c.content for c in chunks] == ["new answer"]
+
+
+@pytest.mark.asyncio
+async def test_upload_unknown_agent(client):
+    resp = await client.post(
+        "/api/v1/agents/99999/knowledge",
+        files={"file": ("x.txt", b"text", "text/plain")},
+    )
+    assert resp.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_delete_document(client):
+    agent_id = await _create_agent(client)
+    await client.post(
+        f"/api/v1/agents/{agent_id}/knowledge",
+        files={"file": ("faq.txt", b"refund policy is thirty days", "text/plain")},
+    )
+    assert (await client.delete(f"/api/v1/agents/{agent_id}/knowledge/faq.txt")).status_code == 200
+    assert (await client.delete(f"/api/v1/agents/{agent_id}/knowledge/faq.txt")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_retrieved_knowledge_is_injected(client, app):
+    agent_id = await _create_agent(client)
+    await client.post(
+        f"/api/v1/agents/{agent_id}/knowledge",
+        files={"file": ("policy.txt", b"The refund window is thirty days from delivery.", "text/plain")},
+    )
+    session_id = (await client.post(f"/api/v1/agents/{agent_id}/sessions")).json()["session_id"]
+    await client.post(
+        "/api/v1/sessions/send-message",
+        json={"session_id": session_id, "content": "What is the refund window?"},
+    )
+    sent = app.openai_provider.generate_chat.call_args[0][0]
+    assert sent[0]["role"] == "system"
+    assert "thirty days" in sent[0]["content"]
+
+
+def test_knowledge_respects_token_budget():
+    messages = _build_openai_messages("prompt", [], ["a" * 40, "b" * 40], knowledge_token_budget=15)
+    assert "a" * 40 in messages[0]["content"]
+    assert "b" * 40 not in messages[0]["content"]
+
+
+@pytest.mark.asyncio
+async def test_chunker_handles_words_split_across_pieces():
+    chunks = [c async for c in iter_chunks(_pieces("alpha be", "ta gamma delta"), chunk_words=2, overlap_words=1)]
+    assert chunks == ["alpha beta", "beta gamma", "gamma delta"]
@@ -0,0 +1,102 @@
+"""
+Tests for soft delete (agents, sessions) and the batched purge worker.
+"""
+import pytest
+from sqlalchemy import select, func
+
+from controllers.purge import PurgeWorker
+from helpers.config import get_settings
+from models.PurgeModel import PurgeModel
+from models.ai_agent_platform_DB.schemes import Agent, Session, Message, KnowledgeChunk
+
+
+async def _agent_with_history(client, turns: int = 3):
+    agent_id = (await client.post("/api/v1/agents", json={"name": "A", "prompt": "p"})).json()["agent_id"]
+    await client.post(
+        f"/api/v1/agents/{agent_id}/knowledge",
+        files={"file": ("faq.txt", " ".join(f"word{i}" for i in range(450)).encode(), "text/plain")},
+    )
+    session_id = (await client.post(f"/api/v1/agents/{agent_id}/sessions")).json()["session_id"]
+    for i in range(turns):
+        await client.post("/api/v1/sessions/send-message", json={"session_id": session_id, "content": f"hi {i}"})
+    return agent_id, session_id
+
+
+async def _count(app, entity) -> int:
+    async with app.db_client() as db_session:
+        return (await db_session.execute(select(func.count()).select_from(entity))).scalar_one()
+
+
+def _worker(app, batch_size: int) -> PurgeWorker:
+    return PurgeWorker(app.db_client, get_settings().model_copy(update={"PURGE_BATCH_SIZE": batch_size}))
+
+
+@pytest.mark.asyncio
+async def test_deleted_session_is_hidden_at_once(client, app):
+    agent_id, session_id = await _agent_with_history(client)
+
+    assert (await client.delete(f"/api/v1/agents/sessions/{session_id}")).json() == {"deleted": True}
+    assert (await client.get(f"/api/v1/agents/sessions/{session_id}")).status_code == 404
+    assert (await client.get(f"/api/v1/agents/{agent_id}/sessions")).json() == []
+    assert (await client.get(f"/api/v1/sessions/session-messages?session_id={session_id}")).json() == []
+    assert (await client.get("/api/v1/messages/search", params={"q": "hi"})).json()["results"] == []
+    assert (
+        await client.post("/api/v1/sessions/send-message", json={"session_id": session_id, "content": "again"})
+    ).status_code == 404
+    assert (await client.delete(f"/api/v1/agents/sessions/{session_id}")).status_code == 404
+    # Nothing removed yet: that is the purge worker's job
+    assert await _count(app, Message) == 6
+
+
+@pytest.mark.asyncio
+async def test_deleted_agent_hides_agent_and_its_sessions(client, app):
+    agent_id, session_id = await _agent_with_history(client)
+    other_id, other_session = await _agent_with_history(client, turns=1)
+
+    assert (await client.delete(f"/api/v1/agents/{agent_id}")).status_code == 200
+    assert [a["agent_id"] for a in (await client.get("/api/v1/agents")).json()] == [other_id]
+    assert (await client.get(f"/api/v1/agents/sessions/{session_id}")).status_code == 404
+    assert (await client.get(f"/api/v1/agents/sessions/{other_session}")).status_code == 200
+    assert (await client.put(f"/api/v1/agents/{agent_id}", json={"name": "x"})).status_code == 404
+    assert (await client.delete(f"/api/v1/agents/{agent_id}")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_purge_removes_rows_in_batches(client, app, monkeypatch):
+    agent_id, _ = await _agent_with_history(client)
+    other_id, other_session = await _agent_with_history(client, turns=1)
+    await client.delete(f"/api/v1/agents/{agent_id}")
+
+    worker = _worker(app, batch_size=2)
+    batches = []
+    purge_messages = PurgeModel.purge_messages
+
+    async def counting_purge_messages(self, batch_size):
+        count = await purge_messages(self, batch_size)
+        batches.append(count)
+        return count
+
+    monkeypatch.setattr(PurgeModel, "purge_messages", counting_purge_messages)
+    deleted = await worker.run_once()
+
+    assert deleted == {"messages": 6, "knowledge_chunks": 3, "sessions": 1, "agents": 1}
+    assert batches == [2, 2, 2, 0]
+    assert await _count(app, Agent) == 1
+    assert await _count(app, Session) == 1
+    assert await _count(app, Message) == 2  # the other agent's turn
+    assert await _count(app, KnowledgeChunk) == 3
+    assert (await client.get(f"/api/v1/sessions/session-messages?session_id={other_session}")).status_code == 200
+    assert await worker.run_once() == {"messages": 0, "knowledge_chunks": 0, "sessions": 0, "agents": 0}
+
+
+@pytest.mark.asyncio
+async def test_session_purge_cascades_remaining_rows(client, app):
+    _, session_id = await _agent_with_history(client, turns=1)
+    job = await client.post("/api/v1/sessions/jobs", json={"session_id": session_id, "content": "later"})
+    await app.chat_job_pool.drain()
+    assert job.status_code == 202
+    await client.delete(f"/api/v1/agents/sessions/{session_id}")
+
+    deleted = await _worker(app, batch_size=100).run_once()
+    assert deleted["sessions"] == 1
+    assert (await client.get(f"/api/v1/sessions/jobs/{job.json()['job_id']}")).status_code == 404
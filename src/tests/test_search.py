@@ -0,0 +1,64 @@
+"""
+Tests for message search: filters, snippets, keyset pagination (LIKE fallback on SQLite).
+"""
+import pytest
+
+
+async def _setup_session(client, name="SearchBot"):
+    agent = await client.post("/api/v1/agents", json={"name": name, "prompt": "You are helpful."})
+    agent_id = agent.json()["agent_id"]
+    session = await client.post(f"/api/v1/agents/{agent_id}/sessions")
+    return agent_id, session.json()["session_id"]
+
+
+@pytest.mark.asyncio
+async def test_search_finds_message_with_snippet(client):
+    _, session_id = await _setup_session(client)
+    await client.post(
+        "/api/v1/sessions/send-message",
+        json={"session_id": session_id, "content": "My invoice number is wrong"},
+    )
+    resp = await client.get("/api/v1/messages/search?q=invoice")
+    assert resp.status_code == 200
+    data = resp.json()
+    assert len(data["results"]) == 1
+    hit = data["results"][0]
+    assert hit["session_id"] == session_id
+    assert hit["role"] == "user"
+    assert "<b>invoice</b>" in hit["snippet"]
+    assert data["next_cursor"] is None
+
+
+@pytest.mark.asyncio
+async def test_search_filters_by_role_and_agent(client):
+    agent_id, session_id = await _setup_session(client)
+    other_agent_id, other_session_id = await _setup_session(client, name="Other")
+    await client.post("/api/v1/sessions/send-message", json={"session_id": session_id, "content": "hello"})
+    await client.post("/api/v1/sessions/send-message", json={"session_id": other_session_id, "content": "hello"})
+
+    resp = await client.get(f"/api/v1/messages/search?q=hello&role=assistant&agent_id={agent_id}")
+    results = resp.json()["results"]
+    assert len(results) == 1
+    assert results[0]["role"] == "assistant"
+    assert results[0]["agent_id"] == agent_id
+
+
+@pytest.mark.asyncio
+async def test_search_keyset_pagination(client):
+    _, session_id = await _setup_session(client)
+    for i in range(3):
+        await client.post("/api/v1/sessions/send-message", json={"session_id": session_id, "content": f"refund {i}"})
+
+    first = (await client.get("/api/v1/messages/search?q=refund&limit=2")).json()
+    assert len(first["results"]) == 2
+    assert first["next_cursor"]
+    second = (await client.get(f"/api/v1/messages/search?q=refund&limit=2&cursor={first['next_cursor']}")).json()
+    assert len(second["results"]) == 1
+    ids = [h["message_id"] for h in first["results"] + second["results"]]
+    assert len(set(ids)) == 3
+
+
+@pytest.mark.asyncio
+async def test_search_invalid_cursor(client):
+    resp = await client.get("/api/v1/messages/search?q=x&cursor=not-a-cursor")
+    assert resp.status_code == 400
@@ -0,0 +1,64 @@
+"""
+Tests for the incremental sentence segmenter used to pace TTS in voice replies.
+"""
+from helpers.sentence_segmenter import SentenceSegmenter
+
+
+def _segment(text: str, step: int = 1, **options) -> list[str]:
+    segmenter = SentenceSegmenter(**options)
+    segments = []
+    for i in range(0, len(text), step):
+        segments.extend(segmenter.feed(text[i:i + step]))
+    tail = segmenter.flush()
+    return segments + ([tail] if tail else [])
+
+
+def test_first_clause_is_emitted_early_then_sentences():
+    text = "Sure, I can help with that today. The meeting is at noon tomorrow. Bring your notes."
+    assert _segment(text) == [
+        "Sure, I can help with that today.",
+        "The meeting is at noon tomorrow.",
+        "Bring your notes.",
+    ]
+    assert _segment("Well, of course, that depends on the weather.", first_clause_min_words=2) == [
+        "Well, of course,",
+        "that depends on the weather.",
+    ]
+
+
+def test_first_segment_capped_by_word_count():
+    text = "I think the answer to your question is quite long and complicated"
+    assert _segment(text, first_clause_max_words=5)[0] == "I think the answer to"
+
+
+def test_abbreviations_initials_and_numbers_do_not_split():
+    text = "Hello there my friend. Dr. Smith met J. Doe at 3.30 today, e.g. in the lobby. Then they left."
+    assert _segment(text) == [
+        "Hello there my friend.",
+        "Dr. Smith met J. Doe at 3.30 today, e.g. in the lobby.",
+        "Then they left.",
+    ]
+
+
+def test_short_sentences_are_merged():
+    assert _segment("First sentence is here. Ok. Yes. That is all for now.") == [
+        "First sentence is here.",
+        "Ok. Yes. That is all for now.",
+    ]
+
+
+def test_long_sentences_are_cut_at_clause_breaks():
+    text = "Start here. " + "one two three, " * 10 + "done."
+    segments = _segment(text, max_chars=50)
+    assert all(len(s) <= 50 for s in segments)
+    assert all(s.endswith((",", ".")) for s in segments)
+    assert " ".join(segments) == " ".join(text.split())
+
+
+def test_chunking_does_not_change_segments():
+    text = "Absolutely, here it is. Mr. Brown paid 4.50 dollars! Was it worth it? I think so."
+    assert _segment(text, step=1) == _segment(text, step=7) == _segment(text, step=len(text))
+
+
+def test_cjk_sentences_split_without_spaces():
+    assert _segment("你好。今天天气很好！") == ["你好。", "今天天气很好！"]
@@ -0,0 +1,25 @@
+"""
+Tests for the fast JSON serialization path (orjson and stdlib fallback produce the same payload).
+"""
+import json
+from datetime import datetime, timezone
+
+from helpers import serialization
+
+
+def test_datetimes_encode_like_isoformat():
+    moment = datetime(2026, 3, 1, 12, 30, 5, 123456, tzinfo=timezone.utc)
+    assert json.loads(serialization.dumps({"t": moment})) == {"t": moment.isoformat()}
+
+
+def test_stdlib_fallback_matches(monkeypatch):
+    payload = [{"id": 1, "text": "héllo", "at": datetime(2026, 3, 1, tzinfo=timezone.utc), "none": None}]
+    fast = serialization.dumps(payload)
+    monkeypatch.setattr(serialization, "orjson", None)
+    assert json.loads(serialization.dumps(payload)) == json.loads(fast)
+
+
+def test_fast_response_sets_json_media_type():
+    resp = serialization.FastJSONResponse([{"a": 1}])
+    assert resp.media_type == "application/json"
+    assert json.loads(resp.body) == [{"a": 1}]
@@ -1,7 +1,12 @@
 """
 Tests for Session management endpoints: create, list by agent, get by id.
 """
+from datetime import datetime, timezone
+
 import pytest
+from sqlalchemy import update
+
+from models.ai_agent_platform_DB.schemes import Session
 
 
 async def _create_agent(client, name="Bot", prompt="System prompt"):
@@ -57,3 +62,86 @@ async def test_get_nonexistent_session(client):
     resp = await client.get("/api/v1/agents/sessions/99999")
     assert resp.status_code == 404
     assert "not found" in resp.json()["detail"].lower()
+
+
+@pytest.mark.asyncio
+async def test_list_sessions_with_stats(client):
+    agent_id = await _create_agent(client)
+    busy = (await client.post(f"/api/v1/agents/{agent_id}/sessions")).json()["session_id"]
+    idle = (await client.post(f"/api/v1/agents/{agent_id}/sessions")).json()["session_id"]
+    await client.post("/api/v1/sessions/send-message", json={"session_id": busy, "content": "Hi"})
+
+    resp = await client.get(f"/api/v1/agents/{agent_id}/sessions?include_stats=true")
+    assert resp.status_code == 200
+    by_id = {s["session_id"]: s for s in resp.json()}
+    assert by_id[busy]["message_count"] == 2
+    assert by_id[busy]["last_message_preview"] == "Hello from the assistant!"
+    assert by_id[busy]["last_activity_at"] is not None
+    assert by_id[idle]["message_count"] == 0
+    assert by_id[idle]["last_message_preview"] is None
+
+
+@pytest.mark.asyncio
+async def test_sessions_are_listed_by_last_activity(client, app):
+    agent_id = await _create_agent(client)
+    ids = [(await client.post(f"/api/v1/agents/{agent_id}/sessions")).json()["session_id"] for _ in range(3)]
+    # (created_at, updated_at): the newest session has never been written to since
+    day = lambda n: datetime(2024, 1, n, tzinfo=timezone.utc)
+    times = [(day(1), day(3)), (day(2), day(2)), (day(4), None)]
+    async with app.db_client() as db_session:
+        for session_id, (created_at, updated_at) in zip(ids, times):
+            await db_session.execute(
+                update(Session).where(Session.session_id == session_id).values(created_at=created_at, updated_at=updated_at)
+            )
+        await db_session.commit()
+
+    expected = [ids[2], ids[0], ids[1]]
+    for query in ("", "?include_stats=true"):
+        listed = (await client.get(f"/api/v1/agents/{agent_id}/sessions{query}")).json()
+        assert [s["session_id"] for s in listed] == expected
+
+
+@pytest.mark.asyncio
+async def test_list_sessions_with_stats_paginated(client):
+    agent_id = await _create_agent(client)
+    for _ in range(3):
+        await client.post(f"/api/v1/agents/{agent_id}/sessions")
+
+    first = await client.get(f"/api/v1/agents/{agent_id}/sessions?include_stats=true&limit=2")
+    second = await client.get(f"/api/v1/agents/{agent_id}/sessions?include_stats=true&limit=2&offset=2")
+    assert len(first.json()) == 2
+    assert len(second.json()) == 1
+    ids = {s["session_id"] for s in first.json()} | {s["session_id"] for s in second.json()}
+    assert len(ids) == 3
+
+
+@pytest.mark.asyncio
+async def test_list_sessions_without_stats_has_plain_shape(client):
+    agent_id = await _create_agent(client)
+    await client.post(f"/api/v1/agents/{agent_id}/sessions")
+    resp = await client.get(f"/api/v1/agents/{agent_id}/sessions")
+    assert "message_count" not in resp.json()[0]
+
+
+@pytest.mark.asyncio
+async def test_deleting_a_message_updates_session_stats(client, app):
+    from models.MessageModel import MessageModel
+
+    agent_id = await _create_agent(client)
+    session_id = (await client.post(f"/api/v1/agents/{agent_id}/sessions")).json()["session_id"]
+    await client.post("/api/v1/sessions/send-message", json={"session_id": session_id, "content": "Hi"})
+    stats_url = f"/api/v1/agents/{agent_id}/sessions?include_stats=true"
+    before = await client.get(stats_url)
+    session_etag = (await client.get(f"/api/v1/agents/sessions/{session_id}")).headers["ETag"]
+    user, assistant = (await client.get(f"/api/v1/sessions/session-messages?session_id={session_id}")).json()
+
+    assert await MessageModel(app.db_client).delete_message(assistant["message_id"])
+    after = await client.get(stats_url, headers={"If-None-Match": before.headers["ETag"]})
+    assert after.status_code == 200
+    [stats] = after.json()
+    assert (stats["message_count"], stats["last_message_preview"]) == (1, "Hi")
+    assert (await client.get(f"/api/v1/agents/sessions/{session_id}")).headers["ETag"] != session_etag
+
+    assert await MessageModel(app.db_client).delete_message(user["message_id"])
+    [stats] = (await client.get(stats_url)).json()
+    assert (stats["message_count"], stats["last_message_preview"]) == (0, None)
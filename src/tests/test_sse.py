@@ -0,0 +1,56 @@
+"""
+Tests for SSE frame coalescing: first-token passthrough, byte threshold, time window, non-text events.
+"""
+import asyncio
+
+import pytest
+
+from helpers.sse import coalesce_text
+
+
+async def _stream(items, delay: float = 0.0):
+    for item in items:
+        if delay:
+            await asyncio.sleep(delay)
+        yield item
+
+
+async def _collect(gen):
+    return [item async for item in gen]
+
+
+@pytest.mark.asyncio
+async def test_first_delta_is_not_delayed_and_rest_is_merged():
+    out = await _collect(coalesce_text(_stream(["a", "b", "c", "d"]), window_ms=1000, max_bytes=1000))
+    assert out == ["a", "bcd"]
+
+
+@pytest.mark.asyncio
+async def test_flushes_on_byte_threshold():
+    out = await _collect(coalesce_text(_stream(["x", "aa", "bb", "cc"]), window_ms=1000, max_bytes=4))
+    assert out == ["x", "aabb", "cc"]
+
+
+@pytest.mark.asyncio
+async def test_flushes_on_time_window_when_upstream_is_slow():
+    out = await _collect(coalesce_text(_stream(["a", "b", "c"], delay=0.05), window_ms=10, max_bytes=1000))
+    assert out == ["a", "b", "c"]
+
+
+@pytest.mark.asyncio
+async def test_non_text_events_flush_and_keep_order():
+    events = [("assistant_text", "Hi"), ("assistant_text", " the"), ("assistant_text", "re"), ("audio", b"\x00"), ("done", "")]
+    out = await _collect(coalesce_text(
+        _stream(events),
+        window_ms=1000,
+        max_bytes=1000,
+        text_of=lambda e: e[1] if e[0] == "assistant_text" else None,
+        make=lambda t: ("assistant_text", t),
+    ))
+    assert out == [("assistant_text", "Hi"), ("assistant_text", " there"), ("audio", b"\x00"), ("done", "")]
+
+
+@pytest.mark.asyncio
+async def test_zero_window_disables_coalescing():
+    out = await _collect(coalesce_text(_stream(["a", "b"]), window_ms=0, max_bytes=1000))
+    assert out == ["a", "b"]
@@ -0,0 +1,60 @@
+"""
+Tests for lazy startup: settings loaded once, provider client built on first use, startup profiling.
+"""
+import importlib
+import sys
+
+import pytest
+from pydantic import ValidationError
+
+from helpers import metrics, startup_profiler
+from helpers.config import get_settings
+from stores.LLM import OpenAIProvider
+
+
+def test_settings_are_loaded_once_and_frozen():
+    settings = get_settings()
+    assert get_settings() is settings
+    with pytest.raises(ValidationError):
+        settings.LOG_LEVEL = "DEBUG"
+
+
+def test_openai_client_is_built_on_first_use():
+    provider = OpenAIProvider(api_key="test-key")
+    assert provider._client is None
+    client = provider.client
+    assert client is not None
+    assert provider.client is client
+
+
+def test_import_timer_records_module_time(tmp_path, monkeypatch):
+    (tmp_path / "startup_probe_module.py").write_text("import time\nVALUE = 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    timers_before = list(sys.meta_path)
+    startup_profiler.install_import_timer()
+    try:
+        module = importlib.import_module("startup_probe_module")
+    finally:
+        sys.meta_path[:] = timers_before
+        sys.modules.pop("startup_probe_module", None)
+    assert module.VALUE == 1
+    assert "startup_probe_module" in dict(startup_profiler.slowest_imports(top=1000))
+
+
+@pytest.mark.asyncio
+async def test_first_request_marks_startup_stage():
+    startup_profiler.reset()
+    calls = []
+
+    async def inner_app(scope, receive, send):
+        calls.append(scope["path"])
+
+    middleware = startup_profiler.FirstRequestMiddleware(inner_app)
+    scope = {"type": "http", "path": "/api/v1/agents"}
+    await middleware(scope, None, None)
+    first = startup_profiler.report()["stages"]["first_request"]
+    await middleware(scope, None, None)
+
+    assert calls == ["/api/v1/agents", "/api/v1/agents"]
+    assert startup_profiler.report()["stages"]["first_request"] == first
+    assert metrics.get_value("startup_seconds", stage="first_request") == first
@@ -0,0 +1,102 @@
+"""
+Tests for resumable SSE streams (numbered events, Last-Event-ID replay, bounded buffer).
+"""
+import asyncio
+
+import pytest
+
+from helpers.stream_replay import StreamReplayBuffer, ReplayGap
+
+
+async def _setup_session(client):
+    agent = await client.post("/api/v1/agents", json={"name": "Bot", "prompt": "Be helpful."})
+    session = await client.post(f"/api/v1/agents/{agent.json()['agent_id']}/sessions")
+    return session.json()["session_id"]
+
+
+def _event_ids(body: str) -> list[int]:
+    return [int(line[len("id: "):]) for line in body.splitlines() if line.startswith("id: ")]
+
+
+@pytest.mark.asyncio
+async def test_stream_events_are_numbered_and_resumable(client):
+    session_id = await _setup_session(client)
+    resp = await client.post("/api/v1/sessions/stream-message", json={"session_id": session_id, "content": "Hi"})
+    assert resp.status_code == 200
+    stream_id = resp.headers["X-Stream-Id"]
+    ids = _event_ids(resp.text)
+    assert ids == list(range(1, len(ids) + 1))
+
+    resumed = await client.get(f"/api/v1/sessions/streams/{stream_id}", headers={"Last-Event-ID": "1"})
+    assert resumed.status_code == 200
+    assert _event_ids(resumed.text) == ids[1:]
+    assert '"done": true' in resumed.text
+    assert resp.text.split("\n\n", 1)[1] == resumed.text
+
+
+@pytest.mark.asyncio
+async def test_resume_unknown_stream_returns_404(client):
+    resp = await client.get("/api/v1/sessions/streams/does-not-exist")
+    assert resp.status_code == 404
+
+
+async def _slow_frames(count: int, release: asyncio.Event | None = None):
+    for i in range(count):
+        if release is not None and i == 1:
+            await release.wait()
+        yield f"data: {i}\n\n"
+
+
+@pytest.mark.asyncio
+async def test_generation_continues_after_subscriber_leaves():
+    replay = StreamReplayBuffer(ttl_seconds=60, max_streams=10, max_events=100, resume_grace_seconds=60)
+    release = asyncio.Event()
+    stream = replay.start(_slow_frames(5, release))
+
+    events = stream.events(0)
+    first = await events.__anext__()
+    assert first == (1, "data: 0\n\n")
+    await events.aclose()  # client dropped
+
+    release.set()
+    await stream.task
+    assert stream.done and stream.last_event_id == 5
+    resumed = [event async for event in replay.get(stream.stream_id).events(1)]
+    assert [event_id for event_id, _ in resumed] == [2, 3, 4, 5]
+    await replay.close()
+
+
+@pytest.mark.asyncio
+async def test_dropped_events_cannot_be_resumed():
+    replay = StreamReplayBuffer(ttl_seconds=60, max_streams=10, max_events=2, resume_grace_seconds=60)
+    stream = replay.start(_slow_frames(5))
+    await stream.task
+    assert not stream.can_resume_from(1)
+    assert stream.can_resume_from(3)
+    with pytest.raises(ReplayGap):
+        async for _ in stream.events(0):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_abandoned_stream_is_cancelled_after_grace():
+    replay = StreamReplayBuffer(ttl_seconds=60, max_streams=10, max_events=100, resume_grace_seconds=0.01)
+    never = asyncio.Event()
+    stream = replay.start(_slow_frames(5, never))
+    events = stream.events(0)
+    await events.__anext__()
+    await events.aclose()
+    await asyncio.wait_for(stream.task, timeout=1)
+    assert stream.done and stream.last_event_id == 1
+
+
+@pytest.mark.asyncio
+async def test_buffer_is_bounded_by_stream_count():
+    replay = StreamReplayBuffer(ttl_seconds=60, max_streams=2, max_events=100, resume_grace_seconds=60)
+    streams = [replay.start(_slow_frames(1)) for _ in range(2)]
+    await asyncio.gather(*(s.task for s in streams))
+    newest = replay.start(_slow_frames(1))
+    assert replay.get(streams[0].stream_id) is None
+    assert replay.get(streams[1].stream_id) is not None
+    assert replay.get(newest.stream_id) is not None
+    await replay.close()
@@ -0,0 +1,236 @@
+"""
+Tests for agent tools: registry and agent CRUD, concurrent tool calls with timeouts and caching, tool rounds in
+send/stream replies, and parsing of tool calls in the OpenAI provider.
+"""
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from controllers.tools import Tool, ToolContext, get_tool_registry, run_tool_calls
+from stores.LLM import OpenAIProvider, ToolCallRequest
+
+_handler_calls = []
+
+
+async def _slow_lookup(city: str):
+    _handler_calls.append(city)
+    await asyncio.sleep(0.2)
+    return {"city": city, "temperature": 21}
+
+
+async def _hang():
+    await asyncio.sleep(5)
+
+
+@pytest.fixture()
+def test_tools():
+    registry = get_tool_registry()
+    city = {"type": "object", "properties": {"city": {"type": "string"}}, "required": ["city"]}
+    registry.register(Tool("weather", _slow_lookup, "Weather in a city", city))
+    registry.register(Tool("weather_cached", _slow_lookup, "Weather in a city", city, cache_ttl_seconds=60))
+    registry.register(Tool("hang", _hang, "Never answers in time", timeout_seconds=0.05))
+    _handler_calls.clear()
+    yield registry
+    for name in ("weather", "weather_cached", "hang"):
+        registry.unregister(name)
+
+
+def _call(call_id: str, name: str, **arguments) -> dict:
+    return {"id": call_id, "name": name, "arguments": json.dumps(arguments)}
+
+
+async def _session(client, tools: list[str]) -> int:
+    agent_id = (await client.post("/api/v1/agents", json={"name": "A", "prompt": "p", "tools": tools})).json()["agent_id"]
+    return (await client.post(f"/api/v1/agents/{agent_id}/sessions")).json()["session_id"]
+
+
+@pytest.mark.asyncio
+async def test_agents_declare_registered_tools(client):
+    tools = (await client.get("/api/v1/agents/tools")).json()
+    assert {"calculator", "current_time", "search_knowledge"} <= {t["name"] for t in tools}
+
+    created = await client.post("/api/v1/agents", json={"name": "A", "prompt": "p", "tools": ["calculator"]})
+    assert created.json()["tools"] == ["calculator"]
+    agent_id = created.json()["agent_id"]
+    rejected = await client.post("/api/v1/agents", json={"name": "B", "prompt": "p", "tools": ["rm_rf"]})
+    assert rejected.status_code == 400 and "rm_rf" in rejected.json()["detail"]
+
+    assert (await client.put(f"/api/v1/agents/{agent_id}", json={"tools": ["nope"]})).status_code == 400
+    updated = await client.put(f"/api/v1/agents/{agent_id}", json={"tools": ["calculator", "current_time"]})
+    assert updated.json()["tools"] == ["calculator", "current_time"]
+    assert (await client.get("/api/v1/agents")).json()[0]["tools"] == ["calculator", "current_time"]
+
+
+@pytest.mark.asyncio
+async def test_independent_calls_run_concurrently(test_tools):
+    calls = [_call("c1", "weather", city="Cairo"), _call("c2", "weather", city="Oslo"), _call("c3", "calculator", expression="6*7")]
+    started = time.perf_counter()
+    results = await run_tool_calls(test_tools, calls, ["weather", "calculator"], ToolContext(agent_id=1))
+    assert time.perf_counter() - started < 0.35  # two 0.2 s lookups overlap
+
+    assert [r["tool_call_id"] for r in results] == ["c1", "c2", "c3"]
+    assert json.loads(results[0]["content"])["city"] == "Cairo"
+    assert json.loads(results[2]["content"])["result"] == 42
+
+
+@pytest.mark.asyncio
+async def test_failures_become_tool_results(test_tools):
+    calls = [
+        _call("c1", "hang"),
+        _call("c2", "weather", city="Cairo"),  # registered, but not one of the agent's tools
+        {"id": "c3", "name": "calculator", "arguments": "{not json"},
+        _call("c4", "calculator", expression="__import__('os')"),
+        _call("c5", "calculator", expression="9**9**9"),
+        _call("c6", "calculator", expression="((9**99)**99)**99"),
+    ]
+    results = await run_tool_calls(test_tools, calls, ["hang", "calculator"], ToolContext(agent_id=1))
+    errors = [json.loads(r["content"])["error"] for r in results]
+    assert "timed out" in errors[0]
+    assert errors[1] == "Unknown tool: weather"
+    assert "JSON object" in errors[2]
+    assert "Only numbers" in errors[3] and "Exponents" in errors[4] and "Numbers are limited" in errors[5]
+    assert _handler_calls == []
+
+
+@pytest.mark.asyncio
+async def test_cached_tools_reuse_results_per_arguments(test_tools):
+    context = ToolContext(agent_id=1)
+    allowed = ["weather_cached"]
+    await run_tool_calls(test_tools, [_call("c1", "weather_cached", city="Cairo")], allowed, context)
+    started = time.perf_counter()
+    [cached] = await run_tool_calls(test_tools, [_call("c2", "weather_cached", city="Cairo")], allowed, context)
+    assert time.perf_counter() - started < 0.1
+    assert json.loads(cached["content"])["city"] == "Cairo" and cached["tool_call_id"] == "c2"
+    await run_tool_calls(test_tools, [_call("c3", "weather_cached", city="Oslo")], allowed, context)
+    assert _handler_calls == ["Cairo", "Oslo"]
+
+
+@pytest.mark.asyncio
+async def test_send_message_runs_tool_rounds(client, app, test_tools):
+    session_id = await _session(client, ["weather", "calculator"])
+    seen = []
+
+    def generate_chat(messages, usage=None, tools=None, **kwargs):
+        seen.append((messages, tools))
+        if len(seen) == 1:
+            return ToolCallRequest([_call("c1", "weather", city="Cairo"), _call("c2", "calculator", expression="1+1")])
+        return "It is 21 degrees in Cairo."
+
+    app.openai_provider.generate_chat.side_effect = generate_chat
+    reply = (await client.post("/api/v1/sessions/send-message", json={"session_id": session_id, "content": "weather?"})).json()
+    assert reply["content"] == "It is 21 degrees in Cairo."
+
+    (first, offered), (second, _) = seen
+    assert [t["function"]["name"] for t in offered] == ["weather", "calculator"]
+    assert [m["role"] for m in second[len(first):]] == ["assistant", "tool", "tool"]
+    assert second[-2]["tool_call_id"] == "c1" and second[-1]["tool_call_id"] == "c2"
+
+    messages = (await client.get(f"/api/v1/sessions/session-messages?session_id={session_id}")).json()
+    assert [m["role"] for m in messages] == ["user", "assistant"]  # tool traffic is not stored
+
+
+@pytest.mark.asyncio
+async def test_last_round_gets_no_tools(client, app, test_tools):
+    session_id = await _session(client, ["weather"])
+    offered = []
+
+    def always_calls_tools(messages, usage=None, tools=None, **kwargs):
+        offered.append(tools)
+        if tools:
+            return ToolCallRequest([_call(f"c{len(offered)}", "calculator", expression="2+2")])
+        return "Done."
+
+    app.openai_provider.generate_chat.side_effect = always_calls_tools
+    reply = (await client.post("/api/v1/sessions/send-message", json={"session_id": session_id, "content": "hi"})).json()
+    assert reply["content"] == "Done."
+    assert [bool(t) for t in offered] == [True, True, True, True, False]
+
+
+@pytest.mark.asyncio
+async def test_agents_without_tools_are_not_offered_any(client, app):
+    session_id = await _session(client, [])
+    await client.post("/api/v1/sessions/send-message", json={"session_id": session_id, "content": "hi"})
+    assert "tools" not in app.openai_provider.generate_chat.call_args.kwargs
+
+
+@pytest.mark.asyncio
+async def test_stream_message_runs_tool_rounds(client, app, test_tools):
+    session_id = await _session(client, ["weather"])
+    rounds = []
+
+    def generate_chat_stream(messages, usage=None, tools=None, **kwargs):
+        rounds.append(messages)
+        if len(rounds) == 1:
+            yield "Checking. "
+            yield ToolCallRequest([_call("c1", "weather", city="Oslo")])
+        else:
+            yield "21 degrees."
+
+    app.openai_provider.generate_chat_stream.side_effect = generate_chat_stream
+    response = await client.post("/api/v1/sessions/stream-message", json={"session_id": session_id, "content": "hi"})
+    assert '"done": true' in response.text
+
+    call_message = rounds[1][-2]
+    assert call_message["content"] == "Checking. " and call_message["tool_calls"][0]["function"]["name"] == "weather"
+    messages = (await client.get(f"/api/v1/sessions/session-messages?session_id={session_id}")).json()
+    assert messages[-1]["content"] == "Checking. 21 degrees."
+
+
+def _provider(create) -> OpenAIProvider:
+    provider = OpenAIProvider(api_key="test")
+    provider.set_generation_model("gpt-test")
+    provider._client = MagicMock()
+    provider._client.chat.completions.create.side_effect = create
+    return provider
+
+
+def test_provider_parses_tool_calls_and_sums_usage():
+    function = SimpleNamespace(name="weather", arguments='{"city": "Cairo"}')
+    message = SimpleNamespace(content=None, tool_calls=[SimpleNamespace(id="c1", function=function)])
+    response = SimpleNamespace(
+        choices=[SimpleNamespace(message=message)],
+        usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5),
+        model="gpt-test",
+    )
+    provider = _provider(lambda **kwargs: response)
+    usage = {}
+    first = provider.generate_chat([{"role": "user", "content": "hi"}], usage=usage, tools=[{"type": "function"}])
+    provider.generate_chat([{"role": "user", "content": "hi"}], usage=usage)
+
+    assert isinstance(first, ToolCallRequest)
+    assert first.calls == [{"id": "c1", "name": "weather", "arguments": '{"city": "Cairo"}'}]
+    assert first.assistant_message()["tool_calls"][0]["function"]["name"] == "weather"
+    assert (usage["prompt_tokens"], usage["completion_tokens"]) == (20, 10)
+    create = provider._client.chat.completions.create
+    assert "tools" in create.call_args_list[0].kwargs and "tools" not in create.call_args_list[1].kwargs
+
+
+def test_provider_assembles_streamed_tool_call_fragments():
+    def fragment(index, call_id=None, name=None, arguments=None):
+        delta = SimpleNamespace(
+            content=None,
+            tool_calls=[SimpleNamespace(index=index, id=call_id, function=SimpleNamespace(name=name, arguments=arguments))],
+        )
+        return SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+
+    chunks = [
+        SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="Let me check. ", tool_calls=None))], usage=None),
+        fragment(0, "c1", "weather", '{"ci'),
+        fragment(1, "c2", "current_time", "{}"),
+        fragment(0, arguments='ty": "Oslo"}'),
+    ]
+    stream = MagicMock()
+    stream.__iter__.return_value = iter(chunks)
+    provider = _provider(lambda **kwargs: stream)
+
+    *text, request = list(provider.generate_chat_stream([{"role": "user", "content": "hi"}], tools=[{"type": "function"}]))
+    assert text == ["Let me check. "]
+    assert request.calls == [
+        {"id": "c1", "name": "weather", "arguments": '{"city": "Oslo"}'},
+        {"id": "c2", "name": "current_time", "arguments": "{}"},
+    ]
+    stream.close.assert_called_once()
@@ -0,0 +1,197 @@
+"""
+Tests for WAV decoding, silence splitting, pre-STT normalization and parallel chunked transcription.
+"""
+import io
+import threading
+import time
+import wave
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from controllers.transcription import transcribe
+from helpers import audio
+from helpers.config import get_settings
+
+RATE = 8000
+
+
+def _tone(seconds: float, amplitude: float = 0.5) -> np.ndarray:
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (amplitude * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+
+
+def _silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * RATE), dtype=np.float32)
+
+
+def _wav(samples: np.ndarray, rate: int = RATE, width: int = 2, channels: int = 1) -> bytes:
+    scale = {1: 127, 2: 32767, 3: 8388607}[width]
+    ints = np.round(samples * scale).astype(np.int32)
+    if width == 1:
+        raw = (ints + 128).astype(np.uint8).tobytes()
+    elif width == 2:
+        raw = ints.astype("<i2").tobytes()
+    else:
+        raw = b"".join(int(v).to_bytes(3, "little", signed=True) for v in ints)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(width)
+        w.setframerate(rate)
+        w.writeframes(raw)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("width", [1, 2, 3])
+def test_decode_wav_sample_widths(width):
+    samples = _tone(0.05)
+    decoded = audio.decode_wav(_wav(samples, width=width))
+    assert decoded.sample_rate == RATE and decoded.channels == 1
+    assert np.allclose(decoded.samples[:, 0], samples, atol=1.0 / 100)
+
+
+def test_non_wav_is_not_decoded_without_a_registered_decoder():
+    assert audio.decode_audio(b"\x1aE\xdf\xa3webm-bytes", "clip.webm") is None
+
+
+def test_split_lands_in_silence_and_respects_max_length():
+    # 25s speech, 1s pause, 25s speech, 1s pause, 25s speech
+    samples = np.concatenate([_tone(25), _silence(1), _tone(25), _silence(1), _tone(25)])
+    pcm = audio.PcmAudio(samples.reshape(-1, 1), RATE)
+    ranges = audio.split_at_silence(pcm, target_seconds=20, max_seconds=30, silence_db=-40)
+    assert len(ranges) == 3
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(samples)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start
+        assert np.all(samples[end - 10:end + 10] == 0)  # cut inside a pause
+    assert all((end - start) / RATE <= 30 for start, end in ranges)
+
+
+@pytest.mark.asyncio
+async def test_long_clip_is_transcribed_in_parallel_segments_in_order():
+    samples = np.concatenate([_tone(25), _silence(1), _tone(25), _silence(1), _tone(25)])
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def speech_to_text(data, filename="audio.webm"):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+        return f"part{filename.split('-')[1].split('.')[0]}"
+
+    provider = MagicMock()
+    provider.speech_to_text.side_effect = speech_to_text
+    settings = get_settings().model_copy(update={"STT_CHUNK_SECONDS": 20, "STT_CHUNK_MAX_SECONDS": 30, "STT_MAX_PARALLEL": 2})
+
+    text = await transcribe(provider, _wav(samples), "clip.wav", settings=settings)
+    assert text == "part0 part1 part2"
+    assert provider.speech_to_text.call_count == 3
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_short_or_undecodable_clips_are_sent_whole():
+    provider = MagicMock()
+    provider.speech_to_text.return_value = "hello"
+    settings = get_settings().model_copy(update={"STT_NORMALIZE_ENABLED": False})
+    clip = _wav(_tone(2))
+    assert await transcribe(provider, clip, "clip.wav", settings=settings) == "hello"
+    provider.speech_to_text.assert_called_once_with(clip, filename="clip.wav")
+    assert await transcribe(provider, b"not audio", "clip.webm") == "hello"
+
+
+@pytest.mark.asyncio
+async def test_failed_segment_fails_the_transcript():
+    provider = MagicMock()
+    provider.speech_to_text.side_effect = ["a", None, "c"]
+    samples = np.concatenate([_tone(25), _silence(1), _tone(25), _silence(1), _tone(25)])
+    settings = get_settings().model_copy(update={"STT_CHUNK_SECONDS": 20, "STT_CHUNK_MAX_SECONDS": 30, "STT_MAX_PARALLEL": 1})
+    assert await transcribe(provider, _wav(samples), "clip.wav", settings=settings) is None
+
+
+@pytest.mark.asyncio
+async def test_audio_is_decoded_off_the_event_loop(monkeypatch):
+    decoded_in = []
+    decode_audio = audio.decode_audio
+    monkeypatch.setattr(audio, "decode_audio", lambda *args: decoded_in.append(threading.get_ident()) or decode_audio(*args))
+    provider = MagicMock()
+    provider.speech_to_text.return_value = "hello"
+    assert await transcribe(provider, _wav(_tone(2)), "clip.wav") == "hello"
+    assert decoded_in and decoded_in[0] != threading.get_ident()
+
+
+@pytest.mark.asyncio
+async def test_segments_are_encoded_off_the_event_loop(monkeypatch):
+    encoded_in = []
+    encode_wav = audio.encode_wav
+    monkeypatch.setattr(audio, "encode_wav", lambda pcm: encoded_in.append(threading.get_ident()) or encode_wav(pcm))
+    provider = MagicMock()
+    provider.speech_to_text.return_value = "part"
+    samples = np.concatenate([_tone(25), _silence(1), _tone(25)])
+    settings = get_settings().model_copy(update={"STT_CHUNK_SECONDS": 20, "STT_CHUNK_MAX_SECONDS": 30})
+    assert await transcribe(provider, _wav(samples), "clip.wav", settings=settings) == "part part"
+    assert len(encoded_in) == 2 and threading.get_ident() not in encoded_in
+
+
+def test_trim_silence_keeps_padding_around_speech():
+    samples = np.concatenate([_silence(2), _tone(1), _silence(3)])
+    pcm = audio.PcmAudio(samples.reshape(-1, 1), RATE)
+    trimmed = audio.trim_silence(pcm, silence_db=-40, padding_ms=200)
+    assert 1.3 <= trimmed.duration <= 1.5
+    assert audio.trim_silence(audio.PcmAudio(_silence(2).reshape(-1, 1), RATE), silence_db=-40) is None
+
+
+@pytest.mark.parametrize("rate", [48000, 44100])
+def test_normalize_downmixes_and_resamples_to_16k(rate):
+    t = np.arange(rate) / rate
+    left = (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+    stereo = np.stack([left, left], axis=1)
+    normalized = audio.normalize_for_stt(audio.PcmAudio(stereo, rate), target_rate=16000, silence_db=-40)
+    assert normalized.channels == 1 and normalized.sample_rate == 16000
+    assert abs(normalized.duration - 1.0) < 0.01
+    # The 440 Hz tone survives the low-pass: still about 0.5 peak
+    assert 0.45 < float(np.abs(normalized.samples[100:-100]).max()) <= 0.5
+
+
+def test_lower_rates_are_not_upsampled():
+    pcm = audio.PcmAudio(_tone(1).reshape(-1, 1), RATE)
+    assert audio.resample(pcm, 16000) is pcm
+
+
+@pytest.mark.asyncio
+async def test_normalized_upload_is_smaller(monkeypatch):
+    from helpers import metrics
+
+    saved = []
+    monkeypatch.setattr(metrics, "increment", lambda name, value=1, **labels: saved.append((name, value)))
+    provider = MagicMock()
+    provider.speech_to_text.return_value = "hello"
+    rate = 48000
+    t = np.arange(2 * rate) / rate
+    tone = (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+    silence = np.zeros(3 * rate, dtype=np.float32)
+    mono = np.concatenate([silence, tone, silence])
+    clip = _wav(np.stack([mono, mono], axis=1).reshape(-1), rate=rate, channels=2)
+
+    assert await transcribe(provider, clip, "clip.wav") == "hello"
+    sent, = provider.speech_to_text.call_args.args
+    assert provider.speech_to_text.call_args.kwargs == {"filename": "audio.wav"}
+    decoded = audio.decode_wav(sent)
+    assert decoded.channels == 1 and decoded.sample_rate == 16000
+    assert decoded.duration < 2.5
+    assert len(sent) < len(clip) / 10
+    assert ("stt_bytes_saved_total", len(clip) - len(sent)) in saved
+
+
+@pytest.mark.asyncio
+async def test_silent_clip_skips_speech_to_text():
+    provider = MagicMock()
+    assert await transcribe(provider, _wav(_silence(5)), "clip.wav") == ""
+    provider.speech_to_text.assert_not_called()
@@ -0,0 +1,146 @@
+"""
+Tests for per-message usage accounting (tokens, timings, TTS bytes) and the usage aggregate endpoints.
+"""
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select, update
+
+from models.ai_agent_platform_DB.schemes import Message, MessageUsage
+
+
+async def _session(client) -> tuple[int, int]:
+    agent_id = (await client.post("/api/v1/agents", json={"name": "A", "prompt": "p"})).json()["agent_id"]
+    session_id = (await client.post(f"/api/v1/agents/{agent_id}/sessions")).json()["session_id"]
+    return agent_id, session_id
+
+
+def _reply_with_usage(prompt_tokens: int, completion_tokens: int):
+    def generate_chat(messages, usage=None, **kwargs):
+        usage.update(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, model="gpt-test-2026")
+        return "Hello from the assistant!"
+    return generate_chat
+
+
+def _stream_with_usage(chunks, prompt_tokens: int, completion_tokens: int):
+    def generate_chat_stream(messages, usage=None, **kwargs):
+        yield from chunks
+        usage.update(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+    return generate_chat_stream
+
+
+async def _usage_rows(app) -> list[MessageUsage]:
+    async with app.db_client() as db_session:
+        return list((await db_session.execute(select(MessageUsage).order_by(MessageUsage.message_id))).scalars())
+
+
+@pytest.mark.asyncio
+async def test_send_message_stores_usage_with_the_reply(client, app):
+    agent_id, session_id = await _session(client)
+    app.openai_provider.generate_chat.side_effect = _reply_with_usage(120, 30)
+
+    reply = (await client.post("/api/v1/sessions/send-message", json={"session_id": session_id, "content": "hi"})).json()
+
+    [usage] = await _usage_rows(app)
+    assert usage.message_id == reply["message_id"]
+    assert (usage.session_id, usage.agent_id, usage.model_id) == (session_id, agent_id, "gpt-test-2026")
+    assert (usage.prompt_tokens, usage.completion_tokens) == (120, 30)
+    assert usage.latency_ms >= 0 and usage.ttft_ms == usage.latency_ms
+    assert usage.tts_audio_bytes is None
+
+
+@pytest.mark.asyncio
+async def test_streams_record_first_token_and_tts_bytes(client, app):
+    from controllers import conversation
+
+    _, session_id = await _session(client)
+    app.openai_provider.generate_chat_stream.side_effect = _stream_with_usage(["Hello ", "there."], 50, 4)
+    response = await client.post("/api/v1/sessions/stream-message", json={"session_id": session_id, "content": "hi"})
+    assert '"done": true' in response.text
+
+    app.openai_provider.generate_chat_stream.side_effect = _stream_with_usage(["One. ", "Two."], 60, 2)
+    events = [e async for e in conversation.stream_voice_after_stt(app.db_client, app.openai_provider, session_id, "hi")]
+    assert events[-1] == ("done", "")
+
+    text, voice = await _usage_rows(app)
+    assert (text.prompt_tokens, text.completion_tokens, text.model_id) == (50, 4, "gpt-test")
+    assert text.ttft_ms <= text.latency_ms and text.tts_audio_bytes is None
+    assert (voice.prompt_tokens, voice.completion_tokens) == (60, 2)
+    assert voice.tts_audio_bytes == 4  # one TTS call, two 2-byte chunks
+
+
+@pytest.mark.asyncio
+async def test_truncated_stream_keeps_timings_without_token_counts(client, app, run_until_abandoned):
+    from controllers import conversation
+
+    def stalling_chunks():
+        yield "Partial "
+        time.sleep(0.2)  # abandoned meanwhile
+        yield "answer"
+
+    _, session_id = await _session(client)
+    app.openai_provider.generate_chat_stream.side_effect = _stream_with_usage(stalling_chunks(), 50, 4)
+
+    await run_until_abandoned(conversation.stream_text_message(app.db_client, app.openai_provider, session_id, "hi"))
+    [usage] = await _usage_rows(app)
+    assert usage.prompt_tokens is None and usage.latency_ms is not None
+
+
+@pytest.mark.asyncio
+async def test_usage_per_agent_and_bucket(client, app):
+    agent_a, session_a = await _session(client)
+    agent_b, session_b = await _session(client)
+    app.openai_provider.generate_chat.side_effect = _reply_with_usage(100, 10)
+    for session_id in (session_a, session_a, session_b):
+        await client.post("/api/v1/sessions/send-message", json={"session_id": session_id, "content": "hi"})
+    # Move agent B's reply to an earlier day
+    async with app.db_client() as db_session:
+        async with db_session.begin():
+            await db_session.execute(
+                update(MessageUsage)
+                .where(MessageUsage.agent_id == agent_b)
+                .values(created_at=datetime(2020, 1, 1, 23, 30))
+            )
+
+    buckets = (await client.get("/api/v1/usage/agents", params={"bucket": "day"})).json()
+    assert [(b["agent_id"], b["bucket_start"][:10], b["messages"]) for b in buckets] == [
+        (agent_b, "2020-01-01", 1),
+        (agent_a, buckets[1]["bucket_start"][:10], 2),
+    ]
+    assert buckets[1]["total_tokens"] == 220 and buckets[1]["completion_tokens"] == 20
+    assert buckets[0]["bucket_start"] == "2020-01-01T00:00:00+00:00"
+
+    hourly = (await client.get("/api/v1/usage/agents", params={"bucket": "hour", "agent_id": agent_b})).json()
+    assert [b["bucket_start"] for b in hourly] == ["2020-01-01T23:00:00+00:00"]
+    recent = (await client.get("/api/v1/usage/agents", params={"since": "2020-01-02T00:00:00"})).json()
+    assert [b["agent_id"] for b in recent] == [agent_a]
+    assert (await client.get("/api/v1/usage/agents", params={"bucket": "week"})).status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_sessions_ranked_by_tokens_and_latency(client, app):
+    _, small = await _session(client)
+    _, large = await _session(client)
+    app.openai_provider.generate_chat.side_effect = _reply_with_usage(10, 5)
+    await client.post("/api/v1/sessions/send-message", json={"session_id": small, "content": "hi"})
+    app.openai_provider.generate_chat.side_effect = _reply_with_usage(900, 100)
+    await client.post("/api/v1/sessions/send-message", json={"session_id": large, "content": "hi"})
+    async with app.db_client() as db_session:
+        async with db_session.begin():
+            await db_session.execute(update(MessageUsage).where(MessageUsage.session_id == small).values(latency_ms=5000))
+
+    by_tokens = (await client.get("/api/v1/usage/sessions")).json()
+    assert [(s["session_id"], s["total_tokens"]) for s in by_tokens] == [(large, 1000), (small, 15)]
+    by_latency = (await client.get("/api/v1/usage/sessions", params={"order_by": "latency", "limit": 1})).json()
+    assert [(s["session_id"], s["max_latency_ms"]) for s in by_latency] == [(small, 5000)]
+
+
+@pytest.mark.asyncio
+async def test_usage_rows_go_with_their_messages(client, app):
+    _, session_id = await _session(client)
+    await client.post("/api/v1/sessions/send-message", json={"session_id": session_id, "content": "hi"})
+    async with app.db_client() as db_session:
+        async with db_session.begin():
+            await db_session.execute(Message.__table__.delete())
+    assert await _usage_rows(app) == []